@@ -1,50 +1,89 @@
+import os
 import sys
+import argparse
+import random
 import logging
 from datetime import datetime
 from card_deck_classes import Deck
 from player_hand_classes import Player, Hand
+from player_store import TextPlayerStore, SQLitePlayerStore
+from hand_history import HandHistoryWriter, HandHistoryRecorder, format_session_summary
+from round_columns import ColumnWriter
+from replay import SessionRecorder
+import instrumentation
+from instrumentation import timed
+from renderers import RENDERERS, VerboseRenderer
+from game_engine import BlackjackEngine, ListenerGroup, Strategy, HIT, STAND, DOUBLE, SPLIT, SURRENDER
+from rules import DEFAULT_RULES
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 
+class ConsoleStrategy(Strategy):
+    """Asks the person at the terminal for each decision."""
+
+    ACTION_LABELS = {HIT: '(H)it', STAND: '(S)tand', DOUBLE: '(D)ouble down', SPLIT: 'S(P)lit',
+                     SURRENDER: 'Su(R)render'}
+    ACTION_INPUTS = {
+        HIT: ['h', 'hit'],
+        STAND: ['s', 'stand'],
+        DOUBLE: ['d', 'double down'],
+        SPLIT: ['p', 'split', 'sp'],
+        SURRENDER: ['r', 'surrender'],
+    }
+
+    def __init__(self, renderer):
+        self.renderer = renderer
+
+    def decide(self, player, hand, dealer_upcard, actions):
+        action_prompt = (self.renderer.decision_prompt(hand, dealer_upcard)
+                         + f"Options: {', '.join(self.ACTION_LABELS[a] for a in actions)}. What would you like to do? ")
+        while True:
+            self.renderer.flush()
+            choice = input(action_prompt).lower()
+            for action in actions:
+                if choice in self.ACTION_INPUTS[action]:
+                    return action
+            self.renderer.message("Invalid action. Please choose from the available options.")
+
+
 class BlackjackGame:
 
-    def __init__(self, output_file=None):
-        self.deck = Deck()
+    def __init__(self, output_file=None, store=None, history_file=None, columns_dir=None,
+                 seed=None, session_dir=None, renderer=None, rules=None):
+        self.rules = rules or DEFAULT_RULES
+        # The shoe seed is kept so the session can be replayed exactly
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(2 ** 63)
+        self.deck = Deck.for_rules(self.rules, rng=random.Random(self.seed))
         self.dealer_hand = Hand()
         self.player = None
         self.output_file = output_file or "blackjack_results.txt"
+        self.store = store or TextPlayerStore('players.txt')
         self.players_info = self._load_players()
         self.round_number = 1  # Initialize round counter
+        self.renderer = renderer or VerboseRenderer()
+        self.strategy = ConsoleStrategy(self.renderer)
+        self.history = HandHistoryWriter(history_file) if history_file else None
+        self.columns = ColumnWriter(columns_dir) if columns_dir else None
+        self.session_dir = session_dir
+        self.session_recorder = None
+        listener = ListenerGroup(self.renderer)
+        if self.history:
+            listener.listeners.append(HandHistoryRecorder(self.history))
+        if self.columns:
+            listener.listeners.append(self.columns)
+        self.engine = BlackjackEngine(self.deck, listener, self.rules)
 
     def _load_players(self):
 
-        players = []
         try:
-            with open('players.txt', 'r') as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        parts = line.split(',')
-                        if len(parts) == 5:
-                            name, age, balance, wins, losses = parts
-                            players.append({
-                                'name': name.strip(),
-                                'age': int(age.strip()),
-                                'balance': float(balance.strip()),
-                                'wins': int(wins.strip()),
-                                'losses': int(losses.strip())
-                            })
-                        else:
-                            print("Error: Each line in 'players.txt' must contain name, age, balance, wins, and losses separated by commas.")
-                            sys.exit(1)
+            return self.store.list_players()
         except FileNotFoundError:
-            print("Error: 'players.txt' file not found.")
+            print(f"Error: '{self.store.path}' file not found.")
             sys.exit(1)
-        except ValueError:
-            print("Error: 'players.txt' file contains invalid data.")
+        except ValueError as e:
+            print(f"Error: {e}")
             sys.exit(1)
-        return players
 
     def start_game(self):
         """Initialize the game with player information."""
@@ -82,12 +121,23 @@ class BlackjackGame:
         losses = selected_player_info['losses']
 
         self.player = Player(name, balance, age, wins, losses)
+        self._session_start = (balance, wins, losses)
+        if self.session_dir:
+            os.makedirs(self.session_dir, exist_ok=True)
+            session_name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{name}-{self.seed}.jsonl"
+            self.session_recorder = SessionRecorder(
+                os.path.join(self.session_dir, session_name), self.seed, self.deck, self.player, self.rules)
+            self.engine.listener.listeners.append(self.session_recorder)
         self.round_number = 1  # Initialize round counter
         self._play_rounds()
 
     def _show_instructions(self):
 
-        print("""
+        surrender = ("- Surrender: Give up your first two cards and get half your bet back.\n"
+                     if self.rules.surrender else "")
+        soft_17 = ("- Dealer hits on a soft 17 (a hand totaling 17 with an Ace counted as 11)."
+                   if self.rules.dealer_hits_soft_17 else "- Dealer stands on a soft 17.")
+        print(f"""
 === Blackjack Instructions ===
 Objective:
 Get as close to 21 without going over. Face cards are worth 10, Aces are worth 1 or 11.
@@ -97,64 +147,43 @@ Actions:
 - Stand: End your turn.
 - Double Down: Double your bet and receive one more card.
 - Split: If your first two cards are the same, you can split them into two hands.
-
+{surrender}
 Dealer Rules:
 - Dealer must hit until their cards total 17 or higher.
-- Dealer hits on a soft 17 (a hand totaling 17 with an Ace counted as 11).
+{soft_17}
 """)
 
     def _play_rounds(self):
 
         while True:
-            print("\n========================================")
-            print(f"            ROUND {self.round_number}")
-            print("========================================\n")
-            # Reset for new round
-            self.deck = Deck()
+            self.renderer.start_round(self.round_number)
+            # Reset for new round; the shoe carries over until the cut card comes out
             self.dealer_hand = Hand()
             self.player.reset_hands()
 
             # Betting
-            MIN_BET = 5
-            MAX_BET = 500
+            min_bet, max_bet = self.rules.min_bet, self.rules.max_bet
             while True:
-                print("----------------------------------------")
+                self.renderer.betting()
+                self.renderer.flush()
                 bet_input = input(
-                    f"Your current balance is ${self.player.balance:.2f}. Enter your bet (${MIN_BET}-${MAX_BET}): ")
+                    f"Your current balance is ${self.player.balance:.2f}. Enter your bet (${min_bet}-${max_bet}): ")
                 try:
                     bet = float(bet_input)
-                    if bet < MIN_BET or bet > MAX_BET:
-                        print(f"Bet must be between ${MIN_BET} and ${MAX_BET}.")
+                    if bet < min_bet or bet > max_bet:
+                        self.renderer.message(f"Bet must be between ${min_bet} and ${max_bet}.")
                         continue
                     if bet > self.player.balance:
-                        print("Insufficient funds to place this bet.")
+                        self.renderer.message("Insufficient funds to place this bet.")
                         continue
-                    current_hand = self.player.place_bet(bet)
+                    # Initial deal
+                    _, self.dealer_hand = self.engine.deal_round(self.player, bet)
                     break
                 except ValueError:
-                    print("Please enter a valid number.")
-
-            # Initial deal
-            current_hand.add_card(self.deck.deal())
-            current_hand.add_card(self.deck.deal())
-            self.dealer_hand.add_card(self.deck.deal())
-            self.dealer_hand.add_card(self.deck.deal())
-
-            # Display initial hands
-            print("\n/// Dealing cards... Good Luck! ///\n")
-            print("*************************")
-            print(f"Your hand: {current_hand}")
-            print(f"Your hand value: {current_hand.calculate_value()}")
-            print("*************************\n")
-            print(f"Dealer's visible card: {self.dealer_hand.cards[0]}")
-            print(f"Dealer's visible card value: {self.dealer_hand.cards[0].rank}")
+                    self.renderer.message("Please enter a valid number.")
 
             # Player's turn for each hand (supporting multiple hands after split)
-            for hand_index, hand in enumerate(self.player.hands):
-                print("\n----------------------------------------")
-                print(f"         PLAYING HAND {hand_index + 1}")
-                print("----------------------------------------")
-                self._player_turn(hand)
+            self.engine.play_hands(self.player, self.dealer_hand, self.strategy)
 
             # Dealer's turn
             self._dealer_turn()
@@ -164,220 +193,92 @@ Dealer Rules:
 
             # Check if player has funds to continue
             if self.player.balance <= 0:
-                print("\nYou have run out of funds. Game over.")
+                self.renderer.message("\nYou have run out of funds. Game over.")
                 break
 
             # Ask to continue
+            self.renderer.flush()
             play_again = input("\nWould you like to play another round? (yes/no): ").lower()
             if play_again not in ['yes', 'y']:
                 break
             self.round_number += 1  # Increment round counter
 
         # End of game, save results
+        if self.history:
+            self.history.close()
+        if self.columns:
+            self.columns.close()
+        if self.session_recorder:
+            self.session_recorder.close()
         self._save_game_results()
         self._update_player_data()
+        self.renderer.flush()
 
     def _player_turn(self, hand):
         """Handle player's turn for a single hand."""
-        while True:
-            hand_value = hand.calculate_value()
-            if hand_value == 21:
-                print("★★★ Blackjack! ★★★")
-                break
-
-            if hand_value > 21:
-                print("Bust!")
-                break
-
-            # Prepare action options
-            actions = ['(H)it', '(S)tand']
-            valid_actions = ['h', 'hit', 's', 'stand']
-
-            # Add double down option if available
-            if hand.can_double and self.player.balance >= hand.bet:
-                actions.append('(D)ouble down')
-                valid_actions.extend(['d', 'double down'])
-
-            # Add split option if available
-            if hand.can_split and self.player.balance >= hand.bet:
-                actions.append('S(P)lit')
-                valid_actions.extend(['p', 'split', 'sp'])
-
-            # Prompt for action
-            action_prompt = f"Options: {', '.join(actions)}. What would you like to do? "
-            action = input(action_prompt).lower()
-
-            if action not in valid_actions:
-                print("Invalid action. Please choose from the available options.")
-                continue
-
-            # Handle actions
-            if action in ['h', 'hit']:
-                hand.add_card(self.deck.deal())
-                print("\n*************************")
-                print(f"Your hand: {hand}")
-                print(f"Hand value: {hand.calculate_value()}")
-                print("*************************\n")
-            elif action in ['s', 'stand']:
-                break
-            elif action in ['d', 'double down']:
-                try:
-                    self.player.double_down(hand)
-                    hand.add_card(self.deck.deal())
-                    print("\n--- Doubled Down! ---")
-                    print("*************************")
-                    print(f"Your hand: {hand}")
-                    print(f"Hand value: {hand.calculate_value()}")
-                    print("*************************\n")
-                    break
-                except ValueError as e:
-                    print(e)
-            elif action in ['p', 'split', 'sp']:
-                try:
-                    # Perform split
-                    hand1, hand2 = self.player.split_hand(hand)
-
-                    # Deal additional cards to each split hand
-                    hand1.add_card(self.deck.deal())
-                    hand2.add_card(self.deck.deal())
-
-                    print("\n/// Hand Split! ///\n")
-                    print(f"Hand 1: {hand1}")
-                    print(f"Hand 2: {hand2}")
-                    break
-                except ValueError as e:
-                    print(e)
+        self.engine.player_turn(self.player, hand, self.dealer_hand, self.strategy)
 
     def _dealer_turn(self):
-
-        print("\n========================================")
-        print("            DEALER'S TURN")
-        print("========================================")
-        print(f"\nDealer's hand: {self.dealer_hand}")
-        print(f"Dealer's hand value: {self.dealer_hand.calculate_value()}")
-
-        # Dealer hits on 16 or less, hits on soft 17
-        while True:
-            dealer_value = self.dealer_hand.calculate_value()
-            if dealer_value < 17:
-                self.dealer_hand.add_card(self.deck.deal())
-                print("\nDealer hits.")
-                print(f"Dealer's new hand: {self.dealer_hand}")
-                print(f"Dealer's hand value: {self.dealer_hand.calculate_value()}")
-            elif dealer_value == 17 and self.dealer_hand.is_soft_hand():
-                self.dealer_hand.add_card(self.deck.deal())
-                print("\nDealer hits on soft 17.")
-                print(f"Dealer's new hand: {self.dealer_hand}")
-                print(f"Dealer's hand value: {self.dealer_hand.calculate_value()}")
-            else:
-                print("\nDealer stands.")
-                break
-
-        if self.dealer_hand.calculate_value() > 21:
-            print("\nDealer busts!")
+        """Play out the dealer's hand."""
+        self.engine.dealer_turn(self.dealer_hand)
 
     def _resolve_bets(self):
         """Resolve bet outcomes for all hands."""
-        print("\n=== Results for Round {} ===".format(self.round_number))
-        print("----------------------------------------")
-
-        dealer_value = self.dealer_hand.calculate_value()
-        dealer_blackjack = self.dealer_hand.is_blackjack()
-
-        for hand_index, player_hand in enumerate(self.player.hands):
-            print(f"\n*** Hand {hand_index + 1} ***")
-            player_value = player_hand.calculate_value()
-            player_blackjack = player_hand.is_blackjack()
-
-            print(f"Your hand: {player_hand}")
-            print(f"Hand value: {player_value}")
-
-            # Initialize total_payout to 0
-            total_payout = 0
-
-            # Check outcomes
-            if player_blackjack and not dealer_blackjack:
-                # Blackjack payout is 3:2 (1.5 times the bet)
-                total_payout = player_hand.bet * 2.5  # Original bet + winnings
-                print(f"Blackjack! You win ${player_hand.bet * 1.5:.2f}!")
-                self.player.record_win()
-            elif not player_blackjack and dealer_blackjack:
-                print("Dealer has Blackjack. You lose.")
-                self.player.record_loss()
-            elif player_value > 21:
-                print("Bust! You lose.")
-                self.player.record_loss()
-            elif dealer_value > 21:
-                # Player wins, payout is 1:1
-                total_payout = player_hand.bet * 2  # Original bet + winnings
-                print(f"Dealer busts! You win ${player_hand.bet:.2f}!")
-                self.player.record_win()
-            elif player_value > dealer_value:
-                # Player wins, payout is 1:1
-                total_payout = player_hand.bet * 2  # Original bet + winnings
-                print(f"You win ${player_hand.bet:.2f}!")
-                self.player.record_win()
-            elif player_value < dealer_value:
-                print("Dealer wins. You lose.")
-                self.player.record_loss()
-            else:
-                # Push (tie), player gets their bet back
-                total_payout = player_hand.bet  # Return original bet
-                print("Push (tie). Your bet is returned.")
-                self.player.record_tie()
-
-            # Update player's balance if there's a payout
-            if total_payout > 0:
-                self.player.add_winnings(total_payout)
-
-        print("----------------------------------------")
-        print(f"Your new balance is: ${self.player.balance:.2f}")
-        print(f"Wins: {self.player.wins} | Losses: {self.player.losses} | Ties: {self.player.ties}")
+        self.engine.settle(self.player, self.dealer_hand)
 
+    @timed('save_game_results')
     def _save_game_results(self):
         """Save game results to a text file."""
         try:
             with open(self.output_file, 'a') as f:
                 timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                f.write(f"Player: {self.player.name}\n")
-                f.write(f"Ending Balance: ${self.player.balance:.2f}\n")
-                f.write(f"Wins: {self.player.wins}\n")
-                f.write(f"Losses: {self.player.losses}\n")
-                f.write(f"Ties: {self.player.ties}\n")
-                f.write(f"Timestamp: {timestamp}\n")
-                f.write("=" * 30 + "\n")
-            print(f"\nGame results saved to {self.output_file}")
+                f.write(format_session_summary(self.player.name, self.player.balance, self.player.wins,
+                                               self.player.losses, self.player.ties, timestamp))
+            self.renderer.message(f"\nGame results saved to {self.output_file}")
         except IOError as e:
             print(f"Error saving game results: {e}")
 
+    @timed('update_player_data')
     def _update_player_data(self):
-        """Update player's data in 'players.txt'."""
+        """Add this session's balance change and results to the player's record."""
+        start_balance, start_wins, start_losses = self._session_start
         try:
-            # Read all player data
-            with open('players.txt', 'r') as f:
-                lines = f.readlines()
-
-            # Update the selected player's data
-            with open('players.txt', 'w') as f:
-                for line in lines:
-                    parts = line.strip().split(',')
-                    if parts[0] == self.player.name:
-                        # Update balance and statistics
-                        new_line = f"{self.player.name},{self.player.age},{self.player.balance},{self.player.wins},{self.player.losses}\n"
-                        f.write(new_line)
-                    else:
-                        f.write(line)
-            print("Player data updated successfully.")
+            self.store.update_stats(
+                self.player.name,
+                self.player.balance - start_balance,
+                wins=self.player.wins - start_wins,
+                losses=self.player.losses - start_losses,
+                ties=self.player.ties,
+            )
+            self.renderer.message("Player data updated successfully.")
         except Exception as e:
             print(f"Error updating player data: {e}")
 
 def main():
-    # Allow optional output file as command-line argument
-    output_file = sys.argv[1] if len(sys.argv) > 1 else None
-
-    game = BlackjackGame(output_file)
+    parser = argparse.ArgumentParser(description="Play Blackjack at the terminal.")
+    parser.add_argument('output_file', nargs='?', help="file that session results are appended to")
+    parser.add_argument('--display', choices=sorted(RENDERERS), default='verbose',
+                        help="verbose commentary, one line per round (compact), or prompts only (silent)")
+    args = parser.parse_args()
+
+    # Players live in players.db; players.txt is imported the first time it is created
+    store = SQLitePlayerStore('players.db')
+    if store.created and os.path.exists('players.txt'):
+        store.import_text('players.txt')
+
+    # BLACKJACK_METRICS=<path> records engine metrics and writes them there in Prometheus format
+    metrics_file = os.environ.get('BLACKJACK_METRICS')
+    if metrics_file:
+        instrumentation.enable()
+
+    game = BlackjackGame(args.output_file, store, history_file='hand_history.bin', columns_dir='round_columns',
+                         session_dir='sessions', renderer=RENDERERS[args.display]())
     game.start_game()
 
+    if metrics_file:
+        with open(metrics_file, 'w') as f:
+            f.write(instrumentation.metrics.prometheus())
+
 if __name__ == "__main__":
     try:
         main()
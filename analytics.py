@@ -0,0 +1,58 @@
+# analytics.py
+
+"""Aggregates over a column store written by `round_columns.ColumnWriter`.
+
+Group-bys are vectorized with `numpy.bincount` over the memory-mapped
+columns, optionally restricted to a row slice, so nothing is parsed and
+large stores are read straight from the page cache.
+"""
+
+from hand_history import OUTCOMES
+from game_engine import BUST
+from round_columns import open_columns, ACTIONS, NO_ACTION, np
+
+GROUP_KEYS = ('player', 'upcard', 'first_action')
+_BUST_CODE = OUTCOMES.index(BUST)
+
+
+def group_stats(columns, by, rows=slice(None)):
+    """Hands, win rate, EV per unit bet and bust rate for each value of column `by`.
+
+    Returns a dict keyed by player name, upcard rank or action name.
+    """
+    if by not in GROUP_KEYS:
+        raise ValueError(f"Cannot group by '{by}'; choose one of {', '.join(GROUP_KEYS)}.")
+    keys = np.asarray(columns[by][rows], dtype=np.intp)
+    net = columns['net'][rows]
+    bet = columns['bet'][rows]
+    outcome = columns['outcome'][rows]
+
+    hands = np.bincount(keys)
+    wins = np.bincount(keys, weights=net > 0, minlength=len(hands))
+    busts = np.bincount(keys, weights=outcome == _BUST_CODE, minlength=len(hands))
+    total_net = np.bincount(keys, weights=net, minlength=len(hands))
+    total_bet = np.bincount(keys, weights=bet, minlength=len(hands))
+
+    results = {}
+    for key in np.flatnonzero(hands):
+        results[_label(columns, by, key)] = {
+            'hands': int(hands[key]),
+            'win_rate': float(wins[key] / hands[key]),
+            'ev': float(total_net[key] / total_bet[key]) if total_bet[key] else 0.0,
+            'bust_rate': float(busts[key] / hands[key]),
+        }
+    return results
+
+
+def _label(columns, by, key):
+    if by == 'player':
+        return columns.players[key]
+    if by == 'first_action':
+        return None if key == NO_ACTION else ACTIONS[key]
+    return int(key)
+
+
+def summary(directory):
+    """Group stats by every key for the store in `directory`."""
+    columns = open_columns(directory)
+    return {by: group_stats(columns, by) for by in GROUP_KEYS}
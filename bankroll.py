@@ -0,0 +1,160 @@
+# bankroll.py
+
+"""Risk of ruin for a bankroll, simulated as many trajectories in parallel.
+
+Each round's result is drawn from the game's own distribution of net
+results per unit bet, measured by playing rounds through `BlackjackEngine`
+with a strategy (basic strategy by default), so 3:2 blackjacks, doubles and
+splits all appear at their real frequencies. Trajectories are NumPy arrays
+advanced one round at a time:
+
+    python bankroll.py 1000 25 --rounds 2000
+
+A trajectory is ruined once its balance falls below the table minimum.
+When the balance is below the chosen bet but still covers the minimum, the
+player bets what is left. The outcome distribution assumes doubles and
+splits are always affordable.
+
+NumPy is optional for the rest of the game but required here.
+"""
+
+import argparse
+import random
+import time
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without NumPy
+    np = None
+
+from card_deck_classes import Deck
+from game_engine import BlackjackEngine
+from player_hand_classes import Player
+from rules import DEFAULT_RULES, resolve
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("bankroll requires NumPy (pip install numpy).")
+
+
+class OutcomeDistribution:
+    """Net results per unit bet and their probabilities."""
+
+    def __init__(self, values, probabilities):
+        self.values = np.asarray(values, dtype=np.float64)
+        self.probabilities = np.asarray(probabilities, dtype=np.float64)
+        self._cumulative = np.cumsum(self.probabilities)
+        self._cumulative[-1] = 1.0
+
+    @property
+    def mean(self):
+        return float(self.values @ self.probabilities)
+
+    @property
+    def variance(self):
+        return float(((self.values - self.mean) ** 2) @ self.probabilities)
+
+    def sample(self, rng, size):
+        """Draw `size` results by inverting the cumulative distribution."""
+        return self.values[np.searchsorted(self._cumulative, rng.random(size), side='right')]
+
+
+def outcome_distribution(rounds=100000, strategy=None, seed=0, num_decks=None, penetration=None, rules=None):
+    """Play `rounds` rounds at a unit bet under `rules` and tabulate the net result of each."""
+    _require_numpy()
+    rules = resolve(rules, num_decks=num_decks, penetration=penetration)
+    if strategy is None:
+        from basic_strategy import strategy_for
+        strategy = strategy_for(rules)
+    engine = BlackjackEngine(Deck.for_rules(rules, rng=random.Random(seed)), rules=rules)
+    player = Player('Bankroll', float('inf'), 0)
+    counts = Counter(engine.play_round(player, 1, strategy).net for _ in range(rounds))
+    values = sorted(counts)
+    return OutcomeDistribution(values, [counts[value] / rounds for value in values])
+
+
+class BankrollResult:
+    """Final balances and session lengths of every simulated trajectory."""
+
+    def __init__(self, final_balances, rounds_played, ruined, rounds):
+        self.final_balances = final_balances
+        self.rounds_played = rounds_played
+        self.ruined = ruined
+        self.rounds = rounds
+
+    @property
+    def trajectories(self):
+        return len(self.final_balances)
+
+    @property
+    def risk_of_ruin(self):
+        return float(self.ruined.mean())
+
+    @property
+    def median_rounds(self):
+        """Median number of rounds played, counting survivors as the full horizon."""
+        return float(np.median(self.rounds_played))
+
+    def percentiles(self, percentiles=PERCENTILES):
+        """Final balance at each percentile."""
+        return {p: float(value) for p, value in zip(percentiles, np.percentile(self.final_balances, percentiles))}
+
+    def as_dict(self):
+        return {
+            'trajectories': self.trajectories,
+            'rounds': self.rounds,
+            'risk_of_ruin': self.risk_of_ruin,
+            'median_rounds': self.median_rounds,
+            'balance_percentiles': self.percentiles(),
+        }
+
+
+def simulate_bankrolls(balance, bet, rounds, trajectories=10000, distribution=None,
+                       min_bet=DEFAULT_RULES.min_bet, max_bet=DEFAULT_RULES.max_bet, seed=None):
+    """Simulate `trajectories` sessions of up to `rounds` flat bets. Returns a BankrollResult."""
+    _require_numpy()
+    if bet < min_bet or bet > max_bet:
+        raise ValueError(f"Bet must be between ${min_bet} and ${max_bet}.")
+    if distribution is None:
+        distribution = outcome_distribution()
+    rng = np.random.default_rng(seed)
+
+    balances = np.full(trajectories, float(balance))
+    rounds_played = np.zeros(trajectories, dtype=np.int64)
+    active = np.flatnonzero(balances >= min_bet)
+    for _ in range(rounds):
+        if not len(active):
+            break
+        current = balances[active]
+        wagers = np.minimum(current, bet)
+        current = np.maximum(current + wagers * distribution.sample(rng, len(active)), 0.0)
+        balances[active] = current
+        rounds_played[active] += 1
+        active = active[current >= min_bet]
+
+    return BankrollResult(balances, rounds_played, balances < min_bet, rounds)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Estimate risk of ruin for a bankroll.")
+    parser.add_argument('balance', type=float)
+    parser.add_argument('bet', type=float)
+    parser.add_argument('--rounds', type=int, default=1000)
+    parser.add_argument('--trajectories', type=int, default=10000)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    distribution = outcome_distribution()
+    result = simulate_bankrolls(args.balance, args.bet, args.rounds, args.trajectories, distribution,
+                                seed=args.seed)
+    print(f"Expected result per unit bet: {distribution.mean:+.4f} (variance {distribution.variance:.3f})")
+    print(f"Risk of ruin within {args.rounds} rounds: {result.risk_of_ruin:.2%}")
+    print(f"Median session length: {result.median_rounds:.0f} rounds")
+    for p, value in result.percentiles().items():
+        print(f"{p:>3}th percentile balance: ${value:,.2f}")
+    print(f"{result.trajectories} trajectories in {time.perf_counter() - start:.2f}s")
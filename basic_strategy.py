@@ -0,0 +1,158 @@
+# basic_strategy.py
+
+"""Table-driven basic strategy.
+
+The decision tables are generated from `EVSolver`, so they follow this
+game's rules (dealer hits soft 17, split on equal `Card.rank`, split 21s pay
+3:2), and are stored in `basic_strategy.bin` as one byte per cell. Each
+lookup is a single index into that blob. Run this module to regenerate it:
+
+    python basic_strategy.py [num_decks]
+
+The stored tables are for the default rules; `strategy_for` generates
+tables for any other rule set.
+"""
+
+import os
+import sys
+from functools import lru_cache
+
+from dealer_probabilities import full_composition, remove_cards
+from ev_solver import EVSolver
+from game_engine import Strategy, HIT, STAND, DOUBLE, SPLIT, SURRENDER
+from rules import DEFAULT_RULES
+
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'basic_strategy.bin')
+MAGIC = b'BJBS'
+VERSION = 1
+
+# Cell codes
+CODE_STAND = 0
+CODE_HIT = 1
+CODE_DOUBLE_OR_HIT = 2
+CODE_DOUBLE_OR_STAND = 3
+CODE_SPLIT = 4
+CODE_SURRENDER_OR_HIT = 5
+CODE_SURRENDER_OR_STAND = 6
+
+UPCARDS = range(2, 12)
+HARD_TOTALS = range(4, 22)
+SOFT_TOTALS = range(12, 22)
+PAIR_RANKS = range(2, 12)
+
+# Layout of the blob after the header: hard rows, then soft rows, then pair rows
+HARD_OFFSET = 0
+SOFT_OFFSET = HARD_OFFSET + len(HARD_TOTALS) * len(UPCARDS)
+PAIR_OFFSET = SOFT_OFFSET + len(SOFT_TOTALS) * len(UPCARDS)
+TABLE_SIZE = PAIR_OFFSET + len(PAIR_RANKS) * len(UPCARDS)
+
+
+def _code_for(evs):
+    """Pick the cell code for a hand from its action EVs (split excluded)."""
+    play = HIT if evs.get(HIT, float('-inf')) > evs[STAND] else STAND
+    if SURRENDER in evs and evs[SURRENDER] > max(ev for action, ev in evs.items() if action not in (SPLIT, SURRENDER)):
+        return CODE_SURRENDER_OR_HIT if play == HIT else CODE_SURRENDER_OR_STAND
+    if DOUBLE in evs and evs[DOUBLE] > evs[play]:
+        return CODE_DOUBLE_OR_HIT if play == HIT else CODE_DOUBLE_OR_STAND
+    return CODE_HIT if play == HIT else CODE_STAND
+
+
+def generate_tables(num_decks=None, solver=None):
+    """Build the decision blob from the EV solver.
+
+    With `num_decks` the EVs use a fresh shoe of that size less the player's
+    cards and upcard; otherwise an infinite deck.
+    """
+    solver = solver or EVSolver()
+    shoe = full_composition(num_decks) if num_decks else None
+
+    def evaluate(ranks, upcard):
+        composition = remove_cards(shoe, list(ranks) + [upcard]) if shoe else None
+        return solver.evaluate(ranks, upcard, composition)
+
+    cells = bytearray(TABLE_SIZE)
+    for row, total in enumerate(HARD_TOTALS):
+        ranks = [2, total - 2] if total <= 12 else [total - 10, 10]
+        for col, upcard in enumerate(UPCARDS):
+            cells[HARD_OFFSET + row * len(UPCARDS) + col] = _code_for(evaluate(ranks, upcard))
+    for row, total in enumerate(SOFT_TOTALS):
+        ranks = [11, total - 11] if total > 12 else [11, 11]
+        for col, upcard in enumerate(UPCARDS):
+            cells[SOFT_OFFSET + row * len(UPCARDS) + col] = _code_for(evaluate(ranks, upcard))
+    for row, rank in enumerate(PAIR_RANKS):
+        for col, upcard in enumerate(UPCARDS):
+            evs = evaluate([rank, rank], upcard)
+            split = SPLIT in evs and evs[SPLIT] > max(ev for action, ev in evs.items() if action != SPLIT)
+            cells[PAIR_OFFSET + row * len(UPCARDS) + col] = CODE_SPLIT if split else _code_for(evs)
+    return bytes(cells)
+
+
+def save_tables(cells, path=TABLE_FILE, num_decks=0):
+    """Write a decision blob with its header."""
+    with open(path, 'wb') as f:
+        f.write(MAGIC + bytes([VERSION, num_decks or 0]) + cells)
+
+
+def load_tables(path=TABLE_FILE):
+    """Read a decision blob. Returns (cells, num_decks); 0 decks means infinite."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:4] != MAGIC or data[4] != VERSION or len(data) != 6 + TABLE_SIZE:
+        raise ValueError(f"'{path}' is not a basic strategy table.")
+    return data[6:], data[5]
+
+
+class BasicStrategy(Strategy):
+    """Plays basic strategy from the precomputed tables."""
+
+    def __init__(self, cells=None, path=TABLE_FILE):
+        if cells is None:
+            cells, _ = load_tables(path)
+        self.cells = cells
+
+    def code(self, hand, upcard_rank):
+        """Table cell for a hand against an upcard rank, ignoring splits."""
+        col = upcard_rank - 2
+        value = hand.value
+        if value != hand.hard_total:
+            return self.cells[SOFT_OFFSET + (value - 12) * 10 + col]
+        return self.cells[HARD_OFFSET + (max(value, 4) - 4) * 10 + col]
+
+    def decide(self, player, hand, dealer_upcard, actions):
+        col = dealer_upcard.rank - 2
+        if SPLIT in actions and self.cells[PAIR_OFFSET + (hand.cards[0].rank - 2) * 10 + col] == CODE_SPLIT:
+            return SPLIT
+        code = self.code(hand, dealer_upcard.rank)
+        if code == CODE_HIT:
+            return HIT
+        if code == CODE_STAND:
+            return STAND
+        if code in (CODE_SURRENDER_OR_HIT, CODE_SURRENDER_OR_STAND):
+            if SURRENDER in actions:
+                return SURRENDER
+            return HIT if code == CODE_SURRENDER_OR_HIT else STAND
+        if DOUBLE in actions:
+            return DOUBLE
+        return HIT if code == CODE_DOUBLE_OR_HIT else STAND
+
+
+# Rules that do not change a decision, reset before strategies are memoized
+_UNUSED_RULES = ('penetration', 'min_bet', 'max_bet')
+
+
+def strategy_for(rules=DEFAULT_RULES):
+    """BasicStrategy for a rule set: the stored tables for the defaults, otherwise generated once."""
+    return _strategy_for(rules.replace(**{name: getattr(DEFAULT_RULES, name) for name in _UNUSED_RULES}))
+
+
+@lru_cache(maxsize=None)
+def _strategy_for(rules):
+    if rules == DEFAULT_RULES:
+        return BasicStrategy()
+    return BasicStrategy(generate_tables(rules.num_decks, EVSolver(rules=rules)))
+
+
+if __name__ == '__main__':
+    decks = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    save_tables(generate_tables(decks), num_decks=decks)
+    print(f"Basic strategy for {decks} decks written to {TABLE_FILE}")
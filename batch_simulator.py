@@ -0,0 +1,167 @@
+# batch_simulator.py
+
+"""Vectorized simulation of many independent rounds with NumPy.
+
+Every round gets its own freshly shuffled shoe. Cards are drawn column by
+column (the k-th card of every round at once) only as far as some round
+needs them. The player follows a fixed "hit below N" rule, like
+`game_engine.ThresholdStrategy`, and hand totals, dealer play and settlement
+follow `Hand`, `BlackjackEngine.dealer_turn` and `game_engine.settle_hand`.
+
+NumPy is optional for the rest of the game but required here.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without NumPy
+    np = None
+
+from dealer_probabilities import full_composition
+from game_engine import BLACKJACK_PAYOUT
+from simulation_runner import SimulationStats
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError("batch_simulator requires NumPy (pip install numpy).")
+
+
+class BatchShoe:
+    """A fresh shoe for each of `rounds` rounds, dealt lazily as card ranks (2-11)."""
+
+    def __init__(self, rounds, num_decks=6, rng=None):
+        _require_numpy()
+        self.rounds = rounds
+        self.rng = rng if rng is not None else np.random.default_rng()
+        # One row per rank so each rank's counts are contiguous across rounds
+        self._counts = np.repeat(np.array(full_composition(num_decks), dtype=np.int32)[:, None], rounds, axis=1)
+        self._remaining = self._counts.sum(axis=0)
+        self._dealt = np.empty((rounds, 16), dtype=np.int8)
+        self._drawn = 0
+        self._rows = np.arange(rounds)
+
+    def _draw_column(self):
+        if self._remaining[0] == 0:
+            raise ValueError("The shoe ran out of cards.")
+        target = (self.rng.random(self.rounds) * self._remaining).astype(np.int32)
+        running = np.zeros(self.rounds, dtype=np.int32)
+        index = np.zeros(self.rounds, dtype=np.int32)
+        for counts in self._counts[:-1]:
+            running += counts
+            index += running <= target
+        self._counts[index, self._rows] -= 1
+        self._remaining -= 1
+        if self._drawn == self._dealt.shape[1]:
+            self._dealt = np.concatenate([self._dealt, np.empty_like(self._dealt)], axis=1)
+        self._dealt[:, self._drawn] = index + 2
+        self._drawn += 1
+
+    def cards(self, positions):
+        """Rank of the card at `positions[i]` in round i's shoe."""
+        needed = int(positions.max()) + 1
+        while self._drawn < needed:
+            self._draw_column()
+        return self._dealt[self._rows, positions]
+
+    def dealt(self):
+        """Matrix of every card drawn so far, one row per round."""
+        return self._dealt[:, :self._drawn]
+
+
+def _add_cards(hard, aces, ranks, mask=None):
+    is_ace = ranks == 11
+    drawn = np.where(is_ace, 1, ranks)
+    if mask is None:
+        return hard + drawn, aces + is_ace
+    return hard + np.where(mask, drawn, 0), aces + (is_ace & mask)
+
+
+def _values(hard, aces):
+    return np.where((aces > 0) & (hard <= 11), hard + 10, hard)
+
+
+class BatchResult:
+    """Per-round results of a batch."""
+
+    def __init__(self, net, player_values, dealer_values, cards, cards_used):
+        self.net = net  # in units of the bet
+        self.player_values = player_values
+        self.dealer_values = dealer_values
+        self.cards = cards
+        self.cards_used = cards_used
+
+    def stats(self, bet=1):
+        """Summarize the batch as SimulationStats for a flat `bet`."""
+        stats = SimulationStats()
+        stats.rounds = stats.hands = len(self.net)
+        stats.wins = int((self.net > 0).sum())
+        stats.losses = int((self.net < 0).sum())
+        stats.ties = stats.rounds - stats.wins - stats.losses
+        stats.wagered = float(stats.rounds * bet)
+        stats.net = float(self.net.sum() * bet)
+        return stats
+
+
+def simulate_batch(rounds, stand_on=17, num_decks=6, rng=None):
+    """Play `rounds` independent rounds in one vectorized pass. Returns a BatchResult."""
+    shoe = BatchShoe(rounds, num_decks, rng)
+    zeros = np.zeros(rounds, dtype=np.int32)
+    position = np.full(rounds, 4, dtype=np.int32)
+
+    # Opening cards in the engine's order: player, player, dealer, dealer
+    player_hard, player_aces = _add_cards(zeros, zeros, shoe.cards(zeros))
+    player_hard, player_aces = _add_cards(player_hard, player_aces, shoe.cards(zeros + 1))
+    dealer_hard, dealer_aces = _add_cards(zeros, zeros, shoe.cards(zeros + 2))
+    dealer_hard, dealer_aces = _add_cards(dealer_hard, dealer_aces, shoe.cards(zeros + 3))
+    player_cards = np.full(rounds, 2, dtype=np.int32)
+    dealer_cards = np.full(rounds, 2, dtype=np.int32)
+
+    # Player hits below the threshold; 21 always stands
+    while True:
+        value = _values(player_hard, player_aces)
+        hitting = (value < stand_on) & (value < 21)
+        if not hitting.any():
+            break
+        player_hard, player_aces = _add_cards(player_hard, player_aces, shoe.cards(position), hitting)
+        player_cards += hitting
+        position += hitting
+
+    # Dealer hits on 16 or less and on soft 17
+    while True:
+        value = _values(dealer_hard, dealer_aces)
+        soft = (dealer_aces > 0) & (dealer_hard + 10 * dealer_aces <= 21)
+        hitting = (value < 17) | ((value == 17) & soft)
+        if not hitting.any():
+            break
+        dealer_hard, dealer_aces = _add_cards(dealer_hard, dealer_aces, shoe.cards(position), hitting)
+        dealer_cards += hitting
+        position += hitting
+
+    player_value = _values(player_hard, player_aces)
+    dealer_value = _values(dealer_hard, dealer_aces)
+    player_blackjack = (player_cards == 2) & (player_value == 21)
+    dealer_blackjack = (dealer_cards == 2) & (dealer_value == 21)
+    net = np.select(
+        [
+            player_blackjack & ~dealer_blackjack,
+            ~player_blackjack & dealer_blackjack,
+            player_value > 21,
+            dealer_value > 21,
+            player_value > dealer_value,
+            player_value < dealer_value,
+        ],
+        [BLACKJACK_PAYOUT, -1.0, -1.0, 1.0, 1.0, -1.0],
+        default=0.0,
+    )
+    return BatchResult(net, player_value, dealer_value, shoe.dealt(), position)
+
+
+def simulate(rounds, stand_on=17, num_decks=6, bet=1, seed=None, batch_size=100000):
+    """Simulate `rounds` rounds in batches and return SimulationStats."""
+    _require_numpy()
+    rng = np.random.default_rng(seed)
+    stats = SimulationStats()
+    while stats.rounds < rounds:
+        size = min(batch_size, rounds - stats.rounds)
+        stats.merge(simulate_batch(size, stand_on, num_decks, rng).stats(bet))
+    return stats
@@ -0,0 +1,259 @@
+# benchmarks.py
+
+"""Throughput benchmarks for the hot paths, with stored baselines.
+
+Each benchmark reports operations per second, the best of several timed
+repeats. Results are compared with `benchmarks.json` and any benchmark that
+runs more than `--threshold` (default 20%) slower than its baseline, even
+after being measured again, is reported as a regression with exit status 1:
+
+    python benchmarks.py                  # run and compare
+    python benchmarks.py --save           # record the current machine's baselines
+    python benchmarks.py session dealer   # run only benchmarks whose names contain these words
+
+Baselines are machine specific; re-record them with --save on the machine
+that runs the comparison.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+from basic_strategy import BasicStrategy
+from card_deck_classes import Card, Deck
+from game_engine import BlackjackEngine
+from player_hand_classes import Hand, Player
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks.json')
+THRESHOLD = 0.2
+
+
+def _deck_construction():
+    rng = random.Random(1)
+
+    def run():
+        Deck(rng=rng)
+    return run, 1
+
+
+def _deck_deal():
+    deck = Deck(rng=random.Random(1))
+
+    def run():
+        deck.reshuffle_if_needed()
+        for _ in range(100):
+            deck.deal()
+    return run, 100
+
+
+def _lazy_deck_deal():
+    deck = Deck(rng=random.Random(1), lazy_shuffle=True)
+
+    def run():
+        deck.reshuffle_if_needed()
+        for _ in range(100):
+            deck.deal()
+    return run, 100
+
+
+def _lazy_deck_shoe():
+    deck = Deck(rng=random.Random(1), lazy_shuffle=True)
+    cut = deck.cut_card_position
+
+    def run():
+        deck.reshuffle()
+        for _ in range(cut):
+            deck.deal()
+    return run, 1
+
+
+def _eager_deck_shoe():
+    deck = Deck(rng=random.Random(1))
+    cut = deck.cut_card_position
+
+    def run():
+        deck.reshuffle()
+        for _ in range(cut):
+            deck.deal()
+    return run, 1
+
+
+def _hand_evaluation():
+    deck = Deck(rng=random.Random(1))
+    draws = [deck.deal() for _ in range(3000)]
+
+    def run():
+        for i in range(0, 3000, 3):
+            hand = Hand()
+            hand.add_card(draws[i])
+            hand.add_card(draws[i + 1])
+            hand.add_card(draws[i + 2])
+            hand.calculate_value()
+            hand.is_soft_hand()
+    return run, 1000
+
+
+def _split_hand():
+    eight = Card('Spades', '8')
+    player = Player('Bench', float('inf'), 0)
+
+    def run():
+        for _ in range(100):
+            player.reset_hands()
+            hand = player.place_bet(10)
+            hand.add_card(eight)
+            hand.add_card(eight)
+            player.split_hand(hand)
+    return run, 100
+
+
+def _dealer_play():
+    engine = BlackjackEngine(Deck(rng=random.Random(1)))
+
+    def run():
+        for _ in range(100):
+            engine.deck.reshuffle_if_needed()
+            dealer_hand = Hand()
+            dealer_hand.add_card(engine.deck.deal())
+            dealer_hand.add_card(engine.deck.deal())
+            engine.dealer_turn(dealer_hand)
+    return run, 100
+
+
+def _settlement():
+    deck = Deck(rng=random.Random(1))
+    engine = BlackjackEngine(deck)
+    dealer_hand = Hand()
+    dealer_hand.add_card(Card('Hearts', '10'))
+    dealer_hand.add_card(Card('Hearts', '8'))
+    players = [Player(f'Seat {seat}', float('inf'), 0) for seat in range(7)]
+    cards = [deck.deal() for _ in range(2 * len(players))]
+
+    def run():
+        for _ in range(100):
+            for seat, player in enumerate(players):
+                player.reset_hands()
+                hand = player.place_bet(10)
+                hand.add_card(cards[2 * seat])
+                hand.add_card(cards[2 * seat + 1])
+            engine.settle_seats(players, dealer_hand)
+    return run, 100 * len(players)
+
+
+def _session():
+    engine = BlackjackEngine(Deck(rng=random.Random(1)))
+    player = Player('Bench', float('inf'), 0)
+    strategy = BasicStrategy()
+
+    def run():
+        engine.run_session(player, strategy, 10, 1000)
+    return run, 1000
+
+
+def _table_session():
+    engine = BlackjackEngine(Deck(rng=random.Random(1)))
+    strategy = BasicStrategy()
+    seats = [(Player(f'Seat {seat}', float('inf'), 0), 10, strategy) for seat in range(7)]
+
+    def run():
+        for _ in range(100):
+            engine.play_table_round(seats)
+    return run, 100 * len(seats)
+
+
+# Name -> setup function returning (callable, operations per call)
+BENCHMARKS = {
+    'deck_construction': _deck_construction,
+    'deck_deal': _deck_deal,
+    'lazy_deck_deal': _lazy_deck_deal,
+    'eager_shoe_to_cut': _eager_deck_shoe,
+    'lazy_shoe_to_cut': _lazy_deck_shoe,
+    'hand_evaluation': _hand_evaluation,
+    'split_hand': _split_hand,
+    'dealer_play': _dealer_play,
+    'settlement': _settlement,
+    'session_rounds': _session,
+    'table_session_rounds': _table_session,
+}
+
+
+def measure(setup, min_time=0.2, repeat=5):
+    """Best operations per second over `repeat` runs of at least `min_time` seconds each."""
+    run, ops = setup()
+    timer = timeit.Timer(run)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time:
+            break
+        number = max(number * 2, int(number * min_time / elapsed * 1.1)) if elapsed else number * 10
+    best = min([elapsed] + timer.repeat(repeat - 1, number))
+    return number * ops / best
+
+
+def run_benchmarks(names=None, min_time=0.2, repeat=5):
+    """Measure the named benchmarks (all by default). Returns {name: ops per second}."""
+    return {name: measure(BENCHMARKS[name], min_time, repeat) for name in (names or BENCHMARKS)}
+
+
+def load_baselines(path=BASELINE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baselines(results, path=BASELINE_FILE):
+    baselines = load_baselines(path)
+    baselines.update({name: round(rate, 1) for name, rate in results.items()})
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def regressions(results, baselines, threshold=THRESHOLD):
+    """(name, baseline, current) for every result more than `threshold` slower than its baseline."""
+    return [
+        (name, baselines[name], rate)
+        for name, rate in results.items()
+        if name in baselines and rate < baselines[name] * (1 - threshold)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Blackjack hot paths.")
+    parser.add_argument('names', nargs='*', help="only run benchmarks whose names contain these words")
+    parser.add_argument('--save', action='store_true', help="store the results as the new baselines")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="allowed slowdown as a fraction of the baseline (default 0.2)")
+    parser.add_argument('--baselines', default=BASELINE_FILE)
+    parser.add_argument('--min-time', type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    names = [name for name in BENCHMARKS if not args.names or any(word in name for word in args.names)]
+    baselines = load_baselines(args.baselines)
+    results = {}
+    for name in names:
+        results[name] = measure(BENCHMARKS[name], args.min_time)
+        baseline = baselines.get(name)
+        change = f"{results[name] / baseline - 1:+.1%}" if baseline else "no baseline"
+        print(f"{name:22} {results[name]:>14,.0f} ops/s  {change}")
+
+    if args.save:
+        save_baselines(results, args.baselines)
+        print(f"Baselines saved to {args.baselines}")
+        return 0
+    # Re-measure suspected regressions once so a noisy run is not reported
+    for name, _, _ in regressions(results, baselines, args.threshold):
+        results[name] = max(results[name], measure(BENCHMARKS[name], args.min_time, repeat=10))
+    slow = regressions(results, baselines, args.threshold)
+    for name, baseline, rate in slow:
+        print(f"REGRESSION {name}: {rate:,.0f} ops/s vs baseline {baseline:,.0f}")
+    return 1 if slow else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
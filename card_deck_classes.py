@@ -2,14 +2,24 @@
 
 import random
 import logging
+from array import array
+from instrumentation import metrics, timed
+from rules import DEFAULT_RULES
 
 class Card:
-    """Represents a single playing card."""
+    """Represents a single playing card.
+
+    Each card also carries a small integer `code` (value index * 4 + suit
+    index, 0-51) so shoes can be stored as a compact byte array.
+    """
+
+    __slots__ = ('suit', 'value', 'rank', 'code')
 
     def __init__(self, suit, value):
         self.suit = suit
         self.value = value  # '2', '3', ..., '10', 'Jack', 'Queen', 'King', 'Ace'
         self.rank = self._get_rank()
+        self.code = Deck.VALUES.index(value) * 4 + Deck.SUITS.index(suit)
 
     def _get_rank(self):
         """Convert card value to its rank for Blackjack scoring."""
@@ -20,39 +30,222 @@ class Card:
         else:
             return int(self.value)
 
+    @staticmethod
+    def from_code(code):
+        """Return the shared Card instance for a card code."""
+        return CARDS[code]
+
     def __str__(self):
         return f"{self.value} of {self.suit}"
 
+class _RemainingCards:
+    """Read-only view of the cards still in a shoe, in dealing order."""
+
+    __slots__ = ('_codes', '_start')
+
+    def __init__(self, codes, start):
+        self._codes = codes
+        self._start = start
+
+    def __len__(self):
+        return len(self._codes) - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [CARDS[code] for code in self._codes[self._start:][index]]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("card index out of range")
+        return CARDS[self._codes[self._start + index]]
+
+    def __iter__(self):
+        for code in self._codes[self._start:]:
+            yield CARDS[code]
+
 class Deck:
-    """Represents a multi-deck shoe used in casino Blackjack."""
+    """Represents a multi-deck shoe used in casino Blackjack.
+
+    The shoe is an array of card codes (one byte per card) and dealing
+    advances an index into it, so reshuffling never allocates Card objects.
+    Dealing also keeps the remaining composition by rank and the running
+    count up to date, and shuffling resets them.
+    """
 
     SUITS = ['Hearts', 'Diamonds', 'Clubs', 'Spades']
     VALUES = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'Jack', 'Queen', 'King', 'Ace']
 
-    def __init__(self, num_decks=6):
-        """Initialize a shoe with multiple decks."""
+    def __init__(self, num_decks=DEFAULT_RULES.num_decks, penetration=DEFAULT_RULES.penetration, cut_card=None,
+                 rng=None, count_system='hi-lo', lazy_shuffle=False):
+        """Initialize a shoe with multiple decks.
+
+        The cut card sits after `cut_card` cards, or after `penetration` of the
+        shoe when no explicit position is given. `rng` is a `random.Random`
+        used for shuffling; the global `random` module is used by default.
+        `count_system` is a name from COUNT_SYSTEMS or a tuple of ten tags
+        for ranks 2-9, ten-valued cards and Aces.
+
+        With `lazy_shuffle` the shoe is not shuffled up front: each deal swaps
+        a uniformly chosen undealt card into the next position (one step of a
+        Fisher-Yates shuffle), so reshuffling only resets the position and
+        cards behind the cut card never cost a random draw.
+        """
+        if isinstance(count_system, str):
+            if count_system not in COUNT_SYSTEMS:
+                raise ValueError(f"Unknown count system '{count_system}'; choose one of {', '.join(COUNT_SYSTEMS)}.")
+            count_system = COUNT_SYSTEMS[count_system]
+        if len(count_system) != 10:
+            raise ValueError("A count system needs one tag for each of the ten ranks.")
+        self.count_system = tuple(count_system)
+        self.running_count = 0
+        self._remaining = [0] * 10
         self.num_decks = num_decks
-        self.cards = []
+        self.rng = rng or random
+        self.lazy_shuffle = lazy_shuffle
+        if lazy_shuffle:
+            self._randbelow = getattr(self.rng, '_randbelow', None) or self.rng.randrange
+        self.penetration = penetration
+        self.cut_card = cut_card
+        self.cut_card_reached = False
+        self.shuffle_count = 0
+        self._reshuffle_listeners = []
+        self._shoe = array('B')
+        self._position = 0
         self._create_shoe()
 
+    @classmethod
+    def for_rules(cls, rules, **kwargs):
+        """A shoe with the number of decks and penetration from a Rules object."""
+        return cls(rules.num_decks, penetration=rules.penetration, **kwargs)
+
+    @property
+    def cards(self):
+        """The cards left in the shoe, next card first.
+
+        A lazy shoe has not drawn its remaining cards yet, so for it this is
+        only the set of cards left, not their dealing order.
+        """
+        return _RemainingCards(self._shoe, self._position)
+
+    @property
+    def total_cards(self):
+        return self.num_decks * len(self.SUITS) * len(self.VALUES)
+
+    @property
+    def cut_card_position(self):
+        """Number of cards dealt before the cut card comes out."""
+        if self.cut_card is not None:
+            return min(self.cut_card, self.total_cards)
+        return int(self.total_cards * self.penetration)
+
+    @property
+    def cards_dealt(self):
+        return self._position
+
+    def composition(self):
+        """Counts of the remaining cards by rank, indexed by `rank - 2`."""
+        return tuple(self._remaining)
+
+    def full_composition(self):
+        """Counts by rank of a freshly shuffled shoe."""
+        return (4 * self.num_decks,) * 8 + (16 * self.num_decks, 4 * self.num_decks)
+
+    @property
+    def decks_remaining(self):
+        return (len(self._shoe) - self._position) / 52
+
+    @property
+    def true_count(self):
+        """Running count per deck left in the shoe."""
+        decks = self.decks_remaining
+        return self.running_count / decks if decks else 0.0
+
+    def count_with(self, count_system):
+        """Running count under another system's tags, from the dealt composition."""
+        return sum(tag * (full - left)
+                   for tag, full, left in zip(count_system, self.full_composition(), self._remaining))
+
+    def add_reshuffle_listener(self, callback):
+        """Call `callback(deck)` every time the shoe is reshuffled."""
+        self._reshuffle_listeners.append(callback)
+
+    @timed('shoe_creation')
     def _create_shoe(self):
         """Create a shoe with multiple decks and shuffle it."""
-        self.cards = []
-        for _ in range(self.num_decks):
-            for suit in self.SUITS:
-                for value in self.VALUES:
-                    self.cards.append(Card(suit, value))
+        if metrics.enabled:
+            metrics.count('shoes_created')
+        # A lazy shoe still holds every card, in some order, so it is reused as is
+        if not (self.lazy_shuffle and len(self._shoe) == len(CARDS) * self.num_decks):
+            self._shoe = array('B', range(len(CARDS))) * self.num_decks
+        self._cut_position = self.cut_card_position
         self.shuffle()
 
     def shuffle(self):
-        """Shuffle the entire shoe."""
-        random.shuffle(self.cards)
+        """Shuffle the entire shoe, or for a lazy shoe start drawing from all of it again."""
+        if not self.lazy_shuffle:
+            self.rng.shuffle(self._shoe)
+        self._position = 0
+        self.cut_card_reached = False
+        self._remaining = list(self.full_composition())
+        self.running_count = 0
+
+    def reshuffle(self):
+        """Gather every card back into the shoe and shuffle."""
+        logging.info("Reshuffling the shoe...")
+        if metrics.enabled:
+            metrics.count('reshuffles')
+        self._create_shoe()
+        self.shuffle_count += 1
+        for callback in self._reshuffle_listeners:
+            callback(self)
+
+    def reshuffle_if_needed(self):
+        """Reshuffle between rounds once the cut card has come out."""
+        if self.cut_card_reached:
+            self.reshuffle()
+            return True
+        return False
+
+    def deal_code(self):
+        """Deal a single card from the shoe and return its code.
+
+        Reaching the cut card only flags the shoe; the round in progress keeps
+        dealing and the reshuffle happens in `reshuffle_if_needed`. An empty
+        shoe is reshuffled immediately.
+        """
+        if self._position >= len(self._shoe):
+            self.reshuffle()
+        position = self._position
+        shoe = self._shoe
+        if self.lazy_shuffle:
+            swap = position + self._randbelow(len(shoe) - position)
+            shoe[position], shoe[swap] = shoe[swap], shoe[position]
+        code = shoe[position]
+        self._position = position + 1
+        rank_index = CODE_RANKS[code]
+        self._remaining[rank_index] -= 1
+        self.running_count += self.count_system[rank_index]
+        if metrics.enabled:
+            metrics.count('cards_dealt')
+        if self._position >= self._cut_position:
+            self.cut_card_reached = True
+        return code
 
     def deal(self):
         """Deal a single card from the shoe."""
-        total_cards = self.num_decks * len(self.SUITS) * len(self.VALUES)
-        reshuffle_threshold = int(total_cards * 0.25)  # Reshuffle when 25% of the shoe remains
-        if len(self.cards) <= reshuffle_threshold:
-            logging.info("Reshuffling the shoe...")
-            self._create_shoe()
-        return self.cards.pop()
+        return CARDS[self.deal_code()]
+
+# One shared instance per distinct card, indexed by card code
+CARDS = tuple(Card(suit, value) for value in Deck.VALUES for suit in Deck.SUITS)
+# Rank index (rank - 2) of each card code
+CODE_RANKS = bytes(card.rank - 2 for card in CARDS)
+
+# Tags for ranks 2-9, ten-valued cards and Aces
+COUNT_SYSTEMS = {
+    'hi-lo': (1, 1, 1, 1, 1, 0, 0, 0, -1, -1),
+    'ko': (1, 1, 1, 1, 1, 1, 0, 0, -1, -1),
+    'hi-opt-i': (0, 1, 1, 1, 1, 0, 0, 0, -1, 0),
+    'hi-opt-ii': (1, 1, 2, 2, 1, 1, 0, 0, -2, 0),
+    'omega-ii': (1, 1, 2, 2, 2, 1, 0, -1, -2, 0),
+    'zen': (1, 1, 2, 2, 2, 1, 0, 0, -2, -1),
+}
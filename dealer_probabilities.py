@@ -0,0 +1,141 @@
+# dealer_probabilities.py
+
+"""Exact probabilities of the dealer's final hand.
+
+The dealer in `BlackjackEngine.dealer_turn` hits below 17 and, under H17
+rules (the default), on soft 17, so the chance of each final total depends
+only on the upcard, that rule and the cards left in the shoe. Compositions are tuples of ten counts indexed by `rank - 2`
+(2-9, then all ten-value cards, then Aces) and exclude the upcard itself.
+"""
+
+from functools import lru_cache
+
+from rules import DEFAULT_RULES
+
+RANKS = (2, 3, 4, 5, 6, 7, 8, 9, 10, 11)
+OUTCOMES = (17, 18, 19, 20, 21, 'bust', 'blackjack')
+BUST = 5
+BLACKJACK = 6
+
+# Infinite-deck draw probability for each rank
+INFINITE_DECK = tuple(4 / 13 if rank == 10 else 1 / 13 for rank in RANKS)
+
+CACHE_SIZE = 2 ** 17
+
+
+def full_composition(num_decks=DEFAULT_RULES.num_decks):
+    """Counts by rank for a fresh shoe of `num_decks` decks."""
+    return tuple(16 * num_decks if rank == 10 else 4 * num_decks for rank in RANKS)
+
+
+def composition_of(cards):
+    """Counts by rank for an iterable of cards."""
+    counts = [0] * len(RANKS)
+    for card in cards:
+        counts[card.rank - 2] += 1
+    return tuple(counts)
+
+
+def remove_cards(composition, ranks):
+    """Return `composition` with one card of each rank in `ranks` taken out."""
+    counts = list(composition)
+    for rank in ranks:
+        if counts[rank - 2] == 0:
+            raise ValueError(f"No card of rank {rank} left in the composition.")
+        counts[rank - 2] -= 1
+    return tuple(counts)
+
+
+def _add_rank(hard, aces, rank):
+    """Hand state after drawing `rank`; Ace counts above 2 behave like 2."""
+    if rank == 11:
+        return hard + 1, min(aces + 1, 2)
+    return hard + rank, aces
+
+
+def _final_index(hard, aces, num_cards, hits_soft_17):
+    """Outcome index if the dealer stands on this hand, or None if they must draw.
+
+    Mirrors Hand's value/soft rules and `dealer_should_hit`.
+    """
+    value = hard + 10 if aces and hard <= 11 else hard
+    if num_cards == 2 and value == 21:
+        return BLACKJACK
+    soft = aces > 0 and hard + 10 * aces <= 21
+    if value < 17 or (value == 17 and soft and hits_soft_17):
+        return None
+    if value > 21:
+        return BUST
+    return value - 17
+
+
+@lru_cache(maxsize=None)
+def _infinite_from(hard, aces, num_cards, hits_soft_17):
+    final = _final_index(hard, aces, num_cards, hits_soft_17) if num_cards >= 2 else None
+    if final is not None:
+        result = [0.0] * len(OUTCOMES)
+        result[final] = 1.0
+        return tuple(result)
+    result = [0.0] * len(OUTCOMES)
+    next_cards = min(num_cards + 1, 3)
+    for rank, p in zip(RANKS, INFINITE_DECK):
+        sub = _infinite_from(*_add_rank(hard, aces, rank), next_cards, hits_soft_17)
+        for i in range(len(OUTCOMES)):
+            result[i] += p * sub[i]
+    return tuple(result)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _finite_from(hard, aces, num_cards, composition, hits_soft_17):
+    final = _final_index(hard, aces, num_cards, hits_soft_17) if num_cards >= 2 else None
+    result = [0.0] * len(OUTCOMES)
+    if final is not None:
+        result[final] = 1.0
+        return tuple(result)
+    total = sum(composition)
+    if total == 0:
+        raise ValueError("The shoe ran out of cards during the dealer's hand.")
+    next_cards = min(num_cards + 1, 3)
+    for i, count in enumerate(composition):
+        if not count:
+            continue
+        p = count / total
+        remaining = composition[:i] + (count - 1,) + composition[i + 1:]
+        sub = _finite_from(*_add_rank(hard, aces, RANKS[i]), next_cards, remaining, hits_soft_17)
+        for j in range(len(OUTCOMES)):
+            result[j] += p * sub[j]
+    return tuple(result)
+
+
+def dealer_probabilities(upcard, composition=None, hits_soft_17=True):
+    """Probabilities of each entry in OUTCOMES for a dealer showing `upcard`.
+
+    `upcard` is a card rank (2-11). With no composition an infinite deck is
+    assumed; otherwise the hole card and draws come from `composition`.
+    `hits_soft_17=False` gives S17 rules.
+    """
+    hard, aces = _add_rank(0, 0, upcard)
+    if composition is None:
+        return _infinite_from(hard, aces, 1, hits_soft_17)
+    return _finite_from(hard, aces, 1, tuple(composition), hits_soft_17)
+
+
+def infinite_deck_table(hits_soft_17=True):
+    """Dealer outcome probabilities for every upcard with an infinite deck."""
+    return {upcard: dealer_probabilities(upcard, hits_soft_17=hits_soft_17) for upcard in RANKS}
+
+
+def finite_deck_table(composition, hits_soft_17=True):
+    """Dealer outcome probabilities for every upcard drawn from `composition`.
+
+    The upcard is taken out of `composition` before the hole card is drawn.
+    """
+    return _finite_table(tuple(composition), hits_soft_17)
+
+
+@lru_cache(maxsize=256)
+def _finite_table(composition, hits_soft_17):
+    return {
+        upcard: dealer_probabilities(upcard, remove_cards(composition, [upcard]), hits_soft_17)
+        for upcard in RANKS if composition[upcard - 2]
+    }
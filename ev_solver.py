@@ -0,0 +1,234 @@
+# ev_solver.py
+
+"""Expected value of each player decision.
+
+EVs are in units of the hand's original bet and follow the settlement rules
+in `game_engine.settle_hand`: a two-card 21 (split hands included) pays the
+blackjack payout and pushes a dealer Blackjack, any other hand loses to a
+dealer Blackjack, doubled hands win or lose twice the bet, surrender returns
+half, and a hand that reaches 21 stands automatically. The payout, H17/S17,
+double after split, splitting and surrender come from a `Rules` object.
+
+Player draws come from a shoe composition (see `dealer_probabilities`) with
+each drawn card removed, or from an infinite deck when no composition is
+given. By default the dealer's outcome probabilities are computed once from
+the shoe at the decision point; `exact_dealer=True` recomputes them after
+every player draw, which is exact but takes minutes on a full shoe.
+Split EV plays every split hand independently from the post-split shoe and
+resplits up to the rules' `max_split_hands`.
+"""
+
+from collections import OrderedDict
+
+import dealer_probabilities
+from dealer_probabilities import RANKS, INFINITE_DECK, BUST, BLACKJACK
+from game_engine import HIT, STAND, DOUBLE, SPLIT, SURRENDER
+from rules import DEFAULT_RULES
+
+# Hand limit used for unlimited resplitting; deeper resplits are too unlikely to change an EV
+UNLIMITED_SPLIT_HANDS = 20
+
+
+def _value(hard, aces):
+    return hard + 10 if aces and hard <= 11 else hard
+
+
+def _add_rank(hard, aces, rank):
+    if rank == 11:
+        return hard + 1, 1
+    return hard + rank, aces
+
+
+class EVSolver:
+    """Recursive EV solver with a bounded LRU cache.
+
+    Cache keys combine the hand state, dealer upcard and shoe composition, so
+    one solver can be reused across decisions and shoes under its `rules`.
+    """
+
+    def __init__(self, cache_size=200000, exact_dealer=False, rules=None):
+        self.cache_size = cache_size
+        self.exact_dealer = exact_dealer
+        self.rules = rules or DEFAULT_RULES
+        self._cache = OrderedDict()
+
+    def _cached(self, key):
+        value = self._cache.get(key)
+        if value is not None:
+            self._cache.move_to_end(key)
+        return value
+
+    def _store(self, key, value):
+        self._cache[key] = value
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return value
+
+    def clear_cache(self):
+        self._cache.clear()
+
+    def _draws(self, composition):
+        """Yield (rank, probability, remaining composition) for the next card."""
+        if composition is None:
+            for rank, p in zip(RANKS, INFINITE_DECK):
+                yield rank, p, None
+            return
+        total = sum(composition)
+        if total == 0:
+            raise ValueError("The shoe ran out of cards.")
+        for i, count in enumerate(composition):
+            if count:
+                yield RANKS[i], count / total, composition[:i] + (count - 1,) + composition[i + 1:]
+
+    def _stand(self, value, blackjack, upcard, dealer_composition):
+        key = ('stand', value, blackjack, upcard, dealer_composition)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        dealer = dealer_probabilities.dealer_probabilities(upcard, dealer_composition,
+                                                           self.rules.dealer_hits_soft_17)
+        if blackjack:
+            return self._store(key, self.rules.blackjack_payout * (1 - dealer[BLACKJACK]))
+        ev = dealer[BUST] - dealer[BLACKJACK]
+        for dealer_value, p in zip(range(17, 22), dealer):
+            if value > dealer_value:
+                ev += p
+            elif value < dealer_value:
+                ev -= p
+        return self._store(key, ev)
+
+    def _dealer_after(self, remaining, dealer_composition):
+        """Composition the dealer draws from once the player has taken a card."""
+        return remaining if self.exact_dealer else dealer_composition
+
+    def _hit(self, hard, aces, upcard, composition, dealer_composition):
+        """EV of taking a card and then playing on with hit or stand."""
+        key = ('hit', hard, aces, upcard, composition, dealer_composition)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        ev = 0.0
+        for rank, p, remaining in self._draws(composition):
+            new_hard, new_aces = _add_rank(hard, aces, rank)
+            value = _value(new_hard, new_aces)
+            if value > 21:
+                ev -= p
+                continue
+            dealer = self._dealer_after(remaining, dealer_composition)
+            if value == 21:
+                ev += p * self._stand(21, False, upcard, dealer)
+            else:
+                ev += p * max(self._stand(value, False, upcard, dealer),
+                              self._hit(new_hard, new_aces, upcard, remaining, dealer))
+        return self._store(key, ev)
+
+    def _double(self, hard, aces, upcard, composition, dealer_composition):
+        ev = 0.0
+        for rank, p, remaining in self._draws(composition):
+            new_hard, new_aces = _add_rank(hard, aces, rank)
+            value = _value(new_hard, new_aces)
+            if value > 21:
+                ev -= 2 * p
+            else:
+                dealer = self._dealer_after(remaining, dealer_composition)
+                ev += 2 * p * self._stand(value, False, upcard, dealer)
+        return ev
+
+    def _two_card(self, hard, aces, upcard, composition, dealer_composition, can_double=True):
+        """EVs of stand, hit and (if allowed) double on a two-card hand that is not 21."""
+        value = _value(hard, aces)
+        evs = {
+            HIT: self._hit(hard, aces, upcard, composition, dealer_composition),
+            STAND: self._stand(value, False, upcard, dealer_composition),
+        }
+        if can_double:
+            evs[DOUBLE] = self._double(hard, aces, upcard, composition, dealer_composition)
+        return evs
+
+    def _split(self, rank, upcard, composition, dealer_composition):
+        """EV of splitting a pair of `rank`, resplitting while the hand limit allows.
+
+        Each split hand draws its second card from the post-split shoe, so it
+        is worth `other` from the other ranks plus, when it draws `rank`
+        again, the better of playing the pair and splitting it once more.
+        """
+        key = ('split', rank, upcard, composition, dealer_composition)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        hard, aces = _add_rank(0, 0, rank)
+        other = pair = repeat = 0.0
+        for drawn, p, remaining in self._draws(composition):
+            new_hard, new_aces = _add_rank(hard, aces, drawn)
+            dealer = self._dealer_after(remaining, dealer_composition)
+            if _value(new_hard, new_aces) == 21:
+                ev = self._stand(21, True, upcard, dealer)
+            else:
+                ev = max(self._two_card(new_hard, new_aces, upcard, remaining, dealer,
+                                        self.rules.double_after_split).values())
+            if drawn == rank:
+                repeat, pair = p, ev
+            else:
+                other += p * ev
+        limit = self.rules.max_split_hands or UNLIMITED_SPLIT_HANDS
+        if composition is not None:
+            limit = min(limit, 2 + composition[RANKS.index(rank)])
+        limit = max(limit, 2)
+        # values[n]: EV of n hands still to draw their second card, with `hands` hands in play
+        values = [n * (other + repeat * pair) for n in range(limit + 1)]
+        for hands in range(limit - 1, 1, -1):
+            more_hands = values
+            values = [0.0]
+            for n in range(1, hands + 1):
+                values.append(other + (1 - repeat) * values[n - 1]
+                              + repeat * max(pair + values[n - 1], more_hands[n + 1]))
+        return self._store(key, values[2])
+
+    def evaluate(self, player_ranks, upcard, composition=None):
+        """EV of every action the rules allow on a hand, keyed by engine action.
+
+        `player_ranks` are the ranks of the player's cards (Aces as 11),
+        `upcard` the dealer's upcard rank, and `composition` the unseen cards
+        (the dealer's hole card included), or None for an infinite deck.
+        A hand already at 21 or over returns only STAND.
+        """
+        if composition is not None:
+            composition = tuple(composition)
+        hard, aces = 0, 0
+        for rank in player_ranks:
+            hard, aces = _add_rank(hard, aces, rank)
+        value = _value(hard, aces)
+        two_cards = len(player_ranks) == 2
+
+        if value > 21:
+            return {STAND: -1.0}
+        if value == 21:
+            return {STAND: self._stand(21, two_cards, upcard, composition)}
+        if not two_cards:
+            return {
+                HIT: self._hit(hard, aces, upcard, composition, composition),
+                STAND: self._stand(value, False, upcard, composition),
+            }
+        evs = self._two_card(hard, aces, upcard, composition, composition)
+        if player_ranks[0] == player_ranks[1] and self.rules.max_split_hands != 1:
+            evs[SPLIT] = self._split(player_ranks[0], upcard, composition, composition)
+        if self.rules.surrender:
+            evs[SURRENDER] = -0.5
+        return evs
+
+    def evaluate_hand(self, hand, dealer_hand, deck=None):
+        """EVs for a live hand. Uses the deck's unseen cards, or an infinite deck."""
+        composition = None
+        if deck is not None:
+            counts = list(deck.composition())
+            for card in dealer_hand.cards[1:]:
+                counts[card.rank - 2] += 1  # The hole card is still unseen
+            composition = tuple(counts)
+        return self.evaluate([card.rank for card in hand.cards], dealer_hand.cards[0].rank, composition)
+
+    def best_action(self, player_ranks, upcard, composition=None, actions=None):
+        """The highest-EV action, optionally restricted to `actions`."""
+        evs = self.evaluate(player_ranks, upcard, composition)
+        if actions is not None:
+            evs = {action: ev for action, ev in evs.items() if action in actions}
+        return max(evs, key=evs.get)
@@ -0,0 +1,386 @@
+# game_engine.py
+
+from card_deck_classes import Deck
+from player_hand_classes import Hand
+from instrumentation import metrics, timed
+from rules import DEFAULT_RULES
+
+# Player actions offered during a hand
+HIT = 'hit'
+STAND = 'stand'
+DOUBLE = 'double'
+SPLIT = 'split'
+SURRENDER = 'surrender'
+
+# Settlement outcomes for a single hand
+BLACKJACK = 'blackjack'
+DEALER_BLACKJACK = 'dealer_blackjack'
+BUST = 'bust'
+DEALER_BUST = 'dealer_bust'
+WIN = 'win'
+LOSE = 'lose'
+PUSH = 'push'
+SURRENDERED = 'surrendered'
+
+WINNING_OUTCOMES = (BLACKJACK, DEALER_BUST, WIN)
+LOSING_OUTCOMES = (DEALER_BLACKJACK, BUST, LOSE, SURRENDERED)
+
+BLACKJACK_PAYOUT = DEFAULT_RULES.blackjack_payout  # Blackjack pays 3:2 by default
+MAX_SEATS = 7  # Seats at one table
+
+
+def dealer_should_hit(hand, hits_soft_17=True):
+    """Dealer hits on 16 or less and, unless `hits_soft_17` is False, on soft 17."""
+    value = hand.value
+    return value < 17 or (value == 17 and hand.soft and hits_soft_17)
+
+
+def dealer_hit_table(rules=DEFAULT_RULES):
+    """(hard, soft) tuples indexed by hand value: True where the dealer draws."""
+    hard = tuple(value < 17 for value in range(32))
+    soft = tuple(value < 17 or (value == 17 and rules.dealer_hits_soft_17) for value in range(32))
+    return hard, soft
+
+
+def settle_hand(hand, dealer_value, dealer_blackjack, blackjack_payout=BLACKJACK_PAYOUT):
+    """Return the outcome and total payout (bet included) for a finished hand."""
+    player_value = hand.value
+    player_blackjack = hand.blackjack
+
+    if hand.surrendered:
+        return SURRENDERED, hand.bet / 2
+    if player_blackjack and not dealer_blackjack:
+        return BLACKJACK, hand.bet + hand.bet * blackjack_payout
+    if not player_blackjack and dealer_blackjack:
+        return DEALER_BLACKJACK, 0
+    if player_value > 21:
+        return BUST, 0
+    if dealer_value > 21:
+        return DEALER_BUST, hand.bet * 2
+    if player_value > dealer_value:
+        return WIN, hand.bet * 2
+    if player_value < dealer_value:
+        return LOSE, 0
+    return PUSH, hand.bet
+
+
+class EngineListener:
+    """Receives engine events. Every hook is a no-op; override the ones you need.
+
+    `on_round_start` fires once per round; `on_deal` fires once per seat.
+    """
+
+    def on_round_start(self):
+        pass
+
+    def on_deal(self, player_hand, dealer_hand):
+        pass
+
+    def on_hand_start(self, hand_index, hand):
+        pass
+
+    def on_twenty_one(self, hand):
+        pass
+
+    def on_bust(self, hand):
+        pass
+
+    def on_hit(self, hand):
+        pass
+
+    def on_stand(self, hand):
+        pass
+
+    def on_double(self, hand):
+        pass
+
+    def on_split(self, hand, split_hand):
+        pass
+
+    def on_surrender(self, hand):
+        pass
+
+    def on_dealer_start(self, dealer_hand):
+        pass
+
+    def on_dealer_hit(self, dealer_hand, soft_seventeen):
+        pass
+
+    def on_dealer_stand(self, dealer_hand):
+        pass
+
+    def on_settle_start(self, dealer_hand):
+        pass
+
+    def on_hand_settled(self, hand_index, hand, outcome, payout):
+        pass
+
+    def on_round_settled(self, player):
+        pass
+
+
+class ListenerGroup(EngineListener):
+    """Forwards every engine event to each of several listeners in turn."""
+
+    def __init__(self, *listeners):
+        self.listeners = list(listeners)
+
+
+def _forward(event):
+    def forward(self, *args):
+        for listener in self.listeners:
+            getattr(listener, event)(*args)
+    forward.__name__ = event
+    return forward
+
+
+for _event in [name for name in vars(EngineListener) if name.startswith('on_')]:
+    setattr(ListenerGroup, _event, _forward(_event))
+
+
+class Strategy:
+    """Chooses player actions for the engine."""
+
+    def decide(self, player, hand, dealer_upcard, actions):
+        """Return one of `actions` for `hand` against the dealer's upcard."""
+        raise NotImplementedError
+
+    def bet_size(self, deck, base_bet):
+        """Bet for the next round, given the shoe it will be dealt from. Flat by default."""
+        return base_bet
+
+
+class ThresholdStrategy(Strategy):
+    """Hit until the hand reaches a fixed total, never double or split."""
+
+    def __init__(self, stand_on=17):
+        self.stand_on = stand_on
+
+    def decide(self, player, hand, dealer_upcard, actions):
+        return HIT if hand.value < self.stand_on else STAND
+
+
+class RoundResult:
+    """Settled outcome of one round."""
+
+    def __init__(self, outcomes, dealer_value):
+        self.outcomes = outcomes  # list of (hand, outcome, payout)
+        self.dealer_value = dealer_value
+
+    @property
+    def wagered(self):
+        return sum(hand.bet for hand, _, _ in self.outcomes)
+
+    @property
+    def returned(self):
+        return sum(payout for _, _, payout in self.outcomes)
+
+    @property
+    def net(self):
+        return self.returned - self.wagered
+
+
+class BlackjackEngine:
+    """I/O-free Blackjack rules: dealing, player decisions, dealer play and settlement.
+
+    The table's `rules` are compiled into lookups once, here, so hands never
+    consult the rule set directly. A missing `deck` is built from the rules.
+    """
+
+    def __init__(self, deck=None, listener=None, rules=None):
+        self._rules = rules or DEFAULT_RULES
+        self.deck = deck or Deck.for_rules(self._rules)
+        self.listener = listener or EngineListener()
+        self._dealer_hits = dealer_hit_table(self._rules)
+        self._blackjack_payout = self._rules.blackjack_payout
+        self._double_after_split = self._rules.double_after_split
+        self._max_hands = self._rules.max_split_hands or float('inf')
+        self._surrender = self._rules.surrender
+
+    @property
+    def rules(self):
+        return self._rules
+
+    def deal_round(self, player, bet):
+        """Place the bet and deal the opening cards. Returns (player_hand, dealer_hand)."""
+        self.deck.reshuffle_if_needed()
+        player.reset_hands()
+        hand = player.place_bet(bet)
+        self.listener.on_round_start()
+        dealer_hand = Hand()
+        deal = self.deck.deal
+        hand.add_card(deal())
+        hand.add_card(deal())
+        dealer_hand.add_card(deal())
+        dealer_hand.add_card(deal())
+        self.listener.on_deal(hand, dealer_hand)
+        return hand, dealer_hand
+
+    def deal_seats(self, seats):
+        """Place each seat's bet and deal a table round. Returns the dealer hand.
+
+        `seats` is a list of (player, bet) in seat order. As at a casino table,
+        every seat and then the dealer gets one card, twice round. Every bet
+        is checked before any is placed, so a bad bet leaves all seats as
+        they were.
+        """
+        if not 0 < len(seats) <= MAX_SEATS:
+            raise ValueError(f"A table seats between 1 and {MAX_SEATS} players.")
+        for player, bet in seats:
+            player.check_bet(bet)
+        self.deck.reshuffle_if_needed()
+        hands = []
+        for player, bet in seats:
+            player.reset_hands()
+            hands.append(player.place_bet(bet))
+        self.listener.on_round_start()
+        dealer_hand = Hand()
+        deal = self.deck.deal
+        for _ in range(2):
+            for hand in hands:
+                hand.add_card(deal())
+            dealer_hand.add_card(deal())
+        for hand in hands:
+            self.listener.on_deal(hand, dealer_hand)
+        return dealer_hand
+
+    def available_actions(self, player, hand):
+        """Actions the player may take on `hand` right now."""
+        actions = [HIT, STAND]
+        if hand.can_double and player.balance >= hand.bet and (self._double_after_split or not hand.is_split):
+            actions.append(DOUBLE)
+        if hand.can_split and player.balance >= hand.bet and len(player.hands) < self._max_hands:
+            actions.append(SPLIT)
+        if self._surrender and len(hand.cards) == 2 and not hand.is_split:
+            actions.append(SURRENDER)
+        return actions
+
+    def apply_action(self, player, hand, action):
+        """Carry out `action` on `hand`. Returns True when the hand's turn is over."""
+        if action == HIT:
+            hand.add_card(self.deck.deal())
+            self.listener.on_hit(hand)
+            return False
+        if action == STAND:
+            self.listener.on_stand(hand)
+            return True
+        if action == DOUBLE:
+            player.double_down(hand)
+            hand.add_card(self.deck.deal())
+            self.listener.on_double(hand)
+            return True
+        if action == SPLIT:
+            hand, split_hand = player.split_hand(hand)
+            hand.add_card(self.deck.deal())
+            split_hand.add_card(self.deck.deal())
+            self.listener.on_split(hand, split_hand)
+            return False
+        if action == SURRENDER:
+            player.surrender(hand)
+            self.listener.on_surrender(hand)
+            return True
+        raise ValueError(f"Unknown action: {action}")
+
+    def player_turn(self, player, hand, dealer_hand, strategy):
+        """Play a single hand until it stands, doubles, reaches 21 or busts."""
+        upcard = dealer_hand.cards[0]
+        while True:
+            hand_value = hand.value
+            if hand_value == 21:
+                self.listener.on_twenty_one(hand)
+                return
+            if hand_value > 21:
+                self.listener.on_bust(hand)
+                return
+
+            actions = self.available_actions(player, hand)
+            action = strategy.decide(player, hand, upcard, actions)
+            if action not in actions:
+                raise ValueError(f"Action not available: {action}")
+            if self.apply_action(player, hand, action):
+                return
+
+    def play_hands(self, player, dealer_hand, strategy):
+        """Play every hand the player holds, including hands created by splits."""
+        for hand_index, hand in enumerate(player.hands):
+            self.listener.on_hand_start(hand_index, hand)
+            self.player_turn(player, hand, dealer_hand, strategy)
+
+    @timed('dealer_turn')
+    def dealer_turn(self, dealer_hand):
+        """Draw for the dealer: hit on 16 or less, and on soft 17 under H17 rules."""
+        self.listener.on_dealer_start(dealer_hand)
+        hits = self._dealer_hits
+        while hits[dealer_hand.soft][dealer_hand.value]:
+            soft_seventeen = dealer_hand.value == 17
+            dealer_hand.add_card(self.deck.deal())
+            if metrics.enabled:
+                metrics.count('dealer_draws')
+            self.listener.on_dealer_hit(dealer_hand, soft_seventeen)
+        self.listener.on_dealer_stand(dealer_hand)
+
+    def settle(self, player, dealer_hand):
+        """Pay out every player hand against the dealer and record the results."""
+        return self.settle_seats([player], dealer_hand)[0]
+
+    @timed('settlement')
+    def settle_seats(self, players, dealer_hand):
+        """Settle every seat against one dealer hand in a single pass. Returns a RoundResult per player."""
+        self.listener.on_settle_start(dealer_hand)
+        dealer_value = dealer_hand.value
+        dealer_blackjack = dealer_hand.blackjack
+        blackjack_payout = self._blackjack_payout
+
+        results = []
+        for player in players:
+            outcomes = []
+            for hand_index, hand in enumerate(player.hands):
+                outcome, payout = settle_hand(hand, dealer_value, dealer_blackjack, blackjack_payout)
+                if outcome in WINNING_OUTCOMES:
+                    player.record_win()
+                elif outcome in LOSING_OUTCOMES:
+                    player.record_loss()
+                else:
+                    player.record_tie()
+                if payout > 0:
+                    player.add_winnings(payout)
+                outcomes.append((hand, outcome, payout))
+                self.listener.on_hand_settled(hand_index, hand, outcome, payout)
+            if metrics.enabled:
+                metrics.count('hands_settled', len(outcomes))
+            self.listener.on_round_settled(player)
+            results.append(RoundResult(outcomes, dealer_value))
+        return results
+
+    def play_round(self, player, bet, strategy):
+        """Play a complete round for `player` and return its RoundResult."""
+        _, dealer_hand = self.deal_round(player, bet)
+        self.play_hands(player, dealer_hand, strategy)
+        self.dealer_turn(dealer_hand)
+        return self.settle(player, dealer_hand)
+
+    def play_table_round(self, seats):
+        """Play one round for the (player, bet, strategy) seats sharing the dealer's hand.
+
+        The dealer plays once for the whole table. Returns a RoundResult per seat.
+        """
+        dealer_hand = self.deal_seats([(player, bet) for player, bet, _ in seats])
+        for player, _, strategy in seats:
+            self.play_hands(player, dealer_hand, strategy)
+        self.dealer_turn(dealer_hand)
+        return self.settle_seats([player for player, _, _ in seats], dealer_hand)
+
+    def run_session(self, player, strategy, bet, max_rounds):
+        """Play up to `max_rounds` rounds, each at `strategy.bet_size` of the base `bet`.
+
+        Returns the number of rounds played.
+        """
+        rounds = 0
+        while rounds < max_rounds:
+            self.deck.reshuffle_if_needed()
+            round_bet = strategy.bet_size(self.deck, bet)
+            if player.balance < round_bet:
+                break
+            self.play_round(player, round_bet, strategy)
+            rounds += 1
+        return rounds
@@ -0,0 +1,238 @@
+# hand_history.py
+
+"""Append-only binary log of every round played.
+
+Each record is a 4-byte little-endian length followed by the packed round:
+session id, timestamp, round number, the player's name, balance and
+win/loss/tie totals after the round, the dealer's cards, and for every
+player hand its bet, payout, outcome, cards and actions. Cards are stored
+as `Card.code` bytes.
+
+Whole records are collected in memory and appended with a single write on
+an `O_APPEND` descriptor, so several sessions can share one log without
+interleaving partial records. They are read back one at a time by
+`read_hand_history`, so a log of any size can be streamed.
+"""
+
+import os
+import struct
+import time
+import uuid
+
+from game_engine import (
+    EngineListener, HIT, STAND, DOUBLE, SPLIT, SURRENDER,
+    BLACKJACK, DEALER_BLACKJACK, BUST, DEALER_BUST, WIN, LOSE, PUSH, SURRENDERED,
+)
+
+# Codes are indexes into these tuples, so new entries go at the end
+ACTIONS = (HIT, STAND, DOUBLE, SPLIT, SURRENDER)
+OUTCOMES = (BLACKJACK, DEALER_BLACKJACK, BUST, DEALER_BUST, WIN, LOSE, PUSH, SURRENDERED)
+_ACTION_CODES = {action: code for code, action in enumerate(ACTIONS)}
+_OUTCOME_CODES = {outcome: code for code, outcome in enumerate(OUTCOMES)}
+
+_LENGTH = struct.Struct('<I')
+_ROUND = struct.Struct('<QdIdIIIB')  # session, timestamp, round, balance, wins, losses, ties, name length
+_HAND = struct.Struct('<ddBBB')  # bet, payout, outcome, card count, action count
+
+
+class HandRecord:
+    """One player hand within a recorded round."""
+
+    __slots__ = ('bet', 'payout', 'outcome', 'cards', 'actions')
+
+    def __init__(self, bet, payout, outcome, cards, actions):
+        self.bet = bet
+        self.payout = payout
+        self.outcome = outcome
+        self.cards = cards  # card codes
+        self.actions = actions
+
+
+class RoundRecord:
+    """One recorded round."""
+
+    __slots__ = ('session_id', 'timestamp', 'round_number', 'player_name', 'balance',
+                 'wins', 'losses', 'ties', 'dealer_cards', 'hands')
+
+    def __init__(self, session_id, timestamp, round_number, player_name, balance,
+                 wins, losses, ties, dealer_cards, hands):
+        self.session_id = session_id
+        self.timestamp = timestamp
+        self.round_number = round_number
+        self.player_name = player_name
+        self.balance = balance
+        self.wins = wins
+        self.losses = losses
+        self.ties = ties
+        self.dealer_cards = dealer_cards
+        self.hands = hands
+
+    def pack(self):
+        name = self.player_name.encode('utf-8')
+        parts = [
+            _ROUND.pack(self.session_id, self.timestamp, self.round_number, self.balance,
+                        self.wins, self.losses, self.ties, len(name)),
+            name,
+            bytes([len(self.dealer_cards)]),
+            bytes(self.dealer_cards),
+            bytes([len(self.hands)]),
+        ]
+        for hand in self.hands:
+            parts.append(_HAND.pack(hand.bet, hand.payout, _OUTCOME_CODES[hand.outcome],
+                                    len(hand.cards), len(hand.actions)))
+            parts.append(bytes(hand.cards))
+            parts.append(bytes(_ACTION_CODES[action] for action in hand.actions))
+        return b''.join(parts)
+
+    @classmethod
+    def unpack(cls, data):
+        session_id, timestamp, round_number, balance, wins, losses, ties, name_length = _ROUND.unpack_from(data)
+        offset = _ROUND.size
+        player_name = data[offset:offset + name_length].decode('utf-8')
+        offset += name_length
+        dealer_count = data[offset]
+        dealer_cards = list(data[offset + 1:offset + 1 + dealer_count])
+        offset += 1 + dealer_count
+        hand_count = data[offset]
+        offset += 1
+        hands = []
+        for _ in range(hand_count):
+            bet, payout, outcome, card_count, action_count = _HAND.unpack_from(data, offset)
+            offset += _HAND.size
+            hand_cards = list(data[offset:offset + card_count])
+            offset += card_count
+            actions = [ACTIONS[code] for code in data[offset:offset + action_count]]
+            offset += action_count
+            hands.append(HandRecord(bet, payout, OUTCOMES[outcome], hand_cards, actions))
+        return cls(session_id, timestamp, round_number, player_name, balance,
+                   wins, losses, ties, dealer_cards, hands)
+
+
+class HandHistoryWriter:
+    """Appends RoundRecords to a log file, buffering whole records up to `buffer_size` bytes."""
+
+    def __init__(self, path, buffer_size=65536):
+        self.path = path
+        self.buffer_size = buffer_size
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._buffer = bytearray()
+
+    def write(self, record):
+        payload = record.pack()
+        self._buffer += _LENGTH.pack(len(payload))
+        self._buffer += payload
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Append every buffered record, normally with one write.
+
+        A short write is followed by writes of the rest, since a cut-off
+        record would hide every record after it. If a write fails, only the
+        unwritten bytes stay buffered, so a later flush finishes the record.
+        """
+        written = 0
+        try:
+            while written < len(self._buffer):
+                written += os.write(self._fd, self._buffer[written:] if written else self._buffer)
+        finally:
+            del self._buffer[:written]
+
+    def close(self):
+        if self._fd is not None:
+            self.flush()
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_hand_history(path):
+    """Yield every RoundRecord in the log, oldest first."""
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(_LENGTH.size)
+            if len(header) < _LENGTH.size:
+                return
+            (length,) = _LENGTH.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                return  # Partial record from an interrupted write
+            yield RoundRecord.unpack(payload)
+
+
+class HandHistoryRecorder(EngineListener):
+    """Engine listener that writes one RoundRecord per settled round."""
+
+    def __init__(self, writer, session_id=None):
+        self.writer = writer
+        self.session_id = session_id if session_id is not None else uuid.uuid4().int >> 64
+        self.round_number = 0
+        self._actions = {}
+        self._hands = []
+        self._dealer_cards = []
+
+    def _action(self, hand, action):
+        self._actions.setdefault(id(hand), []).append(action)
+
+    def on_round_start(self):
+        self.round_number += 1
+        self._actions = {}
+        self._hands = []
+
+    def on_hit(self, hand):
+        self._action(hand, HIT)
+
+    def on_stand(self, hand):
+        self._action(hand, STAND)
+
+    def on_double(self, hand):
+        self._action(hand, DOUBLE)
+
+    def on_split(self, hand, split_hand):
+        self._action(hand, SPLIT)
+
+    def on_surrender(self, hand):
+        self._action(hand, SURRENDER)
+
+    def on_settle_start(self, dealer_hand):
+        self._dealer_cards = [card.code for card in dealer_hand.cards]
+
+    def on_hand_settled(self, hand_index, hand, outcome, payout):
+        self._hands.append(HandRecord(hand.bet, payout, outcome, [card.code for card in hand.cards],
+                                      self._actions.get(id(hand), [])))
+
+    def on_round_settled(self, player):
+        self.writer.write(RoundRecord(
+            self.session_id, time.time(), self.round_number, player.name, player.balance,
+            player.wins, player.losses, player.ties, self._dealer_cards, self._hands))
+        self._hands = []
+
+
+def format_session_summary(player_name, balance, wins, losses, ties, timestamp):
+    """The text block `BlackjackGame._save_game_results` appends for a session."""
+    return (
+        f"Player: {player_name}\n"
+        f"Ending Balance: ${balance:.2f}\n"
+        f"Wins: {wins}\n"
+        f"Losses: {losses}\n"
+        f"Ties: {ties}\n"
+        f"Timestamp: {timestamp}\n"
+        + "=" * 30 + "\n"
+    )
+
+
+def session_summaries(path):
+    """Text summaries for each session in the log, in the order sessions started."""
+    last_rounds = {}
+    for record in read_hand_history(path):
+        last_rounds[record.session_id] = record
+    return [
+        format_session_summary(record.player_name, record.balance, record.wins, record.losses, record.ties,
+                               time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.timestamp)))
+        for record in last_rounds.values()
+    ]
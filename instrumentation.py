@@ -0,0 +1,158 @@
+# instrumentation.py
+
+"""Opt-in counters and timing histograms for the engine's hot paths.
+
+Counting hooks check `metrics.enabled` before recording anything, and
+timed methods only get their timing wrapper while instrumentation is on, so
+when it is off (the default) each hook costs one attribute lookup. Turn it
+on with `enable()`, then read the results with `metrics.snapshot()` or
+`metrics.prometheus()`:
+
+    import instrumentation
+    instrumentation.enable()
+    ...
+    print(instrumentation.metrics.prometheus())
+
+Counters: shoes_created, reshuffles, cards_dealt, hand_evaluations,
+dealer_draws, hands_settled. Timings, in seconds: shoe_creation, dealer_turn,
+settlement, save_game_results, update_player_data.
+"""
+
+import functools
+import time
+from bisect import bisect_left
+
+# Upper bounds of the timing histogram buckets, in seconds
+BUCKETS = (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 0.1, 1.0, 10.0)
+
+
+class Histogram:
+    """Timing observations counted into fixed buckets."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot counts values above every bound
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """(upper bound, observations at or below it) pairs, ending with +Inf."""
+        pairs = []
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+class Metrics:
+    """Registry of named counters and timing histograms."""
+
+    def __init__(self):
+        self.enabled = False
+        self.counters = {}
+        self.histograms = {}
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+    def reset(self):
+        self.counters = {}
+        self.histograms = {}
+
+    def snapshot(self):
+        """Current counters and histogram summaries as plain dicts."""
+        return {
+            'counters': dict(self.counters),
+            'histograms': {
+                name: {
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    'buckets': {str(bound): count for bound, count in histogram.cumulative()},
+                }
+                for name, histogram in self.histograms.items()
+            },
+        }
+
+    def prometheus(self, prefix='blackjack_'):
+        """Counters and histograms in the Prometheus text exposition format."""
+        lines = []
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {prefix}{name}_total counter")
+            lines.append(f"{prefix}{name}_total {value}")
+        for name, histogram in sorted(self.histograms.items()):
+            metric = f"{prefix}{name}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for bound, count in histogram.cumulative():
+                label = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{metric}_bucket{{le="{label}"}} {count}')
+            lines.append(f"{metric}_sum {histogram.sum}")
+            lines.append(f"{metric}_count {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = Metrics()
+
+
+# (class, attribute, function, histogram name) for every method decorated with `timed`
+_timed_methods = []
+
+
+def _timing_wrapper(func, name):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            metrics.observe(name, time.perf_counter() - start)
+    return wrapper
+
+
+class _TimedMethod:
+    """Placeholder that registers a method and puts the chosen implementation on its class."""
+
+    def __init__(self, func, name):
+        self.func = func
+        self.name = name
+
+    def __set_name__(self, owner, attribute):
+        _timed_methods.append((owner, attribute, self.func, self.name))
+        setattr(owner, attribute, _timing_wrapper(self.func, self.name) if metrics.enabled else self.func)
+
+
+def timed(name):
+    """Method decorator recording each call's duration in histogram `name` while enabled.
+
+    The undecorated method stays on the class until `enable()` swaps in a
+    timing wrapper, so disabled instrumentation adds no call overhead.
+    """
+    def decorator(func):
+        return _TimedMethod(func, name)
+    return decorator
+
+
+def enable(reset=True):
+    """Start recording, by default from empty counters."""
+    if reset:
+        metrics.reset()
+    metrics.enabled = True
+    for owner, attribute, func, name in _timed_methods:
+        setattr(owner, attribute, _timing_wrapper(func, name))
+
+
+def disable():
+    metrics.enabled = False
+    for owner, attribute, func, _ in _timed_methods:
+        setattr(owner, attribute, func)
@@ -1,54 +1,110 @@
 # player_hand_classes.py
 
+from instrumentation import metrics
+
 class Hand:
-    """Represents a hand of cards for a player or dealer."""
+    """Represents a hand of cards for a player or dealer.
+
+    The hard total (Aces as 1), Ace count, value, softness, blackjack and bust
+    flags are kept up to date as cards are added or removed, so reading them
+    is constant time. Change the cards through `add_card`, `pop_card` or by
+    assigning `cards`; mutating the list in place bypasses the totals.
+    """
 
     def __init__(self):
-        self.cards = []
+        self._cards = []
+        self.hard_total = 0
+        self.num_aces = 0
+        self.value = 0
+        self.soft = False
+        self.blackjack = False
+        self.busted = False
         self.bet = 0
         self.is_split = False
+        self.surrendered = False
         self.can_split = False
         self.can_double = True
 
+    @property
+    def cards(self):
+        return self._cards
+
+    @cards.setter
+    def cards(self, cards):
+        self._cards = list(cards)
+        self.hard_total = 0
+        self.num_aces = 0
+        for card in self._cards:
+            if card.rank == 11:
+                self.num_aces += 1
+                self.hard_total += 1
+            else:
+                self.hard_total += card.rank
+        self._update_totals()
+
+    def _update_totals(self):
+        """Derive value, softness, blackjack and bust from the running totals."""
+        if metrics.enabled:
+            metrics.count('hand_evaluations')
+        hard = self.hard_total
+        # At most one Ace can count as 11 without busting
+        value = hard + 10 if self.num_aces and hard <= 11 else hard
+        self.value = value
+        # Soft while every Ace can still count as 11
+        self.soft = self.num_aces > 0 and hard + 10 * self.num_aces <= 21
+        self.blackjack = value == 21 and len(self._cards) == 2
+        self.busted = value > 21
+
     def add_card(self, card):
         """Add a card to the hand."""
-        self.cards.append(card)
+        self._cards.append(card)
+        if card.rank == 11:
+            self.num_aces += 1
+            self.hard_total += 1
+        else:
+            self.hard_total += card.rank
+        self._update_totals()
 
         # Update split eligibility
-        if len(self.cards) == 2:
+        if len(self._cards) == 2:
             # Allow splitting if cards have the same rank
-            self.can_split = (self.cards[0].rank == self.cards[1].rank)
+            self.can_split = (self._cards[0].rank == self._cards[1].rank)
         else:
             self.can_split = False  # Can't split after more than 2 cards
 
         # Disable double after first hit
-        if len(self.cards) > 2:
+        if len(self._cards) > 2:
             self.can_double = False
 
+    def pop_card(self):
+        """Remove and return the last card in the hand."""
+        card = self._cards.pop()
+        if card.rank == 11:
+            self.num_aces -= 1
+            self.hard_total -= 1
+        else:
+            self.hard_total -= card.rank
+        self._update_totals()
+        return card
+
     def calculate_value(self):
         """Calculate the total value of the hand."""
-        value = sum(card.rank for card in self.cards)
-
-        # Adjust for Aces
-        num_aces = sum(1 for card in self.cards if card.value == 'Ace')
-        while value > 21 and num_aces:
-            value -= 10  # Treat an Ace as 1 instead of 11
-            num_aces -= 1
-
-        return value
+        return self.value
 
     def is_blackjack(self):
         """Check if the hand is a Blackjack."""
-        return len(self.cards) == 2 and self.calculate_value() == 21
+        return self.blackjack
 
     def is_soft_hand(self):
         """Check if the hand is a soft hand (contains an Ace counted as 11)."""
-        value = sum(card.rank for card in self.cards)
-        num_aces = sum(1 for card in self.cards if card.value == 'Ace')
-        return num_aces > 0 and value <= 21
+        return self.soft
+
+    def is_bust(self):
+        """Check if the hand is over 21."""
+        return self.busted
 
     def __str__(self):
-        return ", ".join(str(card) for card in self.cards)
+        return ", ".join(str(card) for card in self._cards)
 
 
 class Player:
@@ -63,12 +119,16 @@ class Player:
         self.losses = losses
         self.ties = 0  # Initialize ties to 0
 
-    def place_bet(self, amount):
-        """Place a bet for the player."""
+    def check_bet(self, amount):
+        """Raise ValueError unless the player can place a bet of `amount`."""
         if amount > self.balance:
             raise ValueError("Insufficient funds to place this bet.")
         if amount <= 0:
             raise ValueError("Bet amount must be greater than zero.")
+
+    def place_bet(self, amount):
+        """Place a bet for the player."""
+        self.check_bet(amount)
         self.balance -= amount
         hand = Hand()
         hand.bet = amount
@@ -98,7 +158,7 @@ class Player:
 
         # Create a new hand with the second card
         split_hand = Hand()
-        split_hand.add_card(hand.cards.pop())
+        split_hand.add_card(hand.pop_card())
         split_hand.bet = hand.bet
         split_hand.is_split = True
 
@@ -112,6 +172,13 @@ class Player:
         self.hands.append(split_hand)
         return hand, split_hand
 
+    def surrender(self, hand):
+        """Give up a hand; half its bet is returned when the round is settled."""
+        if len(hand.cards) != 2 or hand.is_split:
+            raise ValueError("Can only surrender the first two cards.")
+        hand.surrendered = True
+        return hand
+
     def add_winnings(self, amount):
         """Add winnings to the player's balance."""
         self.balance += amount
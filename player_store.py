@@ -0,0 +1,147 @@
+# player_store.py
+
+"""Where player records live between sessions.
+
+`TextPlayerStore` reads and rewrites the original comma-separated
+`players.txt`. `SQLitePlayerStore` keeps players in a local SQLite file
+with the name as primary key, so loading or saving one player touches one
+row, and session results are applied as increments inside a transaction so
+two sessions ending together cannot overwrite each other.
+"""
+
+import os
+import sqlite3
+
+
+class PlayerStore:
+    """Interface for loading and saving players.
+
+    Player records are dicts with name, age, balance, wins, losses and ties.
+    """
+
+    def list_players(self):
+        raise NotImplementedError
+
+    def get_player(self, name):
+        """The record for `name`, or None."""
+        raise NotImplementedError
+
+    def update_stats(self, name, balance_change, wins=0, losses=0, ties=0):
+        """Add a session's balance change and results to a player's record."""
+        raise NotImplementedError
+
+
+class TextPlayerStore(PlayerStore):
+    """Players in a text file, one `name,age,balance,wins,losses` line each."""
+
+    def __init__(self, path='players.txt'):
+        self.path = path
+
+    def list_players(self):
+        players = []
+        with open(self.path, 'r') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    parts = line.split(',')
+                    if len(parts) != 5:
+                        raise ValueError(f"Each line in '{self.path}' must contain name, age, balance, wins, and losses separated by commas.")
+                    name, age, balance, wins, losses = parts
+                    try:
+                        players.append({
+                            'name': name.strip(),
+                            'age': int(age.strip()),
+                            'balance': float(balance.strip()),
+                            'wins': int(wins.strip()),
+                            'losses': int(losses.strip()),
+                            'ties': 0,
+                        })
+                    except ValueError:
+                        raise ValueError(f"'{self.path}' file contains invalid data.")
+        return players
+
+    def get_player(self, name):
+        for player in self.list_players():
+            if player['name'] == name:
+                return player
+        return None
+
+    def update_stats(self, name, balance_change, wins=0, losses=0, ties=0):
+        with open(self.path, 'r') as f:
+            lines = f.readlines()
+
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            for line in lines:
+                parts = line.strip().split(',')
+                if parts[0] == name:
+                    balance = float(parts[2]) + balance_change
+                    f.write(f"{name},{parts[1]},{balance},{int(parts[3]) + wins},{int(parts[4]) + losses}\n")
+                else:
+                    f.write(line)
+        os.replace(temp_path, self.path)
+
+
+class SQLitePlayerStore(PlayerStore):
+    """Players in a SQLite database file."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS players (
+            name TEXT PRIMARY KEY,
+            age INTEGER NOT NULL,
+            balance REAL NOT NULL,
+            wins INTEGER NOT NULL DEFAULT 0,
+            losses INTEGER NOT NULL DEFAULT 0,
+            ties INTEGER NOT NULL DEFAULT 0
+        )
+    """
+    COLUMNS = ('name', 'age', 'balance', 'wins', 'losses', 'ties')
+
+    def __init__(self, path='players.db', timeout=10.0):
+        self.path = path
+        self.created = not os.path.exists(path)
+        self._connection = sqlite3.connect(path, timeout=timeout)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        with self._connection:
+            self._connection.execute(self.SCHEMA)
+
+    def close(self):
+        self._connection.close()
+
+    def _record(self, row):
+        return dict(zip(self.COLUMNS, row))
+
+    def list_players(self):
+        rows = self._connection.execute(f"SELECT {', '.join(self.COLUMNS)} FROM players ORDER BY rowid")
+        return [self._record(row) for row in rows]
+
+    def get_player(self, name):
+        row = self._connection.execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM players WHERE name = ?", (name,)).fetchone()
+        return self._record(row) if row else None
+
+    def add_player(self, name, age, balance, wins=0, losses=0, ties=0):
+        """Insert a player, leaving an existing player of the same name untouched."""
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR IGNORE INTO players (name, age, balance, wins, losses, ties) VALUES (?, ?, ?, ?, ?, ?)",
+                (name, age, balance, wins, losses, ties))
+
+    def update_stats(self, name, balance_change, wins=0, losses=0, ties=0):
+        with self._connection:
+            cursor = self._connection.execute(
+                "UPDATE players SET balance = balance + ?, wins = wins + ?, losses = losses + ?, ties = ties + ? "
+                "WHERE name = ?",
+                (balance_change, wins, losses, ties, name))
+        if cursor.rowcount == 0:
+            raise KeyError(f"No player named '{name}'.")
+
+    def import_text(self, path='players.txt'):
+        """Copy every player from a players.txt file. Returns the number read."""
+        players = TextPlayerStore(path).list_players()
+        with self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO players (name, age, balance, wins, losses, ties) "
+                "VALUES (:name, :age, :balance, :wins, :losses, :ties)",
+                players)
+        return len(players)
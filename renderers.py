@@ -0,0 +1,199 @@
+# renderers.py
+
+"""Console output for the game, as engine listeners.
+
+A renderer collects the lines for a round and writes them to its stream in
+one call when the round is settled, or earlier when the game is about to
+wait for input. Three modes are available:
+
+- verbose: the full step-by-step commentary
+- compact: one line per round with the hands, dealer result and balance
+- silent: nothing but the prompts
+"""
+
+import sys
+
+from game_engine import (
+    EngineListener, BLACKJACK, DEALER_BLACKJACK, BUST, DEALER_BUST, WIN, LOSE, SURRENDERED,
+)
+
+
+class Renderer(EngineListener):
+    """Buffers output lines and writes them to `stream` (stdout by default) together."""
+
+    def __init__(self, stream=None):
+        self._stream = stream
+        self._lines = []
+        self.round_number = 1
+
+    @property
+    def stream(self):
+        return self._stream or sys.stdout
+
+    def write(self, line=''):
+        self._lines.append(line)
+
+    def flush(self):
+        """Write the buffered lines. Called before every prompt and at the end of each round."""
+        if self._lines:
+            stream = self.stream
+            stream.write('\n'.join(self._lines) + '\n')
+            stream.flush()
+            self._lines = []
+
+    def message(self, text):
+        """A notice from the game itself, such as a rejected bet."""
+        self.write(text)
+
+    def start_round(self, round_number):
+        self.round_number = round_number
+
+    def betting(self):
+        """Called before each bet prompt."""
+
+    def decision_prompt(self, hand, dealer_upcard):
+        """Text shown ahead of the action prompt."""
+        return ''
+
+    def on_round_settled(self, player):
+        self.flush()
+
+
+class VerboseRenderer(Renderer):
+    """Step-by-step commentary of every deal, decision and result."""
+
+    def start_round(self, round_number):
+        self.round_number = round_number
+        self.write("\n========================================")
+        self.write(f"            ROUND {round_number}")
+        self.write("========================================\n")
+
+    def betting(self):
+        self.write("----------------------------------------")
+
+    def on_deal(self, player_hand, dealer_hand):
+        self.write("\n/// Dealing cards... Good Luck! ///\n")
+        self.write("*************************")
+        self.write(f"Your hand: {player_hand}")
+        self.write(f"Your hand value: {player_hand.value}")
+        self.write("*************************\n")
+        self.write(f"Dealer's visible card: {dealer_hand.cards[0]}")
+        self.write(f"Dealer's visible card value: {dealer_hand.cards[0].rank}")
+
+    def on_hand_start(self, hand_index, hand):
+        self.write("\n----------------------------------------")
+        self.write(f"         PLAYING HAND {hand_index + 1}")
+        self.write("----------------------------------------")
+
+    def on_twenty_one(self, hand):
+        self.write("★★★ Blackjack! ★★★")
+
+    def on_bust(self, hand):
+        self.write("Bust!")
+
+    def on_hit(self, hand):
+        self.write("\n*************************")
+        self.write(f"Your hand: {hand}")
+        self.write(f"Hand value: {hand.value}")
+        self.write("*************************\n")
+
+    def on_double(self, hand):
+        self.write("\n--- Doubled Down! ---")
+        self.write("*************************")
+        self.write(f"Your hand: {hand}")
+        self.write(f"Hand value: {hand.value}")
+        self.write("*************************\n")
+
+    def on_split(self, hand, split_hand):
+        self.write("\n/// Hand Split! ///\n")
+        self.write(f"Hand 1: {hand}")
+        self.write(f"Hand 2: {split_hand}")
+
+    def on_surrender(self, hand):
+        self.write("\n--- Surrendered ---")
+
+    def on_dealer_start(self, dealer_hand):
+        self.write("\n========================================")
+        self.write("            DEALER'S TURN")
+        self.write("========================================")
+        self.write(f"\nDealer's hand: {dealer_hand}")
+        self.write(f"Dealer's hand value: {dealer_hand.value}")
+
+    def on_dealer_hit(self, dealer_hand, soft_seventeen):
+        self.write("\nDealer hits on soft 17." if soft_seventeen else "\nDealer hits.")
+        self.write(f"Dealer's new hand: {dealer_hand}")
+        self.write(f"Dealer's hand value: {dealer_hand.value}")
+
+    def on_dealer_stand(self, dealer_hand):
+        self.write("\nDealer stands.")
+        if dealer_hand.value > 21:
+            self.write("\nDealer busts!")
+
+    def on_settle_start(self, dealer_hand):
+        self.write(f"\n=== Results for Round {self.round_number} ===")
+        self.write("----------------------------------------")
+
+    def on_hand_settled(self, hand_index, hand, outcome, payout):
+        self.write(f"\n*** Hand {hand_index + 1} ***")
+        self.write(f"Your hand: {hand}")
+        self.write(f"Hand value: {hand.value}")
+        if outcome == BLACKJACK:
+            self.write(f"Blackjack! You win ${payout - hand.bet:.2f}!")
+        elif outcome == DEALER_BLACKJACK:
+            self.write("Dealer has Blackjack. You lose.")
+        elif outcome == BUST:
+            self.write("Bust! You lose.")
+        elif outcome == DEALER_BUST:
+            self.write(f"Dealer busts! You win ${hand.bet:.2f}!")
+        elif outcome == WIN:
+            self.write(f"You win ${hand.bet:.2f}!")
+        elif outcome == LOSE:
+            self.write("Dealer wins. You lose.")
+        elif outcome == SURRENDERED:
+            self.write(f"Surrendered. ${payout:.2f} of your bet is returned.")
+        else:
+            self.write("Push (tie). Your bet is returned.")
+
+    def on_round_settled(self, player):
+        self.write("----------------------------------------")
+        self.write(f"Your new balance is: ${player.balance:.2f}")
+        self.write(f"Wins: {player.wins} | Losses: {player.losses} | Ties: {player.ties}")
+        self.flush()
+
+
+class CompactRenderer(Renderer):
+    """One line per round; the hand and dealer upcard are shown in the action prompt."""
+
+    def __init__(self, stream=None):
+        super().__init__(stream)
+        self._dealer = ''
+        self._hands = []
+
+    def decision_prompt(self, hand, dealer_upcard):
+        return f"[{hand} ({hand.value}) vs {dealer_upcard}] "
+
+    def on_settle_start(self, dealer_hand):
+        self._dealer = f"{dealer_hand} ({dealer_hand.value})"
+        self._hands = []
+
+    def on_hand_settled(self, hand_index, hand, outcome, payout):
+        self._hands.append(f"{hand} ({hand.value}) {outcome} {payout - hand.bet:+.2f}")
+
+    def on_round_settled(self, player):
+        self.write(f"Round {self.round_number}: {' / '.join(self._hands)} | Dealer {self._dealer} | "
+                   f"Balance ${player.balance:.2f} | W/L/T {player.wins}/{player.losses}/{player.ties}")
+        self.flush()
+
+
+class SilentRenderer(Renderer):
+    """Writes nothing."""
+
+    def write(self, line=''):
+        pass
+
+
+RENDERERS = {
+    'verbose': VerboseRenderer,
+    'compact': CompactRenderer,
+    'silent': SilentRenderer,
+}
@@ -0,0 +1,164 @@
+# replay.py
+
+"""Record a session as its shoe seed plus the player's bets and actions,
+and replay it headlessly.
+
+A session log is JSON lines: a header with the seed, shoe settings, table
+rules and the player's starting state, then one line per round with the
+bet, the actions taken in the order the engine asked for them, and the
+balance after settlement. Replaying rebuilds the seeded shoe, feeds the actions back
+through `BlackjackEngine` and checks every balance, so recorded sessions
+also serve as a regression and performance corpus:
+
+    python replay.py sessions/
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+from card_deck_classes import Deck
+from game_engine import BlackjackEngine, EngineListener, Strategy, HIT, STAND, DOUBLE, SPLIT, SURRENDER
+from player_hand_classes import Player
+from rules import DEFAULT_RULES, Rules
+
+
+class SessionRecorder(EngineListener):
+    """Engine listener that writes a replayable session log."""
+
+    def __init__(self, path, seed, deck, player, rules=DEFAULT_RULES):
+        self.path = path
+        self._file = open(path, 'w')
+        self._write({
+            'type': 'session',
+            'seed': seed,
+            'num_decks': deck.num_decks,
+            'penetration': deck.penetration,
+            'cut_card': deck.cut_card,
+            'lazy_shuffle': deck.lazy_shuffle,
+            'rules': rules.as_dict(),
+            'player': player.name,
+            'age': player.age,
+            'balance': player.balance,
+            'wins': player.wins,
+            'losses': player.losses,
+        })
+        self._bet = 0
+        self._actions = []
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry) + '\n')
+
+    def on_deal(self, player_hand, dealer_hand):
+        self._bet = player_hand.bet
+        self._actions = []
+
+    def on_hit(self, hand):
+        self._actions.append(HIT)
+
+    def on_stand(self, hand):
+        self._actions.append(STAND)
+
+    def on_double(self, hand):
+        self._actions.append(DOUBLE)
+
+    def on_split(self, hand, split_hand):
+        self._actions.append(SPLIT)
+
+    def on_surrender(self, hand):
+        self._actions.append(SURRENDER)
+
+    def on_round_settled(self, player):
+        self._write({'bet': self._bet, 'actions': self._actions, 'balance': player.balance})
+
+    def close(self):
+        self._file.close()
+
+
+class ReplayStrategy(Strategy):
+    """Plays back a recorded list of actions."""
+
+    def __init__(self):
+        self.actions = []
+
+    def decide(self, player, hand, dealer_upcard, actions):
+        if not self.actions:
+            raise ValueError("The recorded actions ran out before the round ended.")
+        return self.actions.pop(0)
+
+
+class ReplayReport:
+    """Outcome of replaying one session log."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rounds = 0
+        self.mismatches = []  # (round number, recorded balance, replayed balance or error)
+        self.elapsed = 0.0
+
+    @property
+    def ok(self):
+        return not self.mismatches
+
+
+def load_session(path):
+    """Return (header, rounds) from a session log."""
+    with open(path) as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if not entries or entries[0].get('type') != 'session':
+        raise ValueError(f"'{path}' is not a session log.")
+    return entries[0], entries[1:]
+
+
+def replay_session(path):
+    """Replay a session log and compare every balance. Returns a ReplayReport."""
+    header, rounds = load_session(path)
+    report = ReplayReport(path)
+    start = time.perf_counter()
+
+    deck = Deck(header['num_decks'], penetration=header['penetration'], cut_card=header['cut_card'],
+                rng=random.Random(header['seed']), lazy_shuffle=header.get('lazy_shuffle', False))
+    # Logs written before rules were recorded were played under the defaults
+    engine = BlackjackEngine(deck, rules=Rules(**header.get('rules', {})))
+    player = Player(header['player'], header['balance'], header['age'], header['wins'], header['losses'])
+    strategy = ReplayStrategy()
+
+    for round_number, entry in enumerate(rounds, start=1):
+        strategy.actions = list(entry['actions'])
+        try:
+            engine.play_round(player, entry['bet'], strategy)
+        except ValueError as e:
+            report.mismatches.append((round_number, entry['balance'], str(e)))
+            break
+        report.rounds += 1
+        if strategy.actions:
+            report.mismatches.append((round_number, entry['balance'], "unused recorded actions"))
+            break
+        if player.balance != entry['balance']:
+            report.mismatches.append((round_number, entry['balance'], player.balance))
+
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def replay_corpus(directory):
+    """Replay every session log in `directory`. Returns the list of reports."""
+    return [
+        replay_session(os.path.join(directory, name))
+        for name in sorted(os.listdir(directory)) if name.endswith('.jsonl')
+    ]
+
+
+if __name__ == '__main__':
+    directory = sys.argv[1] if len(sys.argv) > 1 else 'sessions'
+    reports = replay_corpus(directory)
+    rounds = sum(report.rounds for report in reports)
+    elapsed = sum(report.elapsed for report in reports)
+    for report in reports:
+        status = "OK" if report.ok else f"MISMATCH {report.mismatches[0]}"
+        print(f"{report.path}: {report.rounds} rounds {status}")
+    if elapsed:
+        print(f"{rounds} rounds replayed in {elapsed:.3f}s ({rounds / elapsed:.0f} rounds/s)")
+    sys.exit(0 if all(report.ok for report in reports) else 1)
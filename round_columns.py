@@ -0,0 +1,210 @@
+# round_columns.py
+
+"""Columnar on-disk store with one row per settled player hand.
+
+A store is a directory holding one raw array file per column
+(`<name>.col`, native byte order) and `meta.json` with the column types and
+the player names that the `player` column indexes. Rows are buffered in
+`array` objects and appended to every column file together, so writing
+needs only the standard library. `open_columns` maps the files with NumPy
+memmaps, so slicing a column never copies it.
+
+Each flush holds an exclusive lock on the store and assigns player indexes
+from the metadata read under that lock, so several sessions can write to
+one store at once. A flush interrupted part way leaves some columns longer
+than others; readers ignore the extra rows and the next flush cuts them off
+before appending, so the columns stay aligned.
+"""
+
+import json
+import os
+from array import array
+from contextlib import contextmanager
+
+from game_engine import EngineListener, HIT, STAND, DOUBLE, SPLIT, SURRENDER
+from hand_history import OUTCOMES
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - exercised only without NumPy
+    np = None
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - no file locking on Windows
+    fcntl = None
+
+# Column name -> array typecode
+COLUMNS = {
+    'player': 'H',        # index into meta['players']
+    'round': 'I',         # round number within the session
+    'upcard': 'B',        # dealer upcard rank, 2-11
+    'first_action': 'B',  # index into ACTIONS, NO_ACTION if the hand was never played
+    'player_value': 'B',
+    'dealer_value': 'B',
+    'outcome': 'B',       # index into hand_history.OUTCOMES
+    'bet': 'd',
+    'net': 'd',
+}
+ACTIONS = (HIT, STAND, DOUBLE, SPLIT, SURRENDER)
+NO_ACTION = 255
+META_FILE = 'meta.json'
+LOCK_FILE = '.lock'
+
+
+class ColumnWriter(EngineListener):
+    """Engine listener that appends one row per settled hand to a column store."""
+
+    def __init__(self, directory, flush_rows=4096):
+        self.directory = directory
+        self.flush_rows = flush_rows
+        os.makedirs(directory, exist_ok=True)
+        self.players = []  # Players seen by this writer; buffered rows index this list until flushed
+        self._player_index = {name: index for index, name in enumerate(self.players)}
+        self._buffers = {name: array(code) for name, code in COLUMNS.items()}
+        self._first_actions = {}
+        self._round_number = 0
+        self._upcard = 0
+        self._dealer_value = 0
+        self._pending = []
+
+    def _action(self, hand, action):
+        self._first_actions.setdefault(id(hand), ACTIONS.index(action))
+
+    def on_round_start(self):
+        self._round_number += 1
+        self._first_actions = {}
+        self._pending = []
+
+    def on_hit(self, hand):
+        self._action(hand, HIT)
+
+    def on_stand(self, hand):
+        self._action(hand, STAND)
+
+    def on_double(self, hand):
+        self._action(hand, DOUBLE)
+
+    def on_split(self, hand, split_hand):
+        self._action(hand, SPLIT)
+
+    def on_surrender(self, hand):
+        self._action(hand, SURRENDER)
+
+    def on_settle_start(self, dealer_hand):
+        self._upcard = dealer_hand.cards[0].rank
+        self._dealer_value = dealer_hand.value
+
+    def on_hand_settled(self, hand_index, hand, outcome, payout):
+        self._pending.append((self._first_actions.get(id(hand), NO_ACTION), hand.value,
+                              OUTCOMES.index(outcome), hand.bet, payout - hand.bet))
+
+    def on_round_settled(self, player):
+        player_index = self._player_index.get(player.name)
+        if player_index is None:
+            player_index = self._player_index[player.name] = len(self.players)
+            self.players.append(player.name)
+        buffers = self._buffers
+        for first_action, player_value, outcome, bet, net in self._pending:
+            buffers['player'].append(player_index)
+            buffers['round'].append(self._round_number)
+            buffers['upcard'].append(self._upcard)
+            buffers['first_action'].append(first_action)
+            buffers['player_value'].append(min(player_value, 255))
+            buffers['dealer_value'].append(min(self._dealer_value, 255))
+            buffers['outcome'].append(outcome)
+            buffers['bet'].append(bet)
+            buffers['net'].append(net)
+        self._pending = []
+        if len(buffers['net']) >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        """Append buffered rows to the column files and update the metadata."""
+        with _locked(self.directory):
+            meta = _read_meta(self.directory)
+            players = meta['players'] if meta else []
+            store_index = {name: index for index, name in enumerate(players)}
+            for name in self.players:
+                if name not in store_index:
+                    store_index[name] = len(players)
+                    players.append(name)
+            to_store = [store_index[name] for name in self.players]
+            player_column = array(COLUMNS['player'], (to_store[index] for index in self._buffers['player']))
+            buffers = dict(self._buffers, player=player_column)
+            _trim_columns(self.directory)
+            for name, buffer in buffers.items():
+                with open(os.path.join(self.directory, name + '.col'), 'ab') as f:
+                    buffer.tofile(f)
+            temp_path = os.path.join(self.directory, META_FILE + '.tmp')
+            with open(temp_path, 'w') as f:
+                json.dump({'columns': COLUMNS, 'players': players}, f)
+            os.replace(temp_path, os.path.join(self.directory, META_FILE))
+        for buffer in self._buffers.values():
+            del buffer[:]
+
+    def close(self):
+        self.flush()
+
+
+@contextmanager
+def _locked(directory):
+    """Hold an exclusive lock on a store for the duration of the block."""
+    with open(os.path.join(directory, LOCK_FILE), 'a') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def _trim_columns(directory):
+    """Cut every column file back to the shortest column's row count."""
+    paths = {name: os.path.join(directory, name + '.col') for name in COLUMNS}
+    sizes = {name: os.path.getsize(path) if os.path.exists(path) else 0 for name, path in paths.items()}
+    rows = min(sizes[name] // array(code).itemsize for name, code in COLUMNS.items())
+    for name, code in COLUMNS.items():
+        if sizes[name] > rows * array(code).itemsize:
+            os.truncate(paths[name], rows * array(code).itemsize)
+
+
+def _read_meta(directory):
+    path = os.path.join(directory, META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+class RoundColumns:
+    """Memory-mapped columns of a store, all trimmed to the same row count."""
+
+    def __init__(self, directory):
+        if np is None:
+            raise ImportError("round_columns.open_columns requires NumPy (pip install numpy).")
+        meta = _read_meta(directory)
+        if meta is None:
+            raise FileNotFoundError(f"No column store in '{directory}'.")
+        self.players = meta['players']
+        sizes = {}
+        for name, code in meta['columns'].items():
+            path = os.path.join(directory, name + '.col')
+            sizes[name] = os.path.getsize(path) // np.dtype(code).itemsize if os.path.exists(path) else 0
+        # A write interrupted mid-flush can leave some columns longer than others
+        self.rows = min(sizes.values())
+        self.columns = {}
+        for name, code in meta['columns'].items():
+            if self.rows:
+                self.columns[name] = np.memmap(os.path.join(directory, name + '.col'),
+                                               dtype=np.dtype(code), mode='r', shape=(self.rows,))
+            else:
+                self.columns[name] = np.zeros(0, dtype=np.dtype(code))
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return self.rows
+
+
+def open_columns(directory):
+    """Map a column store written by ColumnWriter."""
+    return RoundColumns(directory)
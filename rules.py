@@ -0,0 +1,63 @@
+# rules.py
+
+"""Table rules as one immutable, hashable object.
+
+`BlackjackEngine` compiles a Rules object into lookup tables when it is
+created, so the rules cost nothing extra per hand. Rules are also accepted
+by `Deck.for_rules`, `EVSolver`, `house_edge`, the simulation runners and
+the front-ends, so rule variants can be compared in one process:
+
+    for payout in (1.5, 1.2):
+        run_simulation(100000, rules=Rules(blackjack_payout=payout))
+"""
+
+from collections import namedtuple
+
+_FIELDS = (
+    ('num_decks', 6),
+    ('penetration', 0.75),            # Fraction of the shoe dealt before the cut card
+    ('dealer_hits_soft_17', True),    # H17; False for S17
+    ('blackjack_payout', 1.5),        # 3:2
+    ('double_after_split', True),
+    ('max_split_hands', None),        # Most hands a player can split into; None for no limit
+    ('surrender', False),             # Give up the first two cards for half the bet
+    ('min_bet', 5),
+    ('max_bet', 500),
+)
+
+
+class Rules(namedtuple('Rules', [name for name, _ in _FIELDS], defaults=[default for _, default in _FIELDS])):
+    """Rule set for a table. Use `replace` to derive a variant."""
+
+    __slots__ = ()
+
+    def __new__(cls, *args, **kwargs):
+        rules = super().__new__(cls, *args, **kwargs)
+        if rules.num_decks < 1:
+            raise ValueError("A shoe needs at least one deck.")
+        if not 0 < rules.penetration <= 1:
+            raise ValueError("Penetration must be between 0 and 1.")
+        if rules.blackjack_payout <= 0:
+            raise ValueError("Blackjack must pay more than zero.")
+        if rules.max_split_hands is not None and rules.max_split_hands < 1:
+            raise ValueError("Splitting allows at least one hand.")
+        if not 0 < rules.min_bet <= rules.max_bet:
+            raise ValueError("Table limits need 0 < min_bet <= max_bet.")
+        return rules
+
+    def replace(self, **changes):
+        """A copy with some rules changed."""
+        return type(self)(**dict(self._asdict(), **changes))
+
+    def as_dict(self):
+        return dict(self._asdict())
+
+
+DEFAULT_RULES = Rules()
+
+
+def resolve(rules=None, **overrides):
+    """`rules` (the defaults if None) with every override that is not None applied."""
+    rules = rules or DEFAULT_RULES
+    changes = {name: value for name, value in overrides.items() if value is not None}
+    return rules.replace(**changes) if changes else rules
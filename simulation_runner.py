@@ -0,0 +1,271 @@
+# simulation_runner.py
+
+"""Monte Carlo simulation across a pool of worker processes.
+
+Rounds are split into one shard per worker. Each shard plays its own shoe
+shuffled by a `random.Random` seeded from (seed, shard index), so a run is
+reproducible for a given seed and worker count, and shard statistics are
+merged in shard order.
+
+`simulate_until` instead runs rounds in batches until the edge is known to
+a requested precision.
+"""
+
+import hashlib
+import math
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+from card_deck_classes import Deck
+from game_engine import BlackjackEngine, WINNING_OUTCOMES, LOSING_OUTCOMES
+from player_hand_classes import Player
+from rules import DEFAULT_RULES, resolve
+
+
+class SimulationStats:
+    """Totals collected over simulated rounds."""
+
+    def __init__(self):
+        self.rounds = 0
+        self.hands = 0
+        self.wins = 0
+        self.losses = 0
+        self.ties = 0
+        self.wagered = 0.0
+        self.net = 0.0
+
+    def record(self, result):
+        """Add one RoundResult."""
+        self.rounds += 1
+        for hand, outcome, payout in result.outcomes:
+            self.hands += 1
+            self.wagered += hand.bet
+            self.net += payout - hand.bet
+            if outcome in WINNING_OUTCOMES:
+                self.wins += 1
+            elif outcome in LOSING_OUTCOMES:
+                self.losses += 1
+            else:
+                self.ties += 1
+
+    def merge(self, other):
+        """Add another SimulationStats into this one."""
+        self.rounds += other.rounds
+        self.hands += other.hands
+        self.wins += other.wins
+        self.losses += other.losses
+        self.ties += other.ties
+        self.wagered += other.wagered
+        self.net += other.net
+        return self
+
+    def edge(self, bet):
+        """Player's average result per round as a fraction of the initial bet."""
+        return self.net / (self.rounds * bet) if self.rounds else 0.0
+
+    def as_dict(self):
+        return {
+            'rounds': self.rounds,
+            'hands': self.hands,
+            'wins': self.wins,
+            'losses': self.losses,
+            'ties': self.ties,
+            'wagered': self.wagered,
+            'net': self.net,
+        }
+
+
+def worker_seed(seed, index):
+    """Independent 64-bit seed for shard `index` of a run seeded with `seed`."""
+    digest = hashlib.sha256(f"{seed}:{index}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def split_rounds(rounds, shards):
+    """Split `rounds` into `shards` near-equal counts."""
+    base, extra = divmod(rounds, shards)
+    return [base + (1 if i < extra else 0) for i in range(shards)]
+
+
+def simulate_shard(rounds, seed, strategy, bet=10, rules=DEFAULT_RULES, seats=1, lazy_shuffle=False):
+    """Play `rounds` seat-rounds on a private shoe and return their SimulationStats.
+
+    With several `seats` the players share each dealer hand, so the dealer
+    plays once per table round. `lazy_shuffle` draws cards as they are dealt
+    instead of shuffling the whole shoe.
+    """
+    deck = Deck.for_rules(rules, rng=random.Random(seed), lazy_shuffle=lazy_shuffle)
+    engine = BlackjackEngine(deck, rules=rules)
+    stats = SimulationStats()
+    if seats == 1:
+        player = Player('Simulation', float('inf'), 0)
+        for _ in range(rounds):
+            stats.record(engine.play_round(player, bet, strategy))
+        return stats
+
+    table = [(Player(f'Seat {seat}', float('inf'), 0), bet, strategy) for seat in range(1, seats + 1)]
+    full_rounds, remainder = divmod(rounds, seats)
+    for _ in range(full_rounds):
+        for result in engine.play_table_round(table):
+            stats.record(result)
+    if remainder:
+        for result in engine.play_table_round(table[:remainder]):
+            stats.record(result)
+    return stats
+
+
+def _run_shard(args):
+    return simulate_shard(*args)
+
+
+def run_simulation(rounds, strategy=None, bet=10, seed=0, workers=None, num_decks=None, penetration=None,
+                   seats=1, lazy_shuffle=False, rules=None):
+    """Simulate `rounds` seat-rounds with an unlimited bankroll and return merged SimulationStats.
+
+    `strategy` defaults to basic strategy for the rules and must be picklable. `seats`
+    players share each table round. The game follows `rules` (the defaults
+    if None), with `num_decks` and `penetration` overriding its shoe. With
+    one worker the shard runs in this process.
+    """
+    rules = resolve(rules, num_decks=num_decks, penetration=penetration)
+    if strategy is None:
+        from basic_strategy import strategy_for
+        strategy = strategy_for(rules)
+    workers = workers or os.cpu_count() or 1
+    shards = [
+        (count, worker_seed(seed, index), strategy, bet, rules, seats, lazy_shuffle)
+        for index, count in enumerate(split_rounds(rounds, workers))
+    ]
+    if workers == 1:
+        results = [_run_shard(shards[0])]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_shard, shards))
+
+    stats = SimulationStats()
+    for shard_stats in results:
+        stats.merge(shard_stats)
+    return stats
+
+
+class RunningMoments:
+    """Streaming mean and variance of a series of values (Welford's algorithm)."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0  # Sum of squared deviations from the mean
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def merge(self, other):
+        """Combine with another RunningMoments as if all values were added here."""
+        count = self.count + other.count
+        if count:
+            delta = other.mean - self.mean
+            self.mean += delta * other.count / count
+            self._m2 += other._m2 + delta * delta * self.count * other.count / count
+            self.count = count
+        return self
+
+    @property
+    def variance(self):
+        """Sample variance."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stderr(self):
+        """Standard error of the mean."""
+        return math.sqrt(self.variance / self.count) if self.count else float('inf')
+
+    def half_width(self, confidence=0.95):
+        """Half the width of the normal confidence interval for the mean."""
+        return NormalDist().inv_cdf(0.5 + confidence / 2) * self.stderr
+
+
+class SequentialResult:
+    """Outcome of `simulate_until`."""
+
+    def __init__(self, stats, moments, precision, confidence, elapsed, min_rounds=0):
+        self.stats = stats
+        self.moments = moments  # Net result per round, in units of the bet
+        self.precision = precision
+        self.confidence = confidence
+        self.elapsed = elapsed
+        self.min_rounds = min_rounds  # Rounds needed before the interval is trusted
+
+    @property
+    def rounds(self):
+        return self.stats.rounds
+
+    @property
+    def edge(self):
+        return self.moments.mean
+
+    @property
+    def half_width(self):
+        return self.moments.half_width(self.confidence)
+
+    @property
+    def converged(self):
+        return self.rounds >= self.min_rounds and self.half_width <= self.precision
+
+    def as_dict(self):
+        return {
+            'rounds': self.rounds,
+            'edge': self.edge,
+            'half_width': self.half_width,
+            'confidence': self.confidence,
+            'converged': self.converged,
+            'elapsed': self.elapsed,
+        }
+
+
+def simulate_until(precision, confidence=0.95, strategy=None, bet=10, seed=0, batch_size=10000,
+                   max_rounds=None, num_decks=None, penetration=None, lazy_shuffle=False, rules=None,
+                   min_rounds=1000):
+    """Play rounds in batches until the player's edge is known to within `precision`.
+
+    `precision` is the half-width of the `confidence` interval for the net
+    result per round as a fraction of the bet, e.g. 0.0005 for +/-0.05%. The
+    interval is checked after every batch of `batch_size` rounds once at
+    least `min_rounds` and two batches have been played, so a handful of
+    equal results cannot look converged. Stops early, unconverged, after
+    `max_rounds`.
+    Runs in this process on one shoe, under `rules` as in `run_simulation`.
+    Returns a SequentialResult.
+    """
+    if precision <= 0:
+        raise ValueError("Precision must be positive.")
+    if not 0 < confidence < 1:
+        raise ValueError("Confidence must be between 0 and 1.")
+    min_rounds = max(min_rounds, 2 * batch_size)
+    start = time.perf_counter()
+    rules = resolve(rules, num_decks=num_decks, penetration=penetration)
+    if strategy is None:
+        from basic_strategy import strategy_for
+        strategy = strategy_for(rules)
+    deck = Deck.for_rules(rules, rng=random.Random(worker_seed(seed, 0)), lazy_shuffle=lazy_shuffle)
+    engine = BlackjackEngine(deck, rules=rules)
+    player = Player('Simulation', float('inf'), 0)
+    stats = SimulationStats()
+    moments = RunningMoments()
+    target = precision / NormalDist().inv_cdf(0.5 + confidence / 2)
+    while True:
+        batch = batch_size if max_rounds is None else min(batch_size, max_rounds - stats.rounds)
+        for _ in range(batch):
+            result = engine.play_round(player, bet, strategy)
+            stats.record(result)
+            moments.add(result.net / bet)
+        if stats.rounds >= min_rounds and moments.stderr <= target:
+            break
+        if batch < batch_size or stats.rounds == max_rounds:
+            break
+    return SequentialResult(stats, moments, precision, confidence, time.perf_counter() - start, min_rounds)
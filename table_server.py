@@ -0,0 +1,279 @@
+# table_server.py
+
+"""asyncio Blackjack server hosting many tables over a line protocol.
+
+Each table owns its own shoe and seats up to seven players, who share one
+dealer hand per round. Every connection is a coroutine, so idle players cost no threads. Players
+bet with `Player.place_bet` and act through `BlackjackEngine`, which
+handles doubles, splits, dealer play and settlement.
+
+Client commands, one per line:
+    JOIN <table> <name> [balance]
+    BET <amount> | PASS
+    HIT | STAND | DOUBLE | SPLIT | SURRENDER (where the rules allow it)
+    QUIT
+
+Server messages:
+    WELCOME, SEATED <table> <seat>, BETS <min> <max> <balance>,
+    DEALT <hand> (<value>) DEALER <upcard>, TURN <hand #> <hand> (<value>) OPTIONS <actions>,
+    HAND <hand #> <hand> (<value>), DEALER <hand> (<value>),
+    RESULT <hand #> <outcome> <payout>, BALANCE <balance>, ERROR <message>
+
+Run with `python table_server.py [port]`.
+"""
+
+import asyncio
+import logging
+import sys
+
+from card_deck_classes import Deck
+from game_engine import BlackjackEngine, STAND, MAX_SEATS
+from player_hand_classes import Player
+from rules import DEFAULT_RULES, resolve
+
+SEND_TIMEOUT = 10.0  # Seconds a client may take to accept buffered output before it is dropped
+
+
+class Seat:
+    """A connected player sitting at a table."""
+
+    def __init__(self, player, writer, send_timeout=SEND_TIMEOUT):
+        self.player = player
+        self.writer = writer
+        self.send_timeout = send_timeout
+        self.commands = asyncio.Queue()
+        self.connected = True
+        self.number = None  # Seat number at the table, 1 to MAX_SEATS
+
+    def write(self, line):
+        """Buffer a line without waiting for the client to read it."""
+        if self.connected:
+            self.writer.write((line + '\n').encode())
+
+    async def send(self, line):
+        """Send a line, waiting while the client is behind. A client that stays behind is disconnected."""
+        self.write(line)
+        if not self.connected:
+            return
+        try:
+            await asyncio.wait_for(self.writer.drain(), self.send_timeout)
+        except (ConnectionError, asyncio.TimeoutError):
+            self.connected = False
+            self.writer.close()
+
+    async def command(self, timeout):
+        """Next command from the player as a list of words, or None on timeout or disconnect."""
+        if not self.connected and self.commands.empty():
+            return None
+        try:
+            parts = await asyncio.wait_for(self.commands.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        if parts[0].upper() == 'QUIT':
+            self.connected = False
+            return None
+        return parts
+
+
+class Table:
+    """One table: a shoe, a dealer and its seats, played by a single task."""
+
+    def __init__(self, name, deck=None, bet_timeout=30.0, action_timeout=60.0, rules=None):
+        self.name = name
+        self.rules = rules or DEFAULT_RULES
+        self.engine = BlackjackEngine(deck or Deck.for_rules(self.rules), rules=self.rules)
+        self.seats = []
+        self.bet_timeout = bet_timeout
+        self.action_timeout = action_timeout
+        self.task = None
+
+    @property
+    def deck(self):
+        return self.engine.deck
+
+    def sit(self, seat):
+        """Seat a player in the lowest free seat and return its number."""
+        taken = {other.number for other in self.seats}
+        if len(taken) >= MAX_SEATS:
+            raise ValueError("Table is full.")
+        seat.number = min(set(range(1, MAX_SEATS + 1)) - taken)
+        self.seats.append(seat)
+        self.seats.sort(key=lambda other: other.number)
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self.run())
+            self.task.add_done_callback(self._run_finished)
+        return seat.number
+
+    async def run(self):
+        while self.seats:
+            await self.play_round()
+
+    def _run_finished(self, task):
+        """Tell the seated players and drop them if the table's task failed."""
+        if task.cancelled() or task.exception() is None:
+            return
+        error = task.exception()
+        logging.error("Table %s stopped", self.name, exc_info=error)
+        for seat in self.seats:
+            seat.write(f"ERROR Table {self.name} stopped: {error}")
+            seat.connected = False
+            seat.writer.close()
+        self.seats = []
+
+    async def _take_bet(self, seat):
+        player = seat.player
+        min_bet, max_bet = self.rules.min_bet, self.rules.max_bet
+        await seat.send(f"BETS {min_bet} {max_bet} {player.balance:.2f}")
+        while True:
+            parts = await seat.command(self.bet_timeout)
+            if parts is None or parts[0].upper() == 'PASS':
+                return None
+            if parts[0].upper() != 'BET' or len(parts) != 2:
+                await seat.send("ERROR Expected BET <amount> or PASS")
+                continue
+            try:
+                bet = float(parts[1])
+            except ValueError:
+                await seat.send("ERROR Please enter a valid number.")
+                continue
+            if bet < min_bet or bet > max_bet:
+                await seat.send(f"ERROR Bet must be between ${min_bet} and ${max_bet}.")
+            elif bet > player.balance:
+                await seat.send("ERROR Insufficient funds to place this bet.")
+            else:
+                return bet
+
+    async def _play_seat(self, seat, dealer_hand):
+        player = seat.player
+        for hand_index, hand in enumerate(player.hands):
+            label = hand_index + 1
+            while hand.value < 21:
+                actions = self.engine.available_actions(player, hand)
+                await seat.send(f"TURN {label} {hand} ({hand.value}) OPTIONS {','.join(actions)}")
+                parts = await seat.command(self.action_timeout)
+                action = parts[0].lower() if parts else STAND
+                if action not in actions:
+                    await seat.send(f"ERROR Choose one of {','.join(actions)}")
+                    continue
+                finished = self.engine.apply_action(player, hand, action)
+                await seat.send(f"HAND {label} {hand} ({hand.value})")
+                if finished:
+                    break
+
+    async def play_round(self):
+        seats = list(self.seats)
+        bets = await asyncio.gather(*(self._take_bet(seat) for seat in seats))
+        self.seats = [seat for seat in self.seats if seat.connected]
+        playing = [(seat, bet) for seat, bet in zip(seats, bets) if bet is not None]
+        if not playing:
+            return
+
+        dealer_hand = self.engine.deal_seats([(seat.player, bet) for seat, bet in playing])
+        for seat, _ in playing:
+            hand = seat.player.hands[0]
+            await seat.send(f"DEALT {hand} ({hand.value}) DEALER {dealer_hand.cards[0]}")
+
+        for seat, _ in playing:
+            await self._play_seat(seat, dealer_hand)
+
+        self.engine.dealer_turn(dealer_hand)
+        results = self.engine.settle_seats([seat.player for seat, _ in playing], dealer_hand)
+        for (seat, _), result in zip(playing, results):
+            await seat.send(f"DEALER {dealer_hand} ({dealer_hand.value})")
+            for hand_index, (hand, outcome, payout) in enumerate(result.outcomes, start=1):
+                await seat.send(f"RESULT {hand_index} {outcome} {payout:.2f}")
+            await seat.send(f"BALANCE {seat.player.balance:.2f}")
+        self.seats = [seat for seat in self.seats if seat.connected]
+
+
+class TableServer:
+    """Accepts connections and seats players at named tables."""
+
+    def __init__(self, num_decks=None, bet_timeout=30.0, action_timeout=60.0, deck_factory=None, rules=None):
+        """Every table plays by `rules`; `num_decks` overrides their shoe size."""
+        self.rules = resolve(rules, num_decks=num_decks)
+        self.bet_timeout = bet_timeout
+        self.action_timeout = action_timeout
+        self.deck_factory = deck_factory or (lambda: Deck.for_rules(self.rules))
+        self.tables = {}
+        self._server = None
+
+    def table(self, name):
+        table = self.tables.get(name)
+        if table is None:
+            table = self.tables[name] = Table(name, self.deck_factory(), self.bet_timeout, self.action_timeout,
+                                              self.rules)
+        return table
+
+    async def _join(self, parts, writer):
+        if len(parts) not in (3, 4):
+            raise ValueError("Expected JOIN <table> <name> [balance]")
+        try:
+            balance = float(parts[3]) if len(parts) == 4 else 1000.0
+        except ValueError:
+            raise ValueError("Balance must be a number.")
+        seat = Seat(Player(parts[2], balance, 0), writer)
+        table = self.table(parts[1])
+        seat_number = table.sit(seat)
+        await seat.send(f"SEATED {table.name} {seat_number}")
+        return seat
+
+    async def handle_client(self, reader, writer):
+        seat = None
+        try:
+            writer.write(b"WELCOME\n")
+            await writer.drain()
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                parts = line.decode(errors='replace').split()
+                if not parts:
+                    continue
+                command = parts[0].upper()
+                if command == 'QUIT':
+                    break
+                if seat is not None:
+                    seat.commands.put_nowait(parts)
+                elif command == 'JOIN':
+                    try:
+                        seat = await self._join(parts, writer)
+                    except ValueError as e:
+                        writer.write(f"ERROR {e}\n".encode())
+                        await writer.drain()
+                else:
+                    writer.write(b"ERROR Join a table first\n")
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if seat is not None:
+                seat.commands.put_nowait(['QUIT'])
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8765):
+        self._server = await asyncio.start_server(self.handle_client, host, port)
+        return self._server
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+        for table in self.tables.values():
+            if table.task is not None:
+                table.task.cancel()
+
+
+async def _serve(port):
+    server = TableServer()
+    await server.start(port=port)
+    print(f"Blackjack tables listening on port {server.port}")
+    async with server._server:
+        await server._server.serve_forever()
+
+
+if __name__ == '__main__':
+    asyncio.run(_serve(int(sys.argv[1]) if len(sys.argv) > 1 else 8765))
@@ -1,8 +1,67 @@
 # test_blackjack.py
 import unittest
 from card_deck_classes import Card, Deck
+import card_deck_classes
 from player_hand_classes import Hand, Player
 from Main import BlackjackGame
+import itertools
+import json
+import os
+import tempfile
+import basic_strategy
+import random
+import statistics
+import simulation_runner
+import batch_simulator
+import bankroll
+import hand_history
+from game_engine import ListenerGroup, EngineListener
+import round_columns
+import analytics
+import replay
+import asyncio
+import threading
+import table_server
+import benchmarks
+import instrumentation
+import io
+import renderers
+import tournament
+import house_edge
+import unittest.mock
+import Main
+from player_store import TextPlayerStore, SQLitePlayerStore
+import dealer_probabilities
+from ev_solver import EVSolver
+from rules import Rules, DEFAULT_RULES
+from game_engine import BlackjackEngine, Strategy, ThresholdStrategy, HIT, STAND, DOUBLE, SPLIT, SURRENDER, SURRENDERED
+
+
+class StackedDeck:
+    """Deck stand-in that deals a fixed sequence of cards in order."""
+
+    def __init__(self, cards):
+        self.cards = list(reversed(cards))
+
+    def deal(self):
+        return self.cards.pop()
+
+    def reshuffle_if_needed(self):
+        return False
+
+
+class ScriptedStrategy(Strategy):
+    """Plays a fixed list of actions."""
+
+    def __init__(self, actions):
+        self.actions = list(actions)
+
+    def decide(self, player, hand, dealer_upcard, actions):
+        return self.actions.pop(0)
+
+
+def cards(*values):
+    return [Card('Spades', value) for value in values]
 
 class TestCardDeckClasses(unittest.TestCase):
 
@@ -38,6 +97,128 @@ class TestCardDeckClasses(unittest.TestCase):
         self.assertIsInstance(card, Card)
         self.assertEqual(len(deck.cards), initial_count - 1)
 
+    def test_card_codes(self):
+        card = Card('Clubs', 'Queen')
+        self.assertEqual(card.code, Deck.VALUES.index('Queen') * 4 + Deck.SUITS.index('Clubs'))
+        shared = Card.from_code(card.code)
+        self.assertEqual((shared.suit, shared.value, shared.rank), ('Clubs', 'Queen', 10))
+        with self.assertRaises(AttributeError):
+            card.colour = 'black'
+
+    def test_shoe_is_compact(self):
+        deck = Deck(num_decks=8)
+        self.assertEqual(deck._shoe.itemsize * len(deck._shoe), 416)
+        first = deck.cards[0]
+        self.assertIs(deck.deal(), first)
+        self.assertIs(deck.deal(), Card.from_code(deck._shoe[1]))
+        self.assertEqual(deck.cards_dealt, 2)
+
+    def test_running_count_and_composition(self):
+        deck = Deck(num_decks=2, rng=random.Random(4))
+        self.assertEqual(deck.composition(), (8,) * 8 + (32, 8))
+        dealt = [deck.deal() for _ in range(40)]
+        hi_lo = {2: 1, 3: 1, 4: 1, 5: 1, 6: 1, 10: -1, 11: -1}
+        self.assertEqual(deck.running_count, sum(hi_lo.get(card.rank, 0) for card in dealt))
+        counts = [0] * 10
+        for card in deck.cards:
+            counts[card.rank - 2] += 1
+        self.assertEqual(deck.composition(), tuple(counts))
+        self.assertAlmostEqual(deck.true_count, deck.running_count / (64 / 52))
+
+    def test_count_resets_on_reshuffle(self):
+        deck = Deck(num_decks=1, penetration=0.5, rng=random.Random(5))
+        for _ in range(30):
+            deck.deal()
+        deck.reshuffle_if_needed()
+        self.assertEqual(deck.running_count, 0)
+        self.assertEqual(deck.composition(), deck.full_composition())
+
+    def test_pluggable_count_systems(self):
+        deck = Deck(num_decks=1, rng=random.Random(6), count_system='zen')
+        other = Deck(num_decks=1, rng=random.Random(6), count_system=(1,) * 10)
+        for _ in range(20):
+            deck.deal()
+            other.deal()
+        self.assertEqual(other.running_count, 20)
+        self.assertEqual(deck.count_with(card_deck_classes.COUNT_SYSTEMS['zen']), deck.running_count)
+        self.assertEqual(deck.count_with((1,) * 10), 20)
+        with self.assertRaises(ValueError):
+            Deck(count_system='unknown')
+        with self.assertRaises(ValueError):
+            Deck(count_system=(1, 0, -1))
+
+    def _position_chi_square(self, lazy, position, trials=2600):
+        # Which of the 52 cards lands at `position` should be uniform
+        deck = Deck(num_decks=1, penetration=1.0, rng=random.Random(position + lazy), lazy_shuffle=lazy)
+        counts = [0] * 52
+        for _ in range(trials):
+            deck.reshuffle()
+            for _ in range(position):
+                deck.deal_code()
+            counts[deck.deal_code()] += 1
+        expected = trials / 52
+        return sum((count - expected) ** 2 / expected for count in counts)
+
+    def test_lazy_shuffle_is_uniform(self):
+        # 51 degrees of freedom: chi-square above 87.97 has probability 0.001
+        for position in (0, 20, 51):
+            self.assertLess(self._position_chi_square(True, position), 87.97)
+            self.assertLess(self._position_chi_square(False, position), 87.97)
+
+    def test_lazy_shuffle_deals_every_card_once(self):
+        deck = Deck(num_decks=2, penetration=1.0, rng=random.Random(9), lazy_shuffle=True)
+        codes = [deck.deal_code() for _ in range(104)]
+        self.assertEqual(sorted(codes), sorted(list(range(52)) * 2))
+        self.assertEqual(deck.composition(), (0,) * 10)
+
+    def test_lazy_shuffle_draws_only_dealt_cards(self):
+        class CountingRandom(random.Random):
+            calls = 0
+
+            def _randbelow(self, n):
+                self.calls += 1
+                return super()._randbelow(n)
+
+        rng = CountingRandom(3)
+        deck = Deck(rng=rng, lazy_shuffle=True)
+        self.assertEqual(rng.calls, 0)
+        for _ in range(10):
+            deck.deal()
+        deck.reshuffle()
+        self.assertEqual(rng.calls, 10)
+        self.assertEqual(len(deck.cards), 312)
+
+    def test_cut_card_flags_reshuffle(self):
+        deck = Deck(num_decks=1, cut_card=10)
+        for _ in range(9):
+            deck.deal()
+        self.assertFalse(deck.cut_card_reached)
+        deck.deal()
+        self.assertTrue(deck.cut_card_reached)
+        # The round in progress keeps dealing from the same shoe
+        deck.deal()
+        self.assertEqual(len(deck.cards), 41)
+
+    def test_reshuffle_between_rounds(self):
+        deck = Deck(num_decks=1, penetration=0.5)
+        reshuffles = []
+        deck.add_reshuffle_listener(reshuffles.append)
+        self.assertFalse(deck.reshuffle_if_needed())
+        for _ in range(26):
+            deck.deal()
+        self.assertTrue(deck.reshuffle_if_needed())
+        self.assertEqual(reshuffles, [deck])
+        self.assertEqual(len(deck.cards), 52)
+        self.assertEqual(deck.shuffle_count, 1)
+        self.assertFalse(deck.cut_card_reached)
+
+    def test_empty_shoe_reshuffles(self):
+        deck = Deck(num_decks=1, penetration=1.0)
+        for _ in range(52):
+            deck.deal()
+        self.assertIsInstance(deck.deal(), Card)
+        self.assertEqual(len(deck.cards), 51)
+
 class TestPlayerHandClasses(unittest.TestCase):
 
     def test_hand_add_card(self):
@@ -67,6 +248,49 @@ class TestPlayerHandClasses(unittest.TestCase):
         hand.add_card(Card('Spades', 'King'))
         self.assertTrue(hand.is_blackjack())
 
+    def test_hand_tracks_totals_incrementally(self):
+        hand = Hand()
+        hand.add_card(Card('Hearts', 'Ace'))
+        hand.add_card(Card('Clubs', '6'))
+        self.assertEqual((hand.value, hand.hard_total, hand.num_aces), (17, 7, 1))
+        self.assertTrue(hand.soft)
+        hand.add_card(Card('Spades', '9'))
+        self.assertEqual(hand.value, 16)
+        self.assertFalse(hand.soft)
+        hand.add_card(Card('Spades', 'King'))
+        self.assertTrue(hand.is_bust())
+
+    def test_hand_matches_full_recount(self):
+        deck = Deck(num_decks=1)
+        for _ in range(200):
+            hand = Hand()
+            hand.add_card(deck.deal())
+            while hand.value < 17:
+                hand.add_card(deck.deal())
+            ranks = [card.rank for card in hand.cards]
+            value = sum(ranks)
+            aces = ranks.count(11)
+            soft = aces > 0 and value <= 21
+            while value > 21 and aces:
+                value -= 10
+                aces -= 1
+            self.assertEqual(hand.calculate_value(), value)
+            self.assertEqual(hand.is_soft_hand(), soft)
+
+    def test_hand_pop_card_unwinds_totals(self):
+        hand = Hand()
+        hand.add_card(Card('Hearts', 'Ace'))
+        hand.add_card(Card('Clubs', 'Ace'))
+        self.assertEqual(hand.value, 12)
+        hand.pop_card()
+        self.assertEqual((hand.value, hand.num_aces, hand.hard_total), (11, 1, 1))
+
+    def test_hand_cards_assignment_recomputes(self):
+        hand = Hand()
+        hand.cards = [Card('Hearts', 'Ace'), Card('Clubs', 'King')]
+        self.assertTrue(hand.is_blackjack())
+        self.assertEqual(hand.value, 21)
+
     def test_player_place_bet(self):
         player = Player('TestPlayer', 1000, 30)
         hand = player.place_bet(100)
@@ -101,6 +325,8 @@ class TestPlayerHandClasses(unittest.TestCase):
         self.assertEqual(hand2.bet, 100)
         self.assertEqual(len(hand1.cards), 1)
         self.assertEqual(len(hand2.cards), 1)
+        self.assertEqual(hand1.value, 8)
+        self.assertEqual(hand2.value, 8)
 
 class TestBlackjackGame(unittest.TestCase):
 
@@ -201,5 +427,1190 @@ class TestBlackjackGame(unittest.TestCase):
         # Expected balance: 1000 - 100 (bet) + 100 (returned bet) = 1000
         self.assertEqual(self.game.player.balance, 1000)  # Push (tie)
 
+class TestBlackjackEngine(unittest.TestCase):
+
+    def test_round_player_stands_and_wins(self):
+        # Player 10+9, dealer 7+9 then draws 2 to reach 18
+        engine = BlackjackEngine(StackedDeck(cards('10', '9', '7', '9', '2')))
+        player = Player('TestPlayer', 1000, 30)
+        result = engine.play_round(player, 100, ScriptedStrategy([STAND]))
+        self.assertEqual(result.dealer_value, 18)
+        self.assertEqual(result.net, 100)
+        self.assertEqual(player.balance, 1100)
+        self.assertEqual(player.wins, 1)
+
+    def test_dealer_hits_soft_17(self):
+        # Dealer Ace+6 is a soft 17 and must draw
+        engine = BlackjackEngine(StackedDeck(cards('10', '10', 'Ace', '6', '4')))
+        player = Player('TestPlayer', 1000, 30)
+        result = engine.play_round(player, 100, ScriptedStrategy([STAND]))
+        self.assertEqual(result.dealer_value, 21)
+        self.assertEqual(player.balance, 900)
+
+    def test_blackjack_pays_three_to_two(self):
+        engine = BlackjackEngine(StackedDeck(cards('Ace', 'King', '9', '8')))
+        player = Player('TestPlayer', 1000, 30)
+        result = engine.play_round(player, 100, ScriptedStrategy([]))
+        self.assertEqual(result.net, 150)
+        self.assertEqual(player.balance, 1150)
+
+    def test_dealer_stands_on_soft_17_under_s17(self):
+        engine = BlackjackEngine(StackedDeck(cards('10', '10', 'Ace', '6', '4')), rules=Rules(dealer_hits_soft_17=False))
+        player = Player('TestPlayer', 1000, 30)
+        result = engine.play_round(player, 100, ScriptedStrategy([STAND]))
+        self.assertEqual(result.dealer_value, 17)
+        self.assertEqual(player.balance, 1100)
+
+    def test_blackjack_payout_from_rules(self):
+        engine = BlackjackEngine(StackedDeck(cards('Ace', 'King', '9', '8')), rules=Rules(blackjack_payout=1.2))
+        player = Player('TestPlayer', 1000, 30)
+        self.assertEqual(engine.play_round(player, 100, ScriptedStrategy([])).net, 120)
+
+    def test_split_rules(self):
+        player = Player('TestPlayer', 1000, 30)
+        engine = BlackjackEngine(StackedDeck(cards('8', '8', '10', '7', '8', '3')),
+                                 rules=Rules(double_after_split=False, max_split_hands=2))
+        hand, _ = engine.deal_round(player, 100)
+        self.assertIn(SPLIT, engine.available_actions(player, hand))
+        engine.apply_action(player, hand, SPLIT)
+        # The first hand is 8,8 again, but two hands is the limit, and no doubling after a split
+        self.assertEqual(engine.available_actions(player, player.hands[0]), [HIT, STAND])
+        self.assertEqual(engine.available_actions(player, player.hands[1]), [HIT, STAND])
+
+    def test_surrender_returns_half_the_bet(self):
+        player = Player('TestPlayer', 1000, 30)
+        engine = BlackjackEngine(StackedDeck(cards('10', '6', '10', '9')))
+        hand, _ = engine.deal_round(player, 100)
+        self.assertNotIn(SURRENDER, engine.available_actions(player, hand))
+
+        player = Player('TestPlayer', 1000, 30)
+        engine = BlackjackEngine(StackedDeck(cards('10', '6', '10', '9')), rules=Rules(surrender=True))
+        result = engine.play_round(player, 100, ScriptedStrategy([SURRENDER]))
+        self.assertEqual(result.outcomes[0][1], SURRENDERED)
+        self.assertEqual(result.net, -50)
+        self.assertEqual(player.balance, 950)
+        self.assertEqual(player.losses, 1)
+
+    def test_double_down(self):
+        engine = BlackjackEngine(StackedDeck(cards('6', '5', '10', '7', '10')))
+        player = Player('TestPlayer', 1000, 30)
+        result = engine.play_round(player, 100, ScriptedStrategy([DOUBLE]))
+        self.assertEqual(result.outcomes[0][1], 'win')
+        self.assertEqual(player.balance, 1200)
+
+    def test_split_plays_both_hands(self):
+        # 8,8 split: first hand draws 10 and stands, second draws 3 then hits a 10
+        deck = StackedDeck(cards('8', '8', '10', '7', '10', '3', '10'))
+        engine = BlackjackEngine(deck)
+        player = Player('TestPlayer', 1000, 30)
+        result = engine.play_round(player, 100, ScriptedStrategy([SPLIT, STAND, HIT]))
+        self.assertEqual([outcome for _, outcome, _ in result.outcomes], ['win', 'win'])
+        self.assertEqual(player.balance, 1200)
+
+    def test_unavailable_action_rejected(self):
+        engine = BlackjackEngine(StackedDeck(cards('10', '9', '7', '9')))
+        player = Player('TestPlayer', 1000, 30)
+        with self.assertRaises(ValueError):
+            engine.play_round(player, 100, ScriptedStrategy([SPLIT]))
+
+    def test_shoe_persists_across_rounds(self):
+        deck = Deck(num_decks=1)
+        engine = BlackjackEngine(deck)
+        player = Player('TestPlayer', 1000, 30)
+        engine.play_round(player, 10, ThresholdStrategy(17))
+        engine.play_round(player, 10, ThresholdStrategy(17))
+        self.assertIs(engine.deck, deck)
+        self.assertGreaterEqual(deck.cards_dealt, 8)
+
+    def test_run_session(self):
+        engine = BlackjackEngine(Deck())
+        player = Player('TestPlayer', 1000, 30)
+        rounds = engine.run_session(player, ThresholdStrategy(17), 10, 200)
+        self.assertGreaterEqual(player.wins + player.losses + player.ties, rounds)
+        self.assertLessEqual(rounds, 200)
+
+    def test_table_round_shares_one_dealer_hand(self):
+        # Three seats and the dealer take one card each, twice round
+        deck = StackedDeck(cards('10', '8', '10', '10', '9', '8', '6', '7', '10', '3', '10', '10'))
+
+        class DealerStarts(EngineListener):
+            count = 0
+
+            def on_dealer_start(self, dealer_hand):
+                self.count += 1
+
+        listener = DealerStarts()
+        engine = BlackjackEngine(deck, listener)
+        players = [Player(name, 1000, 30) for name in ('One', 'Two', 'Three')]
+        strategies = [ScriptedStrategy([STAND]), ScriptedStrategy([SPLIT, STAND, HIT]), ScriptedStrategy([HIT])]
+        results = engine.play_table_round([(player, 100, strategy) for player, strategy in zip(players, strategies)])
+
+        self.assertEqual(listener.count, 1)
+        self.assertEqual(deck.cards, [])
+        self.assertEqual([result.dealer_value for result in results], [17, 17, 17])
+        self.assertEqual([[outcome for _, outcome, _ in result.outcomes] for result in results],
+                         [['win'], ['win', 'win'], ['bust']])
+        self.assertEqual([player.balance for player in players], [1100, 1200, 900])
+
+    def test_table_seat_limit(self):
+        engine = BlackjackEngine(Deck())
+        seats = [(Player(f'P{seat}', 1000, 30), 10) for seat in range(8)]
+        with self.assertRaises(ValueError):
+            engine.deal_seats(seats)
+        with self.assertRaises(ValueError):
+            engine.deal_seats([])
+
+    def test_bad_bet_leaves_every_seat_unchanged(self):
+        engine = BlackjackEngine(Deck())
+        first, second = Player('A', 100, 30), Player('B', 5, 30)
+        with self.assertRaises(ValueError):
+            engine.deal_seats([(first, 50), (second, 50)])
+        self.assertEqual((first.balance, first.hands), (100, []))
+        self.assertEqual((second.balance, second.hands), (5, []))
+        self.assertEqual(engine.deck.cards_dealt, 0)
+
+    def test_settle_seats_records_every_seat(self):
+        path = os.path.join(tempfile.mkdtemp(), 'history.bin')
+        writer = hand_history.HandHistoryWriter(path)
+        engine = BlackjackEngine(Deck(rng=random.Random(3)), hand_history.HandHistoryRecorder(writer))
+        players = [Player(name, 1000, 30) for name in ('One', 'Two')]
+        engine.play_table_round([(player, 10, ThresholdStrategy(17)) for player in players])
+        writer.close()
+        records = list(hand_history.read_hand_history(path))
+        self.assertEqual([record.player_name for record in records], ['One', 'Two'])
+        self.assertEqual([len(record.hands) for record in records], [len(player.hands) for player in players])
+
+class TestRules(unittest.TestCase):
+    def test_rules_are_immutable_and_validated(self):
+        rules = Rules()
+        with self.assertRaises(AttributeError):
+            rules.num_decks = 2
+        self.assertEqual(rules, DEFAULT_RULES)
+        self.assertEqual(hash(rules.replace(min_bet=10)), hash(Rules(min_bet=10)))
+        with self.assertRaises(ValueError):
+            Rules(penetration=0)
+        with self.assertRaises(ValueError):
+            rules.replace(min_bet=600)
+
+    def test_engine_builds_deck_from_rules(self):
+        engine = BlackjackEngine(rules=Rules(num_decks=2, penetration=0.5))
+        self.assertEqual(engine.deck.num_decks, 2)
+        self.assertEqual(engine.deck.cut_card_position, 52)
+
+    def test_dealer_probabilities_follow_soft_17_rule(self):
+        hits = dealer_probabilities.dealer_probabilities(11)
+        stands = dealer_probabilities.dealer_probabilities(11, hits_soft_17=False)
+        self.assertAlmostEqual(sum(stands), 1.0)
+        self.assertGreater(stands[0], hits[0])  # More final 17s when standing on soft 17
+
+    def test_solver_uses_rules(self):
+        shoe = dealer_probabilities.full_composition(6)
+        three_to_two = EVSolver().evaluate([11, 10], 6, shoe)[STAND]
+        six_to_five = EVSolver(rules=Rules(blackjack_payout=1.2)).evaluate([11, 10], 6, shoe)[STAND]
+        self.assertAlmostEqual(six_to_five / three_to_two, 1.2 / 1.5)
+        evs = EVSolver(rules=Rules(surrender=True, double_after_split=False)).evaluate([10, 6], 10, shoe)
+        self.assertEqual(evs[SURRENDER], -0.5)
+
+    def test_simulation_takes_rules(self):
+        stats = simulation_runner.run_simulation(300, seed=2, workers=1, rules=Rules(num_decks=1, surrender=True))
+        self.assertEqual(stats.rounds, 300)
+
+
+class TestDealerProbabilities(unittest.TestCase):
+
+    def test_infinite_table_sums_to_one(self):
+        for upcard, probabilities in dealer_probabilities.infinite_deck_table().items():
+            self.assertAlmostEqual(sum(probabilities), 1.0)
+        self.assertAlmostEqual(dealer_probabilities.dealer_probabilities(11)[dealer_probabilities.BLACKJACK], 4 / 13)
+
+    def test_finite_matches_dealer_turn(self):
+        # Enumerate every ordering of a small shoe through the engine's dealer play
+        values = ['Ace', '6', '5', '10', '2', '9', 'Ace']
+        composition = dealer_probabilities.composition_of(cards(*values))
+        expected = dealer_probabilities.dealer_probabilities(6, composition)
+        counts = [0] * len(dealer_probabilities.OUTCOMES)
+        orderings = list(itertools.permutations(values))
+        for ordering in orderings:
+            engine = BlackjackEngine(StackedDeck(cards(*ordering)))
+            dealer_hand = Hand()
+            dealer_hand.add_card(Card('Hearts', '6'))
+            engine.dealer_turn(dealer_hand)
+            if dealer_hand.blackjack:
+                counts[dealer_probabilities.BLACKJACK] += 1
+            elif dealer_hand.busted:
+                counts[dealer_probabilities.BUST] += 1
+            else:
+                counts[dealer_hand.value - 17] += 1
+        for p, count in zip(expected, counts):
+            self.assertAlmostEqual(p, count / len(orderings))
+
+    def test_deck_composition(self):
+        deck = Deck(num_decks=2)
+        self.assertEqual(deck.composition(), dealer_probabilities.full_composition(2))
+        card = deck.deal()
+        self.assertEqual(sum(deck.composition()), 103)
+        self.assertEqual(deck.composition()[card.rank - 2], dealer_probabilities.full_composition(2)[card.rank - 2] - 1)
+
+    def test_finite_table_approaches_infinite(self):
+        finite = dealer_probabilities.finite_deck_table(dealer_probabilities.full_composition(8))
+        for upcard, probabilities in dealer_probabilities.infinite_deck_table().items():
+            for p, q in zip(probabilities, finite[upcard]):
+                self.assertAlmostEqual(p, q, delta=0.01)
+
+    def test_finite_table_takes_a_list(self):
+        composition = dealer_probabilities.full_composition(1)
+        self.assertEqual(dealer_probabilities.finite_deck_table(list(composition)),
+                         dealer_probabilities.finite_deck_table(composition))
+
+class TestEVSolver(unittest.TestCase):
+
+    def _enumerated_ev(self, player_values, upcard_value, unseen_values, action):
+        # Average the net result of the engine over every ordering of the unseen cards
+        total = 0
+        orderings = list(itertools.permutations(unseen_values))
+        for ordering in orderings:
+            deck = StackedDeck(cards(*player_values, upcard_value, *ordering))
+            player = Player('TestPlayer', 1000, 30)
+            result = BlackjackEngine(deck).play_round(player, 1, ScriptedStrategy([action]))
+            total += result.net
+        return total / len(orderings)
+
+    def test_stand_and_double_match_engine(self):
+        unseen = ['10', '5', 'Ace', '7', '2', '9']
+        composition = dealer_probabilities.composition_of(cards(*unseen))
+        evs = EVSolver(exact_dealer=True).evaluate([10, 6], 9, composition)
+        self.assertAlmostEqual(evs[STAND], self._enumerated_ev(['10', '6'], '9', unseen, STAND))
+        evs = EVSolver(exact_dealer=True).evaluate([5, 6], 9, composition)
+        self.assertAlmostEqual(evs[DOUBLE], self._enumerated_ev(['5', '6'], '9', unseen, DOUBLE))
+
+    def test_basic_decisions(self):
+        solver = EVSolver()
+        self.assertEqual(solver.best_action([10, 6], 10), HIT)
+        self.assertEqual(solver.best_action([10, 3], 4), STAND)
+        self.assertEqual(solver.best_action([5, 6], 6), DOUBLE)
+        self.assertEqual(solver.best_action([8, 8], 6), SPLIT)
+        self.assertEqual(solver.best_action([8, 8], 6, actions=[HIT, STAND]), STAND)
+
+    def test_blackjack_and_bust(self):
+        solver = EVSolver()
+        evs = solver.evaluate([11, 10], 6)
+        self.assertEqual(list(evs), [STAND])
+        self.assertAlmostEqual(evs[STAND], 1.5)
+        self.assertEqual(solver.evaluate([10, 6, 10], 6), {STAND: -1.0})
+
+    def test_cache_is_bounded(self):
+        solver = EVSolver(cache_size=50)
+        composition = dealer_probabilities.remove_cards(dealer_probabilities.full_composition(6), [2, 3, 6])
+        solver.evaluate([2, 3], 6, composition)
+        self.assertLessEqual(len(solver._cache), 50)
+
+    def test_evaluate_live_hand(self):
+        deck = Deck(num_decks=6)
+        player_hand = Hand()
+        dealer_hand = Hand()
+        for hand in (player_hand, player_hand, dealer_hand, dealer_hand):
+            hand.add_card(deck.deal())
+        evs = EVSolver().evaluate_hand(player_hand, dealer_hand, deck)
+        self.assertIn(STAND, evs)
+
+    def test_resplits_up_to_the_hand_limit(self):
+        composition = dealer_probabilities.full_composition(6)
+        remaining = dealer_probabilities.remove_cards(composition, [8, 8, 6])
+        splits = [EVSolver(rules=Rules(max_split_hands=hands)).evaluate([8, 8], 6, remaining)[SPLIT]
+                  for hands in (2, 3, 4, None)]
+        self.assertEqual(splits, sorted(splits))
+        self.assertGreater(splits[-1], splits[0])
+        self.assertNotIn(SPLIT, EVSolver(rules=Rules(max_split_hands=1)).evaluate([8, 8], 6, remaining))
+
+class TestBasicStrategy(unittest.TestCase):
+
+    def _hand(self, *values):
+        hand = Hand()
+        for card in cards(*values):
+            hand.add_card(card)
+        return hand
+
+    def test_table_blob_loads(self):
+        cells, num_decks = basic_strategy.load_tables()
+        self.assertEqual(len(cells), basic_strategy.TABLE_SIZE)
+        self.assertEqual(num_decks, 6)
+
+    def test_known_decisions(self):
+        strategy = basic_strategy.BasicStrategy()
+        two_card_actions = [HIT, STAND, DOUBLE]
+        self.assertEqual(strategy.decide(None, self._hand('10', '6'), Card('Clubs', '10'), two_card_actions), HIT)
+        self.assertEqual(strategy.decide(None, self._hand('10', '3'), Card('Clubs', '4'), two_card_actions), STAND)
+        self.assertEqual(strategy.decide(None, self._hand('5', '6'), Card('Clubs', '6'), two_card_actions), DOUBLE)
+        self.assertEqual(strategy.decide(None, self._hand('5', '6'), Card('Clubs', '6'), [HIT, STAND]), HIT)
+        self.assertEqual(strategy.decide(None, self._hand('8', '8'), Card('Clubs', '6'), two_card_actions + [SPLIT]), SPLIT)
+        self.assertEqual(strategy.decide(None, self._hand('Ace', '7'), Card('Clubs', '9'), two_card_actions), HIT)
+        self.assertEqual(strategy.decide(None, self._hand('10', '2', '5'), Card('Clubs', '6'), [HIT, STAND]), STAND)
+
+    def test_strategy_follows_rules(self):
+        self.assertIs(basic_strategy.strategy_for(Rules(min_bet=10)), basic_strategy.strategy_for())
+        self.assertEqual(basic_strategy.strategy_for().cells, basic_strategy.load_tables()[0])
+        strategy = basic_strategy.strategy_for(Rules(num_decks=1, surrender=True))
+        self.assertIs(strategy, basic_strategy.strategy_for(Rules(num_decks=1, surrender=True)))
+        two_card_actions = [HIT, STAND, DOUBLE]
+        hand = self._hand('10', '6')
+        self.assertEqual(strategy.decide(None, hand, Card('Clubs', '10'), two_card_actions + [SURRENDER]), SURRENDER)
+        self.assertEqual(strategy.decide(None, hand, Card('Clubs', '10'), two_card_actions), HIT)
+        self.assertEqual(basic_strategy.strategy_for().decide(None, hand, Card('Clubs', '10'), two_card_actions + [SURRENDER]),
+                         HIT)
+
+    def test_save_and_load_round_trip(self):
+        cells = basic_strategy.generate_tables()
+        path = os.path.join(tempfile.mkdtemp(), 'tables.bin')
+        basic_strategy.save_tables(cells, path)
+        self.assertEqual(basic_strategy.load_tables(path), (cells, 0))
+        with open(path, 'r+b') as f:
+            f.write(b'XXXX')
+        with self.assertRaises(ValueError):
+            basic_strategy.load_tables(path)
+
+    def test_drives_engine(self):
+        engine = BlackjackEngine(Deck())
+        player = Player('TestPlayer', 100000, 30)
+        rounds = engine.run_session(player, basic_strategy.BasicStrategy(), 10, 500)
+        self.assertEqual(rounds, 500)
+
+class TestSimulationRunner(unittest.TestCase):
+
+    def test_seeded_deck_is_reproducible(self):
+        deck1 = Deck(num_decks=1, rng=random.Random(7))
+        deck2 = Deck(num_decks=1, rng=random.Random(7))
+        self.assertEqual([card.code for card in deck1.cards], [card.code for card in deck2.cards])
+
+    def test_split_rounds(self):
+        self.assertEqual(simulation_runner.split_rounds(10, 3), [4, 3, 3])
+
+    def test_reproducible_for_seed_and_workers(self):
+        first = simulation_runner.run_simulation(2000, seed=5, workers=2)
+        second = simulation_runner.run_simulation(2000, seed=5, workers=2)
+        self.assertEqual(first.as_dict(), second.as_dict())
+        self.assertEqual(first.rounds, 2000)
+        self.assertGreaterEqual(first.hands, 2000)
+        self.assertEqual(first.wins + first.losses + first.ties, first.hands)
+
+    def test_multi_seat_simulation(self):
+        stats = simulation_runner.run_simulation(1000, seed=4, workers=1, seats=7)
+        self.assertEqual(stats.rounds, 1000)
+        self.assertEqual(stats.wins + stats.losses + stats.ties, stats.hands)
+        self.assertLess(abs(stats.edge(10)), 0.2)
+
+    def test_seed_changes_results(self):
+        first = simulation_runner.run_simulation(500, seed=1, workers=1)
+        second = simulation_runner.run_simulation(500, seed=2, workers=1)
+        self.assertNotEqual(first.as_dict(), second.as_dict())
+
+    def test_running_moments_match_statistics(self):
+        values = [random.Random(3).uniform(-2, 2) for _ in range(50)] + [1.5, -1, 0, 0]
+        first, second = simulation_runner.RunningMoments(), simulation_runner.RunningMoments()
+        for value in values[:20]:
+            first.add(value)
+        for value in values[20:]:
+            second.add(value)
+        first.merge(second)
+        self.assertEqual(first.count, len(values))
+        self.assertAlmostEqual(first.mean, statistics.fmean(values))
+        self.assertAlmostEqual(first.variance, statistics.variance(values))
+
+    def test_simulate_until_stops_at_precision(self):
+        result = simulation_runner.simulate_until(0.05, batch_size=500, seed=3)
+        self.assertTrue(result.converged)
+        self.assertLessEqual(result.half_width, 0.05)
+        self.assertEqual(result.rounds % 500, 0)
+        self.assertEqual(result.rounds, result.moments.count)
+        self.assertAlmostEqual(result.edge, result.stats.edge(10))
+
+    def test_simulate_until_needs_a_minimum_sample(self):
+        result = simulation_runner.simulate_until(0.0005, batch_size=1, max_rounds=50)
+        self.assertEqual(result.rounds, 50)
+        self.assertFalse(result.converged)
+        result = simulation_runner.simulate_until(0.5, batch_size=1, seed=3)
+        self.assertTrue(result.converged)
+        self.assertGreaterEqual(result.rounds, 1000)
+
+    def test_simulate_until_respects_max_rounds(self):
+        result = simulation_runner.simulate_until(0.0001, batch_size=400, max_rounds=1000)
+        self.assertEqual(result.rounds, 1000)
+        self.assertFalse(result.converged)
+        with self.assertRaises(ValueError):
+            simulation_runner.simulate_until(0)
+
+RANK_VALUES = {rank: str(rank) for rank in range(2, 11)}
+RANK_VALUES[11] = 'Ace'
+
+
+@unittest.skipUnless(bankroll.np, "NumPy is not installed")
+class TestBankroll(unittest.TestCase):
+
+    def test_outcome_distribution_from_engine(self):
+        distribution = bankroll.outcome_distribution(20000, seed=3)
+        self.assertAlmostEqual(float(distribution.probabilities.sum()), 1.0)
+        values = set(distribution.values.tolist())
+        self.assertTrue({-2.0, -1.0, 0.0, 1.0, 1.5, 2.0} <= values)
+        self.assertLess(abs(distribution.mean), 0.05)
+
+    def test_certain_loss_ruins_every_trajectory(self):
+        losing = bankroll.OutcomeDistribution([-1.0], [1.0])
+        result = bankroll.simulate_bankrolls(100, 10, 50, trajectories=20, distribution=losing, seed=1)
+        self.assertEqual(result.risk_of_ruin, 1.0)
+        self.assertEqual(result.median_rounds, 10)
+        # 17 -> 7 at a $10 bet, then the last $7 is bet and lost
+        result = bankroll.simulate_bankrolls(17, 10, 50, trajectories=5, distribution=losing, seed=1)
+        self.assertEqual(result.rounds_played.tolist(), [2] * 5)
+
+    def test_certain_win_never_ruins(self):
+        winning = bankroll.OutcomeDistribution([1.0], [1.0])
+        result = bankroll.simulate_bankrolls(100, 10, 30, trajectories=10, distribution=winning, seed=1)
+        self.assertEqual(result.risk_of_ruin, 0.0)
+        self.assertEqual(result.percentiles()[50], 400.0)
+        self.assertEqual(result.median_rounds, 30)
+
+    def test_fair_coin_matches_reflection_principle(self):
+        # A fair +-1 walk from 5 units falls to 0 within 400 steps with probability
+        # 2 * P(S_400 >= 6) = 0.8026
+        coin = bankroll.OutcomeDistribution([-1.0, 1.0], [0.5, 0.5])
+        result = bankroll.simulate_bankrolls(50, 10, 400, trajectories=20000, distribution=coin,
+                                             min_bet=10, max_bet=10, seed=2)
+        self.assertAlmostEqual(result.risk_of_ruin, 0.8026, delta=0.015)
+
+    def test_bet_must_respect_table_limits(self):
+        with self.assertRaises(ValueError):
+            bankroll.simulate_bankrolls(1000, 1000, 10, distribution=bankroll.OutcomeDistribution([1.0], [1.0]))
+
+@unittest.skipUnless(batch_simulator.np, "NumPy is not installed")
+class TestBatchSimulator(unittest.TestCase):
+
+    def test_matches_engine_round_by_round(self):
+        np = batch_simulator.np
+        for stand_on in (12, 17):
+            batch = batch_simulator.simulate_batch(300, stand_on, 1, np.random.default_rng(3))
+            for row, used, net in zip(batch.cards, batch.cards_used, batch.net):
+                deck = StackedDeck(cards(*(RANK_VALUES[rank] for rank in row[:used])))
+                player = Player('TestPlayer', 1000, 30)
+                result = BlackjackEngine(deck).play_round(player, 1, ThresholdStrategy(stand_on))
+                self.assertEqual(result.net, net)
+                self.assertEqual(deck.cards, [])
+
+    def test_rows_respect_shoe_composition(self):
+        np = batch_simulator.np
+        batch = batch_simulator.simulate_batch(200, 21, 1, np.random.default_rng(4))
+        for row in batch.cards:
+            counts = np.bincount(row, minlength=12)[2:]
+            self.assertTrue((counts <= np.array(dealer_probabilities.full_composition(1))).all())
+
+    def test_simulate_is_seeded(self):
+        first = batch_simulator.simulate(5000, seed=9, batch_size=2000)
+        second = batch_simulator.simulate(5000, seed=9, batch_size=2000)
+        self.assertEqual(first.as_dict(), second.as_dict())
+        self.assertEqual(first.rounds, 5000)
+
+class TestPlayerStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.text_path = os.path.join(self.directory, 'players.txt')
+        with open(self.text_path, 'w') as f:
+            f.write("Alice,25,2405.0,4,2\nBob,30,1005.0,1,0\n")
+
+    def test_text_store_update(self):
+        store = TextPlayerStore(self.text_path)
+        store.update_stats('Bob', -5.0, wins=1, losses=2)
+        bob = store.get_player('Bob')
+        self.assertEqual((bob['balance'], bob['wins'], bob['losses']), (1000.0, 2, 2))
+        self.assertEqual(store.get_player('Alice')['balance'], 2405.0)
+
+    def test_text_store_rejects_bad_lines(self):
+        with open(self.text_path, 'a') as f:
+            f.write("Charlie,22,1000\n")
+        with self.assertRaises(ValueError):
+            TextPlayerStore(self.text_path).list_players()
+
+    def test_sqlite_import_and_lookup(self):
+        store = SQLitePlayerStore(os.path.join(self.directory, 'players.db'))
+        self.assertTrue(store.created)
+        self.assertEqual(store.import_text(self.text_path), 2)
+        self.assertEqual([p['name'] for p in store.list_players()], ['Alice', 'Bob'])
+        self.assertEqual(store.get_player('Alice')['balance'], 2405.0)
+        self.assertIsNone(store.get_player('Nobody'))
+        # Importing again leaves existing rows alone
+        store.update_stats('Alice', 100.0)
+        store.import_text(self.text_path)
+        self.assertEqual(store.get_player('Alice')['balance'], 2505.0)
+        store.close()
+
+    def test_sqlite_concurrent_sessions_both_apply(self):
+        path = os.path.join(self.directory, 'players.db')
+        first = SQLitePlayerStore(path)
+        first.import_text(self.text_path)
+        second = SQLitePlayerStore(path)
+        self.assertFalse(second.created)
+        first.update_stats('Bob', 50.0, wins=1)
+        second.update_stats('Bob', -20.0, losses=1, ties=1)
+        bob = first.get_player('Bob')
+        self.assertEqual((bob['balance'], bob['wins'], bob['losses'], bob['ties']), (1035.0, 2, 1, 1))
+        with self.assertRaises(KeyError):
+            first.update_stats('Nobody', 1.0)
+        first.close()
+        second.close()
+
+    def test_game_loads_from_store(self):
+        store = SQLitePlayerStore(os.path.join(self.directory, 'players.db'))
+        store.add_player('Dana', 40, 500.0)
+        game = BlackjackGame(store=store)
+        self.assertEqual(game.players_info[0]['name'], 'Dana')
+        store.close()
+
+class TestHandHistory(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'history.bin')
+
+    def test_records_every_round(self):
+        balances = []
+        with hand_history.HandHistoryWriter(self.path) as writer:
+            recorder = hand_history.HandHistoryRecorder(writer, session_id=42)
+            engine = BlackjackEngine(Deck(rng=random.Random(1)), recorder)
+            player = Player('Alice', 10000, 25)
+            for _ in range(200):
+                engine.play_round(player, 10, basic_strategy.BasicStrategy())
+                balances.append(player.balance)
+
+        records = list(hand_history.read_hand_history(self.path))
+        self.assertEqual([record.balance for record in records], balances)
+        self.assertEqual([record.round_number for record in records], list(range(1, 201)))
+        last = records[-1]
+        self.assertEqual((last.player_name, last.session_id), ('Alice', 42))
+        self.assertEqual(last.wins + last.losses + last.ties, sum(len(record.hands) for record in records))
+        for record in records:
+            self.assertGreaterEqual(len(record.dealer_cards), 2)
+            for hand in record.hands:
+                self.assertGreaterEqual(len(hand.cards), 2)
+
+    def test_actions_and_cards_round_trip(self):
+        with hand_history.HandHistoryWriter(self.path) as writer:
+            deck = StackedDeck(cards('8', '8', '10', '7', '10', '3', '10'))
+            engine = BlackjackEngine(deck, hand_history.HandHistoryRecorder(writer))
+            engine.play_round(Player('Bob', 1000, 30), 100, ScriptedStrategy([SPLIT, STAND, HIT]))
+        (record,) = hand_history.read_hand_history(self.path)
+        self.assertEqual([hand.actions for hand in record.hands], [[SPLIT, STAND], [HIT]])
+        self.assertEqual([hand.outcome for hand in record.hands], ['win', 'win'])
+        self.assertEqual([Card.from_code(code).value for code in record.dealer_cards], ['10', '7'])
+        self.assertEqual(record.balance, 1200)
+
+    def test_partial_record_is_ignored(self):
+        with hand_history.HandHistoryWriter(self.path) as writer:
+            engine = BlackjackEngine(Deck(), hand_history.HandHistoryRecorder(writer))
+            engine.play_round(Player('Bob', 1000, 30), 10, ThresholdStrategy(17))
+        with open(self.path, 'ab') as f:
+            f.write(b'\x40\x00\x00\x00partial')
+        self.assertEqual(len(list(hand_history.read_hand_history(self.path))), 1)
+
+    def test_shared_log_keeps_records_whole(self):
+        # Small buffers flush every few records, so the two sessions' writes interleave
+        with hand_history.HandHistoryWriter(self.path, buffer_size=128) as first, \
+                hand_history.HandHistoryWriter(self.path, buffer_size=128) as second:
+            sessions = [(BlackjackEngine(Deck(rng=random.Random(seed)), hand_history.HandHistoryRecorder(writer)),
+                         Player(name, 1000, 30)) for seed, (name, writer) in enumerate((('Alice', first), ('Bob', second)))]
+            for _ in range(20):
+                for engine, player in sessions:
+                    engine.play_round(player, 10, ThresholdStrategy(17))
+        records = list(hand_history.read_hand_history(self.path))
+        for name in ('Alice', 'Bob'):
+            self.assertEqual([record.round_number for record in records if record.player_name == name], list(range(1, 21)))
+
+    def test_short_writes_are_completed(self):
+        real_write = os.write
+        with unittest.mock.patch.object(hand_history.os, 'write',
+                                        side_effect=lambda fd, data: real_write(fd, bytes(data[:10]))):
+            with hand_history.HandHistoryWriter(self.path) as writer:
+                engine = BlackjackEngine(Deck(rng=random.Random(5)), hand_history.HandHistoryRecorder(writer))
+                engine.run_session(Player('Bob', 1000, 30), ThresholdStrategy(17), 10, 20)
+        records = list(hand_history.read_hand_history(self.path))
+        self.assertEqual([record.round_number for record in records], list(range(1, 21)))
+
+    def test_session_summaries(self):
+        with hand_history.HandHistoryWriter(self.path) as writer:
+            for name in ('Alice', 'Bob'):
+                engine = BlackjackEngine(Deck(), hand_history.HandHistoryRecorder(writer))
+                player = Player(name, 1000, 30)
+                engine.run_session(player, ThresholdStrategy(17), 10, 5)
+        summaries = hand_history.session_summaries(self.path)
+        self.assertEqual(len(summaries), 2)
+        self.assertTrue(summaries[1].startswith("Player: Bob\nEnding Balance: $"))
+        self.assertTrue(summaries[1].endswith("=" * 30 + "\n"))
+
+    def test_listener_group_forwards(self):
+        class Counter(EngineListener):
+            def __init__(self):
+                self.rounds = 0
+
+            def on_round_settled(self, player):
+                self.rounds += 1
+
+        first, second = Counter(), Counter()
+        engine = BlackjackEngine(Deck(), ListenerGroup(first, second))
+        engine.run_session(Player('Bob', 1000, 30), ThresholdStrategy(17), 10, 3)
+        self.assertEqual((first.rounds, second.rounds), (3, 3))
+
+@unittest.skipUnless(batch_simulator.np, "NumPy is not installed")
+class TestRoundColumns(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = os.path.join(tempfile.mkdtemp(), 'columns')
+
+    def _play(self, name, rounds, flush_rows=64):
+        writer = round_columns.ColumnWriter(self.directory, flush_rows=flush_rows)
+        engine = BlackjackEngine(Deck(rng=random.Random(len(name))), writer)
+        results = []
+        player = Player(name, 100000, 30)
+        for _ in range(rounds):
+            results.append(engine.play_round(player, 10, basic_strategy.BasicStrategy()))
+        writer.close()
+        return results
+
+    def test_columns_match_rounds(self):
+        results = self._play('Alice', 300)
+        columns = round_columns.open_columns(self.directory)
+        outcomes = [outcome for result in results for outcome in result.outcomes]
+        self.assertEqual(len(columns), len(outcomes))
+        self.assertAlmostEqual(float(columns['net'].sum()), sum(result.net for result in results))
+        self.assertEqual(columns['round'][-1], 300)
+        self.assertIsInstance(columns['net'], batch_simulator.np.memmap)
+
+    def test_concurrent_sessions_share_a_store(self):
+        sessions = []
+        for name in ('Alice', 'Bob'):
+            writer = round_columns.ColumnWriter(self.directory, flush_rows=10 ** 6)
+            sessions.append((writer, BlackjackEngine(Deck(rng=random.Random(len(name))), writer), Player(name, 100000, 30)))
+        hands = {'Alice': 0, 'Bob': 0}
+        # Both writers were opened before either flushed, then flush in turn
+        for _ in range(3):
+            for writer, engine, player in sessions:
+                for _ in range(20):
+                    hands[player.name] += len(engine.play_round(player, 10, basic_strategy.BasicStrategy()).outcomes)
+                writer.flush()
+        columns = round_columns.open_columns(self.directory)
+        self.assertEqual(sorted(columns.players), ['Alice', 'Bob'])
+        for index, name in enumerate(columns.players):
+            self.assertEqual(int((columns['player'] == index).sum()), hands[name])
+
+    def test_multi_seat_rounds_counted_once(self):
+        history_path = os.path.join(tempfile.mkdtemp(), 'history.bin')
+        history = hand_history.HandHistoryWriter(history_path)
+        columns_writer = round_columns.ColumnWriter(self.directory)
+        engine = BlackjackEngine(Deck(rng=random.Random(8)),
+                                 ListenerGroup(hand_history.HandHistoryRecorder(history), columns_writer))
+        seats = [(Player(name, 1000, 30), 10, basic_strategy.BasicStrategy()) for name in ('A', 'B', 'C')]
+        expected_rounds = []
+        for round_number in range(1, 5):
+            for result in engine.play_table_round(seats):
+                expected_rounds.extend([round_number] * len(result.outcomes))
+        history.close()
+        columns_writer.close()
+        records = list(hand_history.read_hand_history(history_path))
+        self.assertEqual([record.round_number for record in records], [1, 1, 1, 2, 2, 2, 3, 3, 3, 4, 4, 4])
+        self.assertEqual(list(round_columns.open_columns(self.directory)['round']), expected_rounds)
+
+    def test_group_stats(self):
+        self._play('Alice', 200)
+        self._play('Bob', 100)
+        columns = round_columns.open_columns(self.directory)
+        by_player = analytics.group_stats(columns, 'player')
+        self.assertEqual(set(by_player), {'Alice', 'Bob'})
+        self.assertEqual(sum(stats['hands'] for stats in by_player.values()), len(columns))
+        by_upcard = analytics.group_stats(columns, 'upcard')
+        self.assertTrue(set(by_upcard) <= set(range(2, 12)))
+        by_action = analytics.group_stats(columns, 'first_action', rows=slice(0, 50))
+        self.assertEqual(sum(stats['hands'] for stats in by_action.values()), 50)
+        for stats in by_action.values():
+            self.assertTrue(0 <= stats['bust_rate'] <= 1)
+        with self.assertRaises(ValueError):
+            analytics.group_stats(columns, 'dealer_value')
+
+    def test_uneven_columns_are_trimmed(self):
+        first = self._play('Alice', 50)
+        with open(os.path.join(self.directory, 'net.col'), 'ab') as f:
+            f.write(b'\x00' * 8)
+        columns = round_columns.open_columns(self.directory)
+        self.assertEqual(len(columns['net']), len(columns['bet']))
+        # The next session's rows line up again after the damaged flush
+        second = self._play('Bob', 50)
+        columns = round_columns.open_columns(self.directory)
+        nets = [payout - hand.bet for result in first + second for hand, _, payout in result.outcomes]
+        bets = [hand.bet for result in first + second for hand, _, _ in result.outcomes]
+        self.assertEqual(len(columns), len(nets))
+        for name in round_columns.COLUMNS:
+            self.assertEqual(os.path.getsize(os.path.join(self.directory, name + '.col')),
+                             len(nets) * columns[name].itemsize)
+        self.assertEqual(columns['net'].tolist(), nets)
+        self.assertEqual(columns['bet'].tolist(), bets)
+        self.assertEqual(columns['round'][-1], 50)
+
+class TestReplay(unittest.TestCase):
+
+    def _record(self, path, seed, rounds):
+        deck = Deck(rng=random.Random(seed), penetration=0.5)
+        player = Player('Alice', 1000, 25)
+        recorder = replay.SessionRecorder(path, seed, deck, player)
+        engine = BlackjackEngine(deck, recorder)
+        engine.run_session(player, basic_strategy.BasicStrategy(), 10, rounds)
+        recorder.close()
+        return player
+
+    def test_replay_matches_recorded_session(self):
+        path = os.path.join(tempfile.mkdtemp(), 'session.jsonl')
+        player = self._record(path, 11, 300)
+        header, rounds = replay.load_session(path)
+        self.assertEqual(rounds[-1]['balance'], player.balance)
+        report = replay.replay_session(path)
+        self.assertTrue(report.ok, report.mismatches)
+        self.assertEqual(report.rounds, len(rounds))
+
+    def test_replay_detects_tampering(self):
+        path = os.path.join(tempfile.mkdtemp(), 'session.jsonl')
+        self._record(path, 12, 50)
+        with open(path) as f:
+            lines = f.readlines()
+        entry = json.loads(lines[10])
+        entry['balance'] += 5
+        lines[10] = json.dumps(entry) + '\n'
+        with open(path, 'w') as f:
+            f.writelines(lines)
+        report = replay.replay_session(path)
+        self.assertEqual(report.mismatches[0][0], 10)
+
+    def test_replay_uses_recorded_rules(self):
+        class SurrenderSixteen(basic_strategy.BasicStrategy):
+            def decide(self, player, hand, dealer_upcard, actions):
+                if SURRENDER in actions and hand.value == 16:
+                    return SURRENDER
+                return super().decide(player, hand, dealer_upcard, actions)
+
+        path = os.path.join(tempfile.mkdtemp(), 'session.jsonl')
+        rules = Rules(surrender=True, blackjack_payout=1.2, dealer_hits_soft_17=False)
+        deck = Deck.for_rules(rules, rng=random.Random(22))
+        player = Player('Alice', 1000, 25)
+        recorder = replay.SessionRecorder(path, 22, deck, player, rules)
+        BlackjackEngine(deck, recorder, rules).run_session(player, SurrenderSixteen(), 10, 200)
+        recorder.close()
+        header, rounds = replay.load_session(path)
+        self.assertEqual(Rules(**header['rules']), rules)
+        self.assertTrue(any(SURRENDER in entry['actions'] for entry in rounds))
+        self.assertTrue(replay.replay_session(path).ok)
+
+    def test_replay_lazy_shuffle_session(self):
+        path = os.path.join(tempfile.mkdtemp(), 'session.jsonl')
+        deck = Deck(rng=random.Random(21), lazy_shuffle=True)
+        player = Player('Alice', 1000, 25)
+        recorder = replay.SessionRecorder(path, 21, deck, player)
+        BlackjackEngine(deck, recorder).run_session(player, basic_strategy.BasicStrategy(), 10, 100)
+        recorder.close()
+        header, _ = replay.load_session(path)
+        self.assertTrue(header['lazy_shuffle'])
+        self.assertTrue(replay.replay_session(path).ok)
+
+    def test_replay_corpus(self):
+        directory = tempfile.mkdtemp()
+        for seed in (1, 2):
+            self._record(os.path.join(directory, f'{seed}.jsonl'), seed, 40)
+        reports = replay.replay_corpus(directory)
+        self.assertEqual(len(reports), 2)
+        self.assertTrue(all(report.ok for report in reports))
+
+    def test_game_seed_fixes_shoe(self):
+        first = BlackjackGame(seed=99)
+        second = BlackjackGame(seed=99)
+        self.assertEqual([card.code for card in first.deck.cards], [card.code for card in second.deck.cards])
+        self.assertEqual(first.seed, 99)
+
+class TestTableServer(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.decks = []
+        self.server = table_server.TableServer(bet_timeout=5, action_timeout=5, deck_factory=self._deck)
+        await self.server.start(port=0)
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    def _deck(self):
+        return self.decks.pop(0)
+
+    async def _connect(self, *join):
+        reader, writer = await asyncio.open_connection('127.0.0.1', self.server.port)
+        self.assertEqual(await self._expect(reader, 'WELCOME'), 'WELCOME')
+        if join:
+            writer.write(('JOIN ' + ' '.join(join) + '\n').encode())
+        return reader, writer
+
+    async def _expect(self, reader, prefix):
+        while True:
+            line = (await asyncio.wait_for(reader.readline(), 5)).decode().strip()
+            if not line:
+                self.fail(f"Connection closed waiting for {prefix}")
+            if line.startswith(prefix):
+                return line
+
+    async def test_two_players_share_a_table(self):
+        # Seat one, seat two, dealer, then the second card in the same order
+        self.decks.append(StackedDeck(cards('10', '10', '10', '8', '6', '7', '5')))
+        alice_in, alice_out = await self._connect('felt', 'Alice', '100')
+        self.assertEqual(await self._expect(alice_in, 'SEATED'), 'SEATED felt 1')
+        await self._expect(alice_in, 'BETS')
+        bob_in, bob_out = await self._connect('felt', 'Bob', '100')
+        self.assertEqual(await self._expect(bob_in, 'SEATED'), 'SEATED felt 2')
+        # Bob joined mid-betting, so he is dealt in from the next round
+        alice_out.write(b'PASS\n')
+        await self._expect(alice_in, 'BETS')
+        await self._expect(bob_in, 'BETS')
+        alice_out.write(b'BET 10\n')
+        bob_out.write(b'BET 20\n')
+
+        self.assertIn('(18) DEALER 10', await self._expect(alice_in, 'DEALT'))
+        self.assertIn('(16)', await self._expect(bob_in, 'DEALT'))
+        self.assertTrue((await self._expect(alice_in, 'TURN 1')).endswith('OPTIONS hit,stand,double'))
+        alice_out.write(b'STAND\n')
+        await self._expect(bob_in, 'TURN 1')
+        bob_out.write(b'HIT\n')
+        self.assertIn('(21)', await self._expect(bob_in, 'HAND 1'))
+
+        self.assertIn('(17)', await self._expect(alice_in, 'DEALER'))
+        self.assertEqual(await self._expect(alice_in, 'RESULT'), 'RESULT 1 win 20.00')
+        self.assertEqual(await self._expect(alice_in, 'BALANCE'), 'BALANCE 110.00')
+        self.assertEqual(await self._expect(bob_in, 'RESULT'), 'RESULT 1 win 40.00')
+        self.assertEqual(await self._expect(bob_in, 'BALANCE'), 'BALANCE 120.00')
+        for writer in (alice_out, bob_out):
+            writer.close()
+
+    async def test_free_seat_is_reused(self):
+        self.decks.append(StackedDeck([]))
+        alice_in, alice_out = await self._connect('felt', 'Alice', '100')
+        self.assertEqual(await self._expect(alice_in, 'SEATED'), 'SEATED felt 1')
+        bob_in, bob_out = await self._connect('felt', 'Bob', '100')
+        self.assertEqual(await self._expect(bob_in, 'SEATED'), 'SEATED felt 2')
+        alice_out.write(b'QUIT\n')
+        # Bob's first bet prompt comes once Alice's seat has been cleared
+        await self._expect(bob_in, 'BETS')
+        carol_in, carol_out = await self._connect('felt', 'Carol', '100')
+        self.assertEqual(await self._expect(carol_in, 'SEATED'), 'SEATED felt 1')
+        dave_in, dave_out = await self._connect('felt', 'Dave', '100')
+        self.assertEqual(await self._expect(dave_in, 'SEATED'), 'SEATED felt 3')
+        for writer in (alice_out, bob_out, carol_out, dave_out):
+            writer.close()
+
+    async def test_table_failure_is_reported(self):
+        # An empty shoe makes the deal fail inside the table's task
+        self.decks.append(StackedDeck([]))
+        alice_in, alice_out = await self._connect('felt', 'Alice', '100')
+        await self._expect(alice_in, 'BETS')
+        with self.assertLogs(level='ERROR'):
+            alice_out.write(b'BET 10\n')
+            self.assertTrue((await self._expect(alice_in, 'ERROR')).startswith('ERROR Table felt stopped'))
+            self.assertEqual(await asyncio.wait_for(alice_in.readline(), 5), b'')
+        self.assertEqual(self.server.tables['felt'].seats, [])
+        alice_out.close()
+
+    async def test_slow_client_is_disconnected(self):
+        class StalledWriter:
+            closed = False
+
+            def write(self, data):
+                pass
+
+            async def drain(self):
+                await asyncio.sleep(10)
+
+            def close(self):
+                self.closed = True
+
+        seat = table_server.Seat(Player('Alice', 100, 0), StalledWriter(), send_timeout=0.01)
+        await seat.send('BETS 5 500 100.00')
+        self.assertFalse(seat.connected)
+        self.assertTrue(seat.writer.closed)
+
+    async def test_invalid_commands_are_rejected(self):
+        self.decks.append(StackedDeck(cards('10', '10', '8', '7', '5', '10')))
+        reader, writer = await self._connect()
+        writer.write(b'BET 10\n')
+        self.assertEqual(await self._expect(reader, 'ERROR'), 'ERROR Join a table first')
+        writer.write(b'JOIN felt Carol 50\n')
+        await self._expect(reader, 'BETS')
+        writer.write(b'BET 1000\n')
+        self.assertEqual(await self._expect(reader, 'ERROR'), 'ERROR Bet must be between $5 and $500.')
+        writer.write(b'BET 100\n')
+        self.assertEqual(await self._expect(reader, 'ERROR'), 'ERROR Insufficient funds to place this bet.')
+        writer.write(b'BET 10\n')
+        await self._expect(reader, 'TURN 1')
+        writer.write(b'SPLIT\n')
+        self.assertEqual(await self._expect(reader, 'ERROR'), 'ERROR Choose one of hit,stand,double')
+        writer.write(b'HIT\n')
+        self.assertIn('(23)', await self._expect(reader, 'HAND 1'))
+        self.assertEqual(await self._expect(reader, 'RESULT'), 'RESULT 1 bust 0.00')
+        self.assertEqual(await self._expect(reader, 'BALANCE'), 'BALANCE 40.00')
+        writer.close()
+
+    async def test_tables_are_independent(self):
+        self.decks.extend([Deck(rng=random.Random(1)), Deck(rng=random.Random(2))])
+        first_in, first_out = await self._connect('one', 'Dave')
+        second_in, second_out = await self._connect('two', 'Erin')
+        self.assertEqual(await self._expect(first_in, 'SEATED'), 'SEATED one 1')
+        self.assertEqual(await self._expect(second_in, 'SEATED'), 'SEATED two 1')
+        self.assertIsNot(self.server.tables['one'].deck, self.server.tables['two'].deck)
+        first_out.close()
+        second_out.close()
+
+    async def test_idle_connections_use_no_threads(self):
+        threads = threading.active_count()
+        connections = [await self._connect() for _ in range(200)]
+        self.assertEqual(threading.active_count(), threads)
+        for _, writer in connections:
+            writer.close()
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_every_benchmark_runs(self):
+        results = benchmarks.run_benchmarks(min_time=0.001, repeat=1)
+        self.assertEqual(set(results), set(benchmarks.BENCHMARKS))
+        self.assertTrue(all(rate > 0 for rate in results.values()))
+
+    def test_regression_threshold(self):
+        baselines = {'deck_deal': 1000.0, 'dealer_play': 1000.0}
+        results = {'deck_deal': 850.0, 'dealer_play': 750.0, 'settlement': 1.0}
+        self.assertEqual(benchmarks.regressions(results, baselines, 0.2), [('dealer_play', 1000.0, 750.0)])
+
+    def test_save_baselines_merges(self):
+        path = os.path.join(tempfile.mkdtemp(), 'baselines.json')
+        benchmarks.save_baselines({'deck_deal': 10.0}, path)
+        benchmarks.save_baselines({'settlement': 20.0}, path)
+        self.assertEqual(benchmarks.load_baselines(path), {'deck_deal': 10.0, 'settlement': 20.0})
+
+    def test_stored_baselines_cover_every_benchmark(self):
+        self.assertEqual(set(benchmarks.load_baselines()), set(benchmarks.BENCHMARKS))
+
+class TestInstrumentation(unittest.TestCase):
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.metrics.reset()
+
+    def test_disabled_records_nothing(self):
+        instrumentation.disable()
+        instrumentation.metrics.reset()
+        BlackjackEngine(Deck(rng=random.Random(1))).run_session(Player('P', 1000, 30), ThresholdStrategy(17), 10, 20)
+        self.assertEqual(instrumentation.metrics.snapshot(), {'counters': {}, 'histograms': {}})
+
+    def test_session_counters(self):
+        instrumentation.enable()
+        deck = Deck(penetration=0.1, rng=random.Random(2))
+        engine = BlackjackEngine(deck)
+        player = Player('P', float('inf'), 30)
+        hands = dealt = 0
+        for _ in range(100):
+            before, shuffles = deck.cards_dealt, deck.shuffle_count
+            hands += len(engine.play_round(player, 10, ThresholdStrategy(17)).outcomes)
+            dealt += deck.cards_dealt - (0 if deck.shuffle_count > shuffles else before)
+        counters = instrumentation.metrics.snapshot()['counters']
+        self.assertGreater(counters['reshuffles'], 0)
+        self.assertEqual(counters['shoes_created'], counters['reshuffles'] + 1)
+        self.assertEqual(counters['cards_dealt'], dealt)
+        self.assertEqual(counters['hands_settled'], hands)
+        self.assertGreater(counters['dealer_draws'], 0)
+        self.assertGreater(counters['hand_evaluations'], counters['cards_dealt'] - 1)
+        histograms = instrumentation.metrics.snapshot()['histograms']
+        self.assertEqual(histograms['dealer_turn']['count'], 100)
+        self.assertEqual(histograms['settlement']['count'], 100)
+        self.assertEqual(histograms['shoe_creation']['count'], counters['shoes_created'])
+
+    def test_prometheus_text(self):
+        metrics = instrumentation.Metrics()
+        metrics.count('cards_dealt', 3)
+        metrics.observe('settlement', 0.005)
+        metrics.observe('settlement', 20.0)
+        text = metrics.prometheus()
+        self.assertIn('blackjack_cards_dealt_total 3\n', text)
+        self.assertIn('blackjack_settlement_seconds_bucket{le="0.001"} 0\n', text)
+        self.assertIn('blackjack_settlement_seconds_bucket{le="0.01"} 1\n', text)
+        self.assertIn('blackjack_settlement_seconds_bucket{le="+Inf"} 2\n', text)
+        self.assertIn('blackjack_settlement_seconds_count 2\n', text)
+
+    def test_persistence_calls_are_timed(self):
+        instrumentation.enable()
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'players.txt')
+        with open(path, 'w') as f:
+            f.write('Alice, 30, 1000, 0, 0\n')
+        store = TextPlayerStore(path)
+        game = BlackjackGame(os.path.join(directory, 'results.txt'), store)
+        game.player = Player('Alice', 1000, 30)
+        game._session_start = (1000, 0, 0)
+        game._save_game_results()
+        game._update_player_data()
+        histograms = instrumentation.metrics.snapshot()['histograms']
+        self.assertEqual(histograms['save_game_results']['count'], 1)
+        self.assertEqual(histograms['update_player_data']['count'], 1)
+
+class CountingStream(io.StringIO):
+    """StringIO that counts write calls."""
+
+    writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        return super().write(text)
+
+
+class TestRenderers(unittest.TestCase):
+
+    def _play(self, renderer, rounds=5):
+        engine = BlackjackEngine(Deck(rng=random.Random(8)), renderer)
+        player = Player('P', 1000, 30)
+        for round_number in range(1, rounds + 1):
+            renderer.start_round(round_number)
+            engine.play_round(player, 10, ThresholdStrategy(17))
+        return player
+
+    def test_verbose_writes_once_per_round(self):
+        stream = CountingStream()
+        self._play(renderers.VerboseRenderer(stream))
+        self.assertEqual(stream.writes, 5)
+        self.assertEqual(stream.getvalue().count('=== Results for Round'), 5)
+        self.assertIn('            ROUND 5', stream.getvalue())
+
+    def test_compact_one_line_per_round(self):
+        stream = CountingStream()
+        player = self._play(renderers.CompactRenderer(stream))
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(stream.writes, 5)
+        self.assertTrue(lines[0].startswith('Round 1: '))
+        self.assertTrue(lines[-1].endswith(f'Balance ${player.balance:.2f} | W/L/T {player.wins}/{player.losses}/{player.ties}'))
+
+    def test_silent_writes_nothing(self):
+        stream = CountingStream()
+        renderer = renderers.SilentRenderer(stream)
+        self._play(renderer)
+        renderer.message('ignored')
+        renderer.flush()
+        self.assertEqual(stream.writes, 0)
+
+    def test_pending_output_flushed_before_prompt(self):
+        stream = io.StringIO()
+        renderer = renderers.VerboseRenderer(stream)
+        strategy = Main.ConsoleStrategy(renderer)
+        hand = Hand()
+        hand.cards = cards('10', '6')
+        renderer.write('Your hand: 10, 6')
+        seen = []
+        with unittest.mock.patch('builtins.input', lambda prompt: seen.append(stream.getvalue()) or 's'):
+            self.assertEqual(strategy.decide(None, hand, Card('Spades', '9'), [HIT, STAND]), STAND)
+        self.assertEqual(seen, ['Your hand: 10, 6\n'])
+
+    def test_compact_prompt_shows_hand(self):
+        hand = Hand()
+        hand.cards = cards('10', '6')
+        prompt = renderers.CompactRenderer().decision_prompt(hand, Card('Hearts', '9'))
+        self.assertEqual(prompt, '[10 of Spades, 6 of Spades (16) vs 9 of Hearts] ')
+
+class TestTournament(unittest.TestCase):
+    def setUp(self):
+        self.shoes = tournament.generate_shoes(30, seed=4)
+
+    def test_same_shoes_give_same_results(self):
+        first = tournament.play_shoes('basic', basic_strategy.BasicStrategy(), self.shoes)
+        second = tournament.play_shoes('basic', basic_strategy.BasicStrategy(), self.shoes)
+        self.assertEqual(first.shoe_nets, second.shoe_nets)
+        self.assertEqual(len(first.shoe_nets), 30)
+
+    def test_every_strategy_sees_the_same_first_cards(self):
+        first_cards = []
+
+        class Recorder(EngineListener):
+            def on_deal(self, player_hand, dealer_hand):
+                first_cards.append((player_hand.cards[0].code, dealer_hand.cards[0].code))
+
+        for strategy in (tournament.DealerMimicStrategy(), tournament.NeverBustStrategy()):
+            deck = Deck(rng=tournament.ShoeSequence(self.shoes))
+            engine = BlackjackEngine(deck, Recorder())
+            engine.play_round(Player('Test', float('inf'), 0), 10, strategy)
+        self.assertEqual(first_cards[0], first_cards[1])
+        self.assertEqual(first_cards[0], (self.shoes[0][0], self.shoes[0][2]))
+
+    def test_paired_comparison_reduces_error(self):
+        results = tournament.run_tournament(
+            {'basic': basic_strategy.BasicStrategy(), 'counting': tournament.CountingStrategy()}, self.shoes)
+        _, paired = tournament.paired_difference(results['counting'], results['basic'])
+        self.assertLess(paired, tournament.unpaired_stderr(results['counting'], results['basic']))
+        self.assertEqual(results['counting'].rounds, results['basic'].rounds)
+
+    def test_rules_sweep(self):
+        rules = Rules(num_decks=1, surrender=True)
+        strategies = tournament.default_strategies(rules)
+        self.assertEqual(strategies['counting'].cells, basic_strategy.strategy_for(rules).cells)
+        self.assertNotEqual(strategies['basic'].cells, basic_strategy.strategy_for().cells)
+        shoes = tournament.generate_shoes(20, num_decks=1, seed=4)
+        nets = [tournament.run_tournament({'basic': basic_strategy.BasicStrategy()}, shoes,
+                                          rules=Rules(num_decks=1, blackjack_payout=payout))['basic'].net
+                for payout in (1.5, 1.2)]
+        self.assertGreater(nets[0], nets[1])
+
+    def test_never_bust_stands_on_hard_twelve(self):
+        strategy = tournament.NeverBustStrategy()
+        hand = Hand()
+        hand.cards = cards('10', '2')
+        self.assertEqual(strategy.decide(None, hand, Card('Hearts', '10'), [HIT, STAND]), STAND)
+        hand.cards = cards('Ace', '5')
+        self.assertEqual(strategy.decide(None, hand, Card('Hearts', '10'), [HIT, STAND]), HIT)
+
+    def test_counting_bets_on_true_count(self):
+        strategy = tournament.CountingStrategy(max_units=4)
+        deck = Deck(1, rng=random.Random(1))
+        self.assertEqual(strategy.bet_size(deck, 10), 10)
+        deck.running_count = 3 * deck.decks_remaining
+        self.assertEqual(strategy.bet_size(deck, 10), 30)
+        deck.running_count = 10 * deck.decks_remaining
+        self.assertEqual(strategy.bet_size(deck, 10), 40)
+
+    def test_run_session_uses_bet_size(self):
+        class DoubleUnit(ThresholdStrategy):
+            def bet_size(self, deck, base_bet):
+                return 2 * base_bet
+
+        engine = BlackjackEngine(Deck(rng=random.Random(2)))
+        player = Player('Test', 1000, 0)
+        engine.run_session(player, DoubleUnit(17), 10, 1)
+        self.assertEqual(player.hands[0].bet, 20)
+
+class TestHouseEdge(unittest.TestCase):
+    def test_deal_probabilities_sum_to_one(self):
+        deals = list(house_edge.initial_deals(dealer_probabilities.full_composition(2)))
+        self.assertEqual(len(deals), 55 * 10)
+        self.assertAlmostEqual(sum(p for _, _, p, _ in deals), 1.0)
+        pair = next(deal for deal in deals if deal[:2] == ((10, 11), 11))
+        self.assertAlmostEqual(pair[2], 2 * (32 / 104) * (8 / 103) * (7 / 102))
+        self.assertEqual(sum(pair[3]), 101)
+
+    def test_results_cached_on_disk_by_rules(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'edges.json')
+            with unittest.mock.patch.object(house_edge, 'player_expectation', return_value=-0.005) as solve:
+                self.assertEqual(house_edge.house_edge(6, path), 0.005)
+                self.assertEqual(house_edge.house_edge(6, path), 0.005)
+                self.assertEqual(solve.call_count, 1)
+                house_edge.house_edge(2, path)
+                self.assertEqual(solve.call_count, 2)
+            with open(path) as f:
+                self.assertEqual(set(json.load(f)), {house_edge.rules_key(Rules()), house_edge.rules_key(Rules(2))})
+        self.assertNotEqual(house_edge.rules_key(Rules()), house_edge.rules_key(Rules(blackjack_payout=1.2)))
+        self.assertEqual(house_edge.rules_key(Rules()), house_edge.rules_key(Rules(min_bet=10)))
+        self.assertNotEqual(house_edge.rules_key(Rules()), house_edge.rules_key(Rules(), exact_dealer=True))
+
+    def test_single_deck_decision_point_edge(self):
+        # Dealer odds from the shoe at the decision point, about 0.03% above the exact edge
+        self.assertAlmostEqual(house_edge.house_edge(1, path=None), -0.00221, places=5)
+        self.assertAlmostEqual(house_edge.house_edge(1, path=None, rules=Rules(max_split_hands=2)), -0.00156, places=5)
+
 if __name__ == '__main__':
     unittest.main()
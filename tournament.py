@@ -0,0 +1,193 @@
+# tournament.py
+
+"""Compare strategies on identical shoes (common random numbers).
+
+A set of shuffled shoes is generated once and every strategy plays through
+the same shoes in the same order, each shoe until its cut card comes out,
+using the game's own `BlackjackEngine`. Strategies are compared shoe by
+shoe, so luck of the deal cancels out of the differences and far fewer
+shoes are needed to tell strategies apart than with independent runs:
+
+    python tournament.py --shoes 2000
+
+Pass `rules` to `run_tournament` to compare strategies under another rule
+set; the basic-strategy players then use tables generated for those rules.
+"""
+
+import argparse
+import math
+import random
+import statistics
+import time
+from array import array
+
+from basic_strategy import BasicStrategy, strategy_for
+from card_deck_classes import Deck, CARDS
+from game_engine import BlackjackEngine, Strategy, HIT, STAND, dealer_should_hit
+from player_hand_classes import Player
+from rules import DEFAULT_RULES, resolve
+
+
+class DealerMimicStrategy(Strategy):
+    """Play the dealer's rule: hit 16 or less and soft 17, never double or split."""
+
+    def decide(self, player, hand, dealer_upcard, actions):
+        return HIT if dealer_should_hit(hand) else STAND
+
+
+class NeverBustStrategy(Strategy):
+    """Only hit when no card can bust the hand, stopping at 17 or more."""
+
+    def decide(self, player, hand, dealer_upcard, actions):
+        return HIT if hand.hard_total <= 11 and hand.value < 17 else STAND
+
+
+class CountingStrategy(BasicStrategy):
+    """Basic strategy play with a bet spread on the shoe's true count.
+
+    Bets one unit at a true count of 1 or less and one more unit for every
+    true count above that, up to `max_units`.
+    """
+
+    def __init__(self, max_units=8, cells=None):
+        super().__init__(cells)
+        self.max_units = max_units
+
+    def bet_size(self, deck, base_bet):
+        units = int(deck.true_count)
+        return base_bet * min(max(units, 1), self.max_units)
+
+
+STRATEGIES = {
+    'basic': BasicStrategy,
+    'dealer-mimic': DealerMimicStrategy,
+    'never-bust': NeverBustStrategy,
+    'counting': CountingStrategy,
+}
+
+
+def default_strategies(rules=DEFAULT_RULES):
+    """One of each strategy in STRATEGIES, with basic strategy tables for `rules`."""
+    cells = strategy_for(rules).cells
+    return {
+        name: factory(cells=cells) if issubclass(factory, BasicStrategy) else factory()
+        for name, factory in STRATEGIES.items()
+    }
+
+
+def generate_shoes(count, num_decks=DEFAULT_RULES.num_decks, seed=0):
+    """`count` shuffled shoes of card codes."""
+    rng = random.Random(seed)
+    shoes = []
+    for _ in range(count):
+        shoe = array('B', range(len(CARDS))) * num_decks
+        rng.shuffle(shoe)
+        shoes.append(shoe)
+    return shoes
+
+
+class ShoeSequence:
+    """Takes the place of a Deck's rng so each shuffle loads the next pre-generated shoe."""
+
+    def __init__(self, shoes):
+        self.shoes = shoes
+        self.index = 0
+
+    def shuffle(self, shoe):
+        shoe[:] = self.shoes[self.index % len(self.shoes)]
+        self.index += 1
+
+
+class StrategyResult:
+    """One strategy's results, with the net result of every shoe."""
+
+    def __init__(self, name):
+        self.name = name
+        self.shoe_nets = []
+        self.rounds = 0
+        self.wagered = 0.0
+
+    @property
+    def net(self):
+        return sum(self.shoe_nets)
+
+    @property
+    def edge(self):
+        """Net result as a fraction of the total amount wagered."""
+        return self.net / self.wagered if self.wagered else 0.0
+
+
+def play_shoes(name, strategy, shoes, base_bet=10, penetration=None, rules=None):
+    """Play `strategy` through every shoe until its cut card. Returns a StrategyResult.
+
+    The game follows `rules` (the defaults if None), with the shoe size taken
+    from `shoes` and `penetration` overriding the rules' cut card.
+    """
+    rules = resolve(rules, num_decks=len(shoes[0]) // len(CARDS), penetration=penetration)
+    deck = Deck.for_rules(rules, rng=ShoeSequence(shoes))
+    engine = BlackjackEngine(deck, rules=rules)
+    player = Player(name, float('inf'), 0)
+    result = StrategyResult(name)
+    for _ in shoes:
+        shoe_net = 0.0
+        while True:
+            outcome = engine.play_round(player, strategy.bet_size(deck, base_bet), strategy)
+            shoe_net += outcome.net
+            result.wagered += outcome.wagered
+            result.rounds += 1
+            if deck.cut_card_reached:
+                break
+        result.shoe_nets.append(shoe_net)
+        deck.reshuffle_if_needed()
+    return result
+
+
+def paired_difference(first, second):
+    """Mean per-shoe net of `first` minus `second`, with its standard error."""
+    differences = [a - b for a, b in zip(first.shoe_nets, second.shoe_nets)]
+    if len(differences) < 2:
+        return statistics.fmean(differences), float('inf')
+    return statistics.fmean(differences), statistics.stdev(differences) / math.sqrt(len(differences))
+
+
+def unpaired_stderr(first, second):
+    """Standard error the same difference would have if the two runs used independent shoes."""
+    shoes = len(first.shoe_nets)
+    return math.sqrt((statistics.variance(first.shoe_nets) + statistics.variance(second.shoe_nets)) / shoes)
+
+
+def run_tournament(strategies=None, shoes=1000, base_bet=10, num_decks=None, penetration=None, seed=0, rules=None):
+    """Play every strategy on the same shoes. `strategies` maps names to Strategy objects.
+
+    `shoes` is a number of shoes to generate or a list from `generate_shoes`.
+    The game follows `rules` (the defaults if None), with `num_decks` and
+    `penetration` overriding its shoe; `strategies` defaults to
+    `default_strategies` for those rules. Returns {name: StrategyResult} in
+    the order given.
+    """
+    rules = resolve(rules, num_decks=num_decks, penetration=penetration)
+    if strategies is None:
+        strategies = default_strategies(rules)
+    if isinstance(shoes, int):
+        shoes = generate_shoes(shoes, rules.num_decks, seed)
+    return {name: play_shoes(name, strategy, shoes, base_bet, rules=rules) for name, strategy in strategies.items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare strategies on identical shoes.")
+    parser.add_argument('--shoes', type=int, default=1000)
+    parser.add_argument('--bet', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_tournament(shoes=args.shoes, base_bet=args.bet, seed=args.seed)
+    reference = results['basic']
+    print(f"{'strategy':14} {'rounds':>8} {'edge':>8} {'vs basic/shoe':>14} {'std err':>8} {'unpaired':>9}")
+    for name, result in results.items():
+        line = f"{name:14} {result.rounds:>8} {result.edge:>+8.2%}"
+        if result is not reference:
+            difference, stderr = paired_difference(result, reference)
+            line += f" {difference:>+14.2f} {stderr:>8.2f} {unpaired_stderr(result, reference):>9.2f}"
+        print(line)
+    print(f"{args.shoes} shoes per strategy in {time.perf_counter() - start:.1f}s")